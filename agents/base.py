@@ -0,0 +1,205 @@
+"""Shared helpers for tool-calling agents."""
+
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import time
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from utils.config import config, config_service
+from utils.metrics import Counter
+from utils.tracing import current_span, propagate, span
+
+
+tool_calls_total = Counter("tool_calls_total", "Tool invocations per tool and outcome")
+# Reasons: answer, direct (a return_direct tool answered), steps, time, tokens
+agent_stops = Counter("agent_stops_total", "Agent tool loops finished per agent and reason")
+
+
+class PromptPrefix:
+    """
+    Stable start of an agent's prompts: the system prompt and tool schemas.
+
+    Every call an agent makes begins with the same prefix, and everything
+    that varies (history, query, tool calls and results) follows it, so
+    DeepSeek serves the prefix from its context cache. The id combines the
+    version with a hash of the prefix, so any prompt or tool change shows
+    up as a new prefix in traces.
+    """
+
+    def __init__(self, name: str, version: int, system: str, tools: Optional[List[Any]] = None):
+        """
+        Initialize prompt prefix.
+
+        Args:
+            name: Agent name
+            version: Bumped when the prompt is edited on purpose
+            system: System prompt (sent verbatim, not templated)
+            tools: Tools bound to the LLM, whose schemas are part of the prefix
+        """
+        self.name = name
+        self.version = version
+        self.system = system
+        schemas = [convert_to_openai_tool(tool) for tool in tools or []]
+        canonical = json.dumps({"system": system, "tools": schemas}, sort_keys=True, separators=(",", ":"))
+        self.hash = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+        self.id = f"{name}-v{version}-{self.hash}"
+
+    def messages(self, query: str, history: Optional[List[BaseMessage]] = None) -> List[BaseMessage]:
+        """
+        Build the messages for a query.
+
+        Args:
+            query: User query
+            history: Earlier conversation messages
+
+        Returns:
+            System prompt, history, then the query
+        """
+        return [SystemMessage(content=self.system), *(history or []), HumanMessage(content=query)]
+
+    def config(self, llm_call: str) -> Dict[str, Any]:
+        """Run config labelling an LLM call with its purpose and prefix."""
+        return {"metadata": {"llm_call": llm_call, "prompt_prefix": self.id}}
+
+
+def _run_tool_call(tools_by_name: Dict[str, Any], tool_call: Dict[str, Any]) -> ToolMessage:
+    """Invoke one tool call, tracing it; failures are reported in the message."""
+    tool_name = tool_call.get("name", "")
+    tool_args = tool_call.get("args", {})
+    tool = tools_by_name.get(tool_name)
+    if tool is None:
+        # Every tool call needs an answer, or the next request is rejected
+        result = f"Error: Unknown tool '{tool_name}'"
+        failed = True
+    else:
+        with span(tool_name, "tool", **{
+            "tool.args_bytes": len(json.dumps(tool_args, default=str).encode("utf-8")),
+        }) as current:
+            result = tool.invoke(tool_args)
+            current.set("tool.result_bytes", len(str(result).encode("utf-8")))
+            # Tools report failures as text rather than raising
+            failed = str(result).startswith(("Error", "❌"))
+            current.set("tool.error", failed)
+    tool_calls_total.inc(labels={"tool": tool_name, "status": "error" if failed else "ok"})
+    return ToolMessage(
+        content=str(result),
+        tool_call_id=tool_call.get("id") or "",
+        name=tool_name,
+        status="error" if failed else "success",
+    )
+
+
+def run_tool_calls(tools: List[Any], tool_calls: List[Dict[str, Any]], parallel: bool = True) -> List[ToolMessage]:
+    """
+    Invoke the tools an LLM asked for, tracing each invocation.
+
+    Calls from one LLM response are independent of each other, so they
+    run concurrently unless the agent's clients are not thread-safe. The
+    caller's session settings are pinned first, so tools in worker threads
+    use the credentials the user entered, not the server's.
+
+    Args:
+        tools: Available LangChain tools
+        tool_calls: Tool calls from the LLM response
+        parallel: Run the calls concurrently
+
+    Returns:
+        One tool message per call, in call order, answering its tool call id
+    """
+    tools_by_name = {tool.name: tool for tool in tools}
+    run = lambda tool_call: _run_tool_call(tools_by_name, tool_call)
+    if not parallel or len(tool_calls) < 2:
+        return [run(tool_call) for tool_call in tool_calls]
+    max_workers = max(1, min(len(tool_calls), config.AGENT_TOOL_CONCURRENCY))
+    with config_service.pinned_session():
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-tools") as executor:
+            return list(executor.map(propagate(run), tool_calls))
+
+
+def answer_with_tools(
+    llm_with_tools: Any,
+    prefix: PromptPrefix,
+    tools: List[Any],
+    query: str,
+    history: Optional[List[BaseMessage]] = None,
+    parallel: bool = True
+) -> str:
+    """
+    Answer a query with a bounded tool-calling loop.
+
+    Each step the LLM either answers or asks for tools; their results are
+    appended to the conversation, which keeps the prompt prefix cached,
+    and the next step decides what to do with them. The loop ends when
+    the LLM answers, when every tool of a step is return_direct and
+    succeeded (its result is the answer), or when the AGENT_MAX_STEPS,
+    AGENT_TIME_BUDGET or AGENT_TOKEN_BUDGET budget is spent; then one last
+    call without tool use answers from the results so far.
+
+    Args:
+        llm_with_tools: LLM with the agent's tools bound
+        prefix: The agent's prompt prefix
+        tools: The agent's tools
+        query: User query
+        history: Earlier conversation messages
+        parallel: Run the tool calls of a step concurrently
+
+    Returns:
+        Answer text
+    """
+    tools_by_name = {tool.name: tool for tool in tools}
+    messages = prefix.messages(query, history)
+    deadline = time.monotonic() + config.AGENT_TIME_BUDGET
+    tokens = 0
+    steps = 0
+    stop = "steps"
+
+    while steps < config.AGENT_MAX_STEPS:
+        response = llm_with_tools.invoke(
+            messages, config=prefix.config("tool_selection" if steps == 0 else "step")
+        )
+        tokens += (response.usage_metadata or {}).get("total_tokens", 0)
+        if not response.tool_calls:
+            _finish(prefix, "answer", steps, tokens)
+            return response.content
+
+        steps += 1
+        tool_messages = run_tool_calls(tools, response.tool_calls, parallel)
+        messages = [*messages, response, *tool_messages]
+
+        direct = all(
+            getattr(tools_by_name.get(message.name), "return_direct", False) and message.status != "error"
+            for message in tool_messages
+        )
+        if direct:
+            _finish(prefix, "direct", steps, tokens)
+            return "\n".join(message.content for message in tool_messages)
+
+        if time.monotonic() >= deadline:
+            stop = "time"
+            break
+        if tokens >= config.AGENT_TOKEN_BUDGET:
+            stop = "tokens"
+            break
+
+    # Budget spent: same prompt and tools (so the prefix stays cached), no more tool use
+    final = llm_with_tools.bind(tool_choice="none").invoke(messages, config=prefix.config("summary"))
+    tokens += (final.usage_metadata or {}).get("total_tokens", 0)
+    _finish(prefix, stop, steps, tokens)
+    if final.content:
+        return final.content
+    # No answer despite that; report what ran
+    return "\n".join(
+        f"{message.name}: {message.content}" for message in messages if isinstance(message, ToolMessage)
+    )
+
+
+def _finish(prefix: PromptPrefix, reason: str, steps: int, tokens: int) -> None:
+    """Record how an agent's tool loop ended on the enclosing span and in metrics."""
+    agent_stops.inc(labels={"agent": prefix.name, "reason": reason})
+    current = current_span()
+    if current is not None:
+        current.set("agent.steps", steps)
+        current.set("agent.stop", reason)
+        current.set("agent.tokens", tokens)
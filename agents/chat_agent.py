@@ -1,9 +1,12 @@
 """Simple chat agent for Q&A."""
 
-from typing import Dict, Any
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from typing import Dict, Any, List, Optional
 from utils.llm import get_default_llm
+from agents.base import PromptPrefix
+
+
+# Bump when the system prompt changes on purpose
+PROMPT_VERSION = 1
 
 
 class ChatAgent:
@@ -12,24 +15,27 @@ class ChatAgent:
     def __init__(self):
         """Initialize chat agent."""
         self.llm = get_default_llm()
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a helpful AI assistant. Answer questions clearly and concisely."),
-            ("human", "{question}")
-        ])
-        self.chain = self.prompt | self.llm | StrOutputParser()
+        self.prefix = PromptPrefix(
+            "chat",
+            PROMPT_VERSION,
+            "You are a helpful AI assistant. Answer questions clearly and concisely."
+        )
     
-    def answer(self, question: str) -> Dict[str, Any]:
+    def answer(self, question: str, history: Optional[List[Any]] = None) -> Dict[str, Any]:
         """
         Answer a question.
         
         Args:
             question: User question
+            history: Earlier conversation messages
             
         Returns:
             Answer and metadata
         """
         try:
-            answer = self.chain.invoke({"question": question})
+            answer = self.llm.invoke(
+                self.prefix.messages(question, history), config=self.prefix.config("answer")
+            ).content
             return {
                 "answer": answer,
                 "agent": "chat",
@@ -1,39 +1,68 @@
 """Drive agent using Drive MCP server."""
 
-from typing import Dict, Any, Optional
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from typing import Dict, Any, List, Optional
 from langchain_core.tools import tool
 from utils.llm import get_default_llm
+from agents.base import PromptPrefix, answer_with_tools
 from mcp_servers.drive_mcp import get_drive_mcp
 
 
+# Bump when the system prompt or tools change on purpose
+PROMPT_VERSION = 1
+
+
 class DriveAgent:
     """Agent for Google Drive operations."""
     
     def __init__(self):
         """Initialize Drive agent."""
         self.llm = get_default_llm()
-        self.drive_mcp = get_drive_mcp()
         self.tools = self._create_tools()
         self.llm_with_tools = self.llm.bind_tools(self.tools)
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a Google Drive assistant. Use tools to perform Drive operations."),
-            ("human", "{input}"),
-        ])
+        self.prefix = PromptPrefix(
+            "drive",
+            PROMPT_VERSION,
+            (
+                "You are a Google Drive assistant. Use tools to perform Drive operations. "
+                "When tools have run, answer the user from their results."
+            ),
+            self.tools,
+        )
+    
+    @property
+    def drive_mcp(self):
+        """Drive client, rebuilt when the credential files change."""
+        return get_drive_mcp()
     
     def _create_tools(self):
         """Create LangChain tools from MCP functions."""
         
         @tool
-        def list_files(query: Optional[str] = None, max_results: int = 10) -> str:
-            """List files in Google Drive."""
+        def list_files(query: Optional[str] = None, max_results: int = 10, order_by: Optional[str] = None) -> str:
+            """List files in Google Drive. order_by is e.g. "modifiedTime desc"."""
             try:
-                files = self.drive_mcp.list_files(query, max_results)
+                files = self.drive_mcp.list_files(query, max_results, order_by=order_by)
                 return f"Found {len(files)} files: {[f['name'] for f in files]}"
             except Exception as e:
                 return f"Error: {str(e)}"
         
+        @tool
+        def search_files(
+            name_contains: Optional[str] = None,
+            mime_type: Optional[str] = None,
+            parent_id: Optional[str] = None,
+            modified_after: Optional[str] = None,
+            max_results: int = 20
+        ) -> str:
+            """Search Google Drive files by name, MIME type, parent folder or modified time (RFC 3339). Faster than list_files."""
+            try:
+                files = self.drive_mcp.search_index(
+                    name_contains, mime_type, parent_id, modified_after, max_results
+                )
+                return f"Found {len(files)} files: {[(f['name'], f['id']) for f in files]}"
+            except Exception as e:
+                return f"Error: {str(e)}"
+        
         @tool
         def upload_file(file_path: str, folder_id: Optional[str] = None, name: Optional[str] = None) -> str:
             """Upload a file to Google Drive."""
@@ -43,6 +72,20 @@ class DriveAgent:
             except Exception as e:
                 return f"Error: {str(e)}"
         
+        @tool
+        def upload_files(file_paths: list, folder_id: Optional[str] = None) -> str:
+            """Upload several files to Google Drive at once."""
+            try:
+                results = self.drive_mcp.upload_many(file_paths, folder_id)
+                uploaded = [r['name'] for r in results if 'error' not in r]
+                failed = [f"{r['file_path']} ({r['error']})" for r in results if 'error' in r]
+                message = f"Uploaded {len(uploaded)} files: {uploaded}"
+                if failed:
+                    message += f". Failed: {failed}"
+                return message
+            except Exception as e:
+                return f"Error: {str(e)}"
+        
         @tool
         def download_file(file_id: str, output_path: str) -> str:
             """Download a file from Google Drive."""
@@ -61,42 +104,51 @@ class DriveAgent:
             except Exception as e:
                 return f"Error: {str(e)}"
         
-        return [list_files, upload_file, download_file, create_folder]
+        @tool
+        def create_folders(paths: list, parent_id: Optional[str] = None) -> str:
+            """Create nested folders in Google Drive, e.g. ["reports/2024/q1", "reports/2024/q2"]."""
+            try:
+                results = self.drive_mcp.create_folders(paths, parent_id)
+                created = [r['path'] for r in results if 'error' not in r]
+                failed = [f"{r['path']} ({r['error']})" for r in results if 'error' in r]
+                message = f"Created folders: {created}"
+                if failed:
+                    message += f". Failed: {failed}"
+                return message
+            except Exception as e:
+                return f"Error: {str(e)}"
+        
+        @tool
+        def move_files(file_ids: list, folder_id: str) -> str:
+            """Move several files into a Google Drive folder."""
+            try:
+                results = self.drive_mcp.move_many(file_ids, folder_id)
+                moved = [r['name'] for r in results if 'error' not in r]
+                failed = [f"{r['id']} ({r['error']})" for r in results if 'error' in r]
+                message = f"Moved {len(moved)} files: {moved}"
+                if failed:
+                    message += f". Failed: {failed}"
+                return message
+            except Exception as e:
+                return f"Error: {str(e)}"
+        
+        return [
+            list_files, search_files, upload_file, upload_files, download_file,
+            create_folder, create_folders, move_files,
+        ]
     
-    def execute(self, query: str) -> Dict[str, Any]:
+    def execute(self, query: str, history: Optional[List[Any]] = None) -> Dict[str, Any]:
         """Execute a Drive operation."""
         try:
-            response = self.llm_with_tools.invoke(self.prompt.format(input=query))
-            
-            if hasattr(response, 'tool_calls') and response.tool_calls:
-                tool_results = []
-                for tool_call in response.tool_calls:
-                    tool_name = tool_call.get("name", "")
-                    tool_args = tool_call.get("args", {})
-                    
-                    for tool in self.tools:
-                        if tool.name == tool_name:
-                            result = tool.invoke(tool_args)
-                            tool_results.append(f"{tool_name}: {result}")
-                            break
-                
-                final_prompt = ChatPromptTemplate.from_messages([
-                    ("system", "You are a Google Drive assistant. Summarize the tool results."),
-                    ("human", f"User asked: {query}\n\nTool results: {', '.join(tool_results)}"),
-                ])
-                final_response = (final_prompt | self.llm | StrOutputParser()).invoke({})
-                
-                return {
-                    "result": final_response,
-                    "agent": "drive",
-                    "success": True,
-                }
-            else:
-                return {
-                    "result": response.content if hasattr(response, 'content') else str(response),
-                    "agent": "drive",
-                    "success": True,
-                }
+            # Tools share one googleapiclient service, whose httplib2 client is not thread-safe
+            result = answer_with_tools(
+                self.llm_with_tools, self.prefix, self.tools, query, history, parallel=False
+            )
+            return {
+                "result": result,
+                "agent": "drive",
+                "success": True,
+            }
         except Exception as e:
             return {
                 "result": f"Error: {str(e)}. Google Drive may not be configured. See SETUP.md for instructions.",
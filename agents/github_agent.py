@@ -1,26 +1,38 @@
 """GitHub agent using GitHub MCP server."""
 
-from typing import Dict, Any, Optional
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from typing import Dict, Any, List, Optional
 from langchain_core.tools import tool
 from utils.llm import get_default_llm
+from agents.base import PromptPrefix, answer_with_tools
 from mcp_servers.github_mcp import get_github_mcp
 
 
+# Bump when the system prompt or tools change on purpose
+PROMPT_VERSION = 1
+
+
 class GitHubAgent:
     """Agent for GitHub operations."""
     
     def __init__(self):
         """Initialize GitHub agent."""
         self.llm = get_default_llm()
-        self.github_mcp = get_github_mcp()
         self.tools = self._create_tools()
         self.llm_with_tools = self.llm.bind_tools(self.tools)
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a GitHub assistant. Use tools to perform GitHub operations. When user asks about GitHub, use the available tools."),
-            ("human", "{input}"),
-        ])
+        self.prefix = PromptPrefix(
+            "github",
+            PROMPT_VERSION,
+            (
+                "You are a GitHub assistant. Use tools to perform GitHub operations. When user asks about GitHub, use the available tools. "
+                "When tools have run, answer the user from their results."
+            ),
+            self.tools,
+        )
+    
+    @property
+    def github_mcp(self):
+        """GitHub client for the current session's token."""
+        return get_github_mcp()
     
     def _create_tools(self):
         """Create LangChain tools from MCP functions."""
@@ -72,54 +84,24 @@ class GitHubAgent:
         
         return [list_repos, create_repo, get_repo_info, list_files, create_file]
     
-    def execute(self, query: str) -> Dict[str, Any]:
+    def execute(self, query: str, history: Optional[List[Any]] = None) -> Dict[str, Any]:
         """
         Execute a GitHub operation.
         
         Args:
             query: User query about GitHub operations
+            history: Earlier conversation messages
             
         Returns:
             Result and metadata
         """
         try:
-            # Get response with tool calls
-            response = self.llm_with_tools.invoke(self.prompt.format(input=query))
-            
-            # Check if tools were called
-            if hasattr(response, 'tool_calls') and response.tool_calls:
-                # Execute tools and get results
-                tool_results = []
-                for tool_call in response.tool_calls:
-                    tool_name = tool_call.get("name", "")
-                    tool_args = tool_call.get("args", {})
-                    
-                    # Find and execute tool
-                    for tool in self.tools:
-                        if tool.name == tool_name:
-                            result = tool.invoke(tool_args)
-                            tool_results.append(f"{tool_name}: {result}")
-                            break
-                
-                # Get final response
-                final_prompt = ChatPromptTemplate.from_messages([
-                    ("system", "You are a GitHub assistant. Summarize the tool results for the user."),
-                    ("human", f"User asked: {query}\n\nTool results: {', '.join(tool_results)}"),
-                ])
-                final_response = (final_prompt | self.llm | StrOutputParser()).invoke({})
-                
-                return {
-                    "result": final_response,
-                    "agent": "github",
-                    "success": True,
-                }
-            else:
-                # No tools called, return direct response
-                return {
-                    "result": response.content if hasattr(response, 'content') else str(response),
-                    "agent": "github",
-                    "success": True,
-                }
+            result = answer_with_tools(self.llm_with_tools, self.prefix, self.tools, query, history)
+            return {
+                "result": result,
+                "agent": "github",
+                "success": True,
+            }
         except Exception as e:
             return {
                 "result": f"Error: {str(e)}. GitHub may not be configured. See SETUP.md for instructions.",
@@ -1,36 +1,64 @@
 """ML agent using ML MCP server."""
 
-from typing import Dict, Any, Optional
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from typing import Dict, Any, List, Optional
 from langchain_core.tools import tool
 from utils.llm import get_default_llm
+from agents.base import PromptPrefix, answer_with_tools
 from mcp_servers.ml_mcp import get_ml_mcp
 
 
+# Bump when the system prompt or tools change on purpose
+PROMPT_VERSION = 1
+
+
 class MLAgent:
     """Agent for ML model operations."""
     
     def __init__(self):
         """Initialize ML agent."""
         self.llm = get_default_llm()
-        self.ml_mcp = get_ml_mcp()
         self.tools = self._create_tools()
         self.llm_with_tools = self.llm.bind_tools(self.tools)
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an ML assistant. Use tools to train models, make predictions, and manage ML models."),
-            ("human", "{input}"),
-        ])
+        self.prefix = PromptPrefix(
+            "ml",
+            PROMPT_VERSION,
+            (
+                "You are an ML assistant. Use tools to train models, make predictions, and manage ML models. "
+                "When tools have run, answer the user from their results."
+            ),
+            self.tools,
+        )
+    
+    @property
+    def ml_mcp(self):
+        """ML MCP server."""
+        return get_ml_mcp()
     
     def _create_tools(self):
         """Create LangChain tools from MCP functions."""
         
         @tool
-        def find_datasets(task_type: str, description: Optional[str] = None) -> str:
-            """Find datasets for ML training."""
+        def find_datasets(task_type: str, description: Optional[str] = None, local_only: bool = False) -> str:
+            """Find datasets for ML training. Local datasets include a path usable for training."""
+            try:
+                datasets = self.ml_mcp.find_datasets(task_type, description, local_only)
+                names = [
+                    f"{d['name']} (path: {d['path']})" if d.get('path') else d['name']
+                    for d in datasets
+                ]
+                return f"Found {len(datasets)} datasets: {names}"
+            except Exception as e:
+                return f"Error: {str(e)}"
+        
+        @tool
+        def download_dataset(dataset_url: str) -> str:
+            """Download a dataset from a URL (gzip/zip archives are unpacked). Returns a path usable for training."""
             try:
-                datasets = self.ml_mcp.find_datasets(task_type, description)
-                return f"Found {len(datasets)} datasets: {[d['name'] for d in datasets]}"
+                result = self.ml_mcp.download_dataset(dataset_url)
+                if not result["downloaded"]:
+                    return f"Error: {result.get('error', 'Failed to download')}"
+                source = "cache" if result["cached"] else "download"
+                return f"Dataset ready at: {result['path']} ({result['size']} bytes, from {source})"
             except Exception as e:
                 return f"Error: {str(e)}"
         
@@ -43,7 +71,7 @@ class MLAgent:
             except Exception as e:
                 return f"Error: {str(e)}"
         
-        @tool
+        @tool(return_direct=True)
         def predict(model_name: str, features: dict) -> str:
             """Make prediction with a trained model."""
             try:
@@ -62,50 +90,25 @@ class MLAgent:
                 return f"Error: {str(e)}"
         
         @tool
-        def create_sample_salary_dataset() -> str:
-            """Create a sample salary prediction dataset."""
+        def create_sample_salary_dataset(n_samples: int = 1000, seed: int = 42, file_format: str = "csv") -> str:
+            """Create a sample salary prediction dataset. file_format is "csv" or "parquet"; same arguments reuse the cached file."""
             try:
-                path = self.ml_mcp.create_sample_salary_dataset()
+                path = self.ml_mcp.create_sample_salary_dataset(n_samples, seed, file_format)
                 return f"Created sample dataset at: {path}"
             except Exception as e:
                 return f"Error: {str(e)}"
         
-        return [find_datasets, train_model, predict, list_models, create_sample_salary_dataset]
+        return [find_datasets, download_dataset, train_model, predict, list_models, create_sample_salary_dataset]
     
-    def execute(self, query: str) -> Dict[str, Any]:
+    def execute(self, query: str, history: Optional[List[Any]] = None) -> Dict[str, Any]:
         """Execute an ML operation."""
         try:
-            response = self.llm_with_tools.invoke(self.prompt.format(input=query))
-            
-            if hasattr(response, 'tool_calls') and response.tool_calls:
-                tool_results = []
-                for tool_call in response.tool_calls:
-                    tool_name = tool_call.get("name", "")
-                    tool_args = tool_call.get("args", {})
-                    
-                    for tool in self.tools:
-                        if tool.name == tool_name:
-                            result = tool.invoke(tool_args)
-                            tool_results.append(f"{tool_name}: {result}")
-                            break
-                
-                final_prompt = ChatPromptTemplate.from_messages([
-                    ("system", "You are an ML assistant. Summarize the tool results."),
-                    ("human", f"User asked: {query}\n\nTool results: {', '.join(tool_results)}"),
-                ])
-                final_response = (final_prompt | self.llm | StrOutputParser()).invoke({})
-                
-                return {
-                    "result": final_response,
-                    "agent": "ml",
-                    "success": True,
-                }
-            else:
-                return {
-                    "result": response.content if hasattr(response, 'content') else str(response),
-                    "agent": "ml",
-                    "success": True,
-                }
+            result = answer_with_tools(self.llm_with_tools, self.prefix, self.tools, query, history)
+            return {
+                "result": result,
+                "agent": "ml",
+                "success": True,
+            }
         except Exception as e:
             return {
                 "result": f"Error: {str(e)}",
@@ -1,24 +1,28 @@
 """n8n agent using n8n MCP server."""
 
-from typing import Dict, Any, Optional
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from typing import Dict, Any, List, Optional
 from langchain_core.tools import tool
 from utils.llm import get_default_llm
+from agents.base import PromptPrefix, answer_with_tools
 from mcp_servers.n8n_mcp import get_n8n_mcp
 
 
+# Bump when the system prompt or tools change on purpose
+PROMPT_VERSION = 1
+
+
 class N8NAgent:
     """Agent for n8n workflow operations."""
     
     def __init__(self):
         """Initialize n8n agent."""
         self.llm = get_default_llm()
-        self.n8n_mcp = get_n8n_mcp()
         self.tools = self._create_tools()
         self.llm_with_tools = self.llm.bind_tools(self.tools)
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an n8n workflow assistant that can send emails via webhooks.
+        self.prefix = PromptPrefix(
+            "n8n",
+            PROMPT_VERSION,
+            """You are an n8n workflow assistant that can send emails via webhooks.
 
 **Email Workflow Configuration:**
 - Webhook URL: https://gavinpham.app.n8n.cloud/webhook/send-email
@@ -45,31 +49,52 @@ Examples:
 
 4. Always use the FULL webhook URL, not relative path
 
+5. When emailing several recipients, call trigger_workflow_bulk ONCE with one
+   payload per recipient instead of calling trigger_workflow repeatedly
+
 **For generic workflow triggers:**
 - Use trigger_workflow tool with workflow_id and optional data
 - Support both full URLs and relative paths
-"""),
-            ("human", "{input}"),
-        ])
+
+**When the user doesn't need to wait for the result (e.g. "in the background", "queue"):**
+- Use queue_workflow instead of trigger_workflow and give the user the ticket id
+- Use check_workflow_status with a ticket id to report delivery status
+
+When tools have run, answer the user from their results.
+""",
+            self.tools,
+        )
+    
+    @property
+    def n8n_mcp(self):
+        """n8n client, rebuilt when the webhook settings change."""
+        return get_n8n_mcp()
     
     def _create_tools(self):
         """Create LangChain tools from MCP functions."""
         
-        @tool
-        def trigger_workflow(workflow_id: str, data: Optional[dict] = None) -> str:
+        def resolve_workflow_id(workflow_id: str) -> str:
+            # Smart default: if no full URL provided and workflow_id looks like email endpoint
+            if not workflow_id.startswith(('http://', 'https://')) and 'email' in workflow_id.lower():
+                return "https://gavinpham.app.n8n.cloud/webhook/send-email"
+            return workflow_id
+        
+        @tool(return_direct=True)
+        def trigger_workflow(workflow_id: str, data: Optional[dict] = None, force: bool = False) -> str:
             """Trigger an n8n workflow via webhook.
 
             Args:
                 workflow_id: Full webhook URL or workflow path (e.g., "send-email")
                 data: Data to send to workflow. For email workflows: {"to": "email", "subject": "...", "body": "..."}
+                force: Only true if the user explicitly asks to send the exact same request again
             """
             try:
-                # Smart default: if no full URL provided and workflow_id looks like email endpoint
-                if not workflow_id.startswith(('http://', 'https://')) and 'email' in workflow_id.lower():
-                    workflow_id = "https://gavinpham.app.n8n.cloud/webhook/send-email"
-
-                result = self.n8n_mcp.trigger_workflow(workflow_id, data)
+                result = self.n8n_mcp.trigger_workflow(
+                    resolve_workflow_id(workflow_id), data, deduplicate=not force
+                )
 
+                if result.get("deduplicated"):
+                    return f"♻️ Identical request was already sent recently, not sent again: {result.get('data')}"
                 if result["success"]:
                     response_data = result.get('data', {})
                     if isinstance(response_data, dict) and response_data.get('success'):
@@ -81,6 +106,61 @@ Examples:
                 return f"❌ Error: {str(e)}"
         
         @tool
+        def trigger_workflow_bulk(workflow_id: str, payloads: list, batch_size: Optional[int] = None) -> str:
+            """Trigger an n8n workflow once per payload, e.g. one email per recipient.
+
+            Args:
+                workflow_id: Full webhook URL or workflow path (e.g., "send-email")
+                payloads: List of data objects, e.g. [{"to": "a@x.com", "subject": "...", "body": "..."}, ...]
+                batch_size: Only if the workflow accepts arrays: number of payloads per request
+            """
+            try:
+                result = self.n8n_mcp.trigger_many(
+                    resolve_workflow_id(workflow_id), payloads, batch_size=batch_size
+                )
+                message = f"✅ Sent {result['succeeded']}/{result['total']} successfully"
+                failed = []
+                for r in result["results"]:
+                    if not r["success"]:
+                        payload = payloads[r["index"]]
+                        recipient = payload.get("to") if isinstance(payload, dict) else None
+                        failed.append(f"{recipient or r['index']} ({r.get('error') or r.get('status_code')})")
+                if failed:
+                    message += f". ❌ Failed: {failed}"
+                return message
+            except Exception as e:
+                return f"❌ Error: {str(e)}"
+        
+        @tool(return_direct=True)
+        def queue_workflow(workflow_id: str, data: Optional[dict] = None) -> str:
+            """Queue an n8n workflow trigger for background delivery and return a ticket id.
+
+            Args:
+                workflow_id: Full webhook URL or workflow path (e.g., "send-email")
+                data: Data to send to workflow
+            """
+            try:
+                result = self.n8n_mcp.trigger_workflow_async(resolve_workflow_id(workflow_id), data)
+                return f"📨 Workflow queued. Ticket id: {result['ticket_id']}"
+            except Exception as e:
+                return f"❌ Error: {str(e)}"
+        
+        @tool(return_direct=True)
+        def check_workflow_status(ticket_id: str) -> str:
+            """Check delivery status of a queued workflow trigger by ticket id."""
+            try:
+                status = self.n8n_mcp.get_dispatch_status(ticket_id)
+                if status["status"] == "delivered":
+                    return f"✅ Delivered after {status['attempts']} attempt(s): {status['response'].get('data')}"
+                if status["status"] == "dead":
+                    return f"❌ Delivery failed after {status['attempts']} attempts: {status['last_error']}"
+                if status["status"] == "unknown":
+                    return f"❌ Unknown ticket id: {ticket_id}"
+                return f"⏳ {status['status'].capitalize()} (attempts: {status['attempts']})"
+            except Exception as e:
+                return f"❌ Error: {str(e)}"
+        
+        @tool(return_direct=True)
         def test_connection() -> str:
             """Test connection to n8n instance."""
             try:
@@ -92,42 +172,17 @@ Examples:
             except Exception as e:
                 return f"❌ Error: {str(e)}"
         
-        return [trigger_workflow, test_connection]
+        return [trigger_workflow, trigger_workflow_bulk, queue_workflow, check_workflow_status, test_connection]
     
-    def execute(self, query: str) -> Dict[str, Any]:
+    def execute(self, query: str, history: Optional[List[Any]] = None) -> Dict[str, Any]:
         """Execute an n8n operation."""
         try:
-            response = self.llm_with_tools.invoke(self.prompt.format(input=query))
-            
-            if hasattr(response, 'tool_calls') and response.tool_calls:
-                tool_results = []
-                for tool_call in response.tool_calls:
-                    tool_name = tool_call.get("name", "")
-                    tool_args = tool_call.get("args", {})
-                    
-                    for tool in self.tools:
-                        if tool.name == tool_name:
-                            result = tool.invoke(tool_args)
-                            tool_results.append(f"{tool_name}: {result}")
-                            break
-                
-                final_prompt = ChatPromptTemplate.from_messages([
-                    ("system", "You are an n8n assistant. Summarize the tool results."),
-                    ("human", f"User asked: {query}\n\nTool results: {', '.join(tool_results)}"),
-                ])
-                final_response = (final_prompt | self.llm | StrOutputParser()).invoke({})
-                
-                return {
-                    "result": final_response,
-                    "agent": "n8n",
-                    "success": True,
-                }
-            else:
-                return {
-                    "result": response.content if hasattr(response, 'content') else str(response),
-                    "agent": "n8n",
-                    "success": True,
-                }
+            result = answer_with_tools(self.llm_with_tools, self.prefix, self.tools, query, history)
+            return {
+                "result": result,
+                "agent": "n8n",
+                "success": True,
+            }
         except Exception as e:
             return {
                 "result": f"Error: {str(e)}. n8n may not be configured. See SETUP.md for instructions.",
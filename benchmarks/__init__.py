@@ -0,0 +1 @@
+"""Benchmark suite run against local stand-ins for DeepSeek, GitHub, Drive and n8n."""
@@ -0,0 +1,279 @@
+"""Run the benchmark suite and compare against a stored baseline.
+
+    python -m benchmarks.run                         # all scenarios
+    python -m benchmarks.run agent.github -n 50      # selected scenarios
+    python -m benchmarks.run --save-baseline         # record a new baseline
+
+Exits with status 1 when a scenario fails or its p50/p95 latency is worse
+than the baseline by more than the tolerance.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from benchmarks.stubs import FakeDrive, FakeLLM, MockGitHub, N8nEcho
+
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# Options that change the numbers; baselines are only comparable when they match
+COMPARABLE_SETTINGS = ("llm_latency_ms", "service_latency_ms", "concurrency", "ml_rows")
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def configure_environment(llm: FakeLLM, github: MockGitHub, n8n: N8nEcho, workdir: Path) -> None:
+    """
+    Point every setting at the stand-ins and a scratch directory.
+
+    Must run before project modules are imported, since the settings file
+    location and .env are read at import.
+    """
+    os.environ.update({
+        "CONFIG_FILE": str(workdir / "settings.json"),
+        "DEEPSEEK_API_KEY": "sk-benchmark",
+        "DEEPSEEK_API_BASE": f"{llm.url}/v1",
+        "GITHUB_TOKEN": "benchmark-token",
+        "GITHUB_API_BASE": github.url,
+        "N8N_WEBHOOK_BASE_URL": f"{n8n.url}/webhook",
+        "N8N_WEBHOOK_TOKEN": "",
+        "N8N_DEDUP_PATH": str(workdir / "n8n_dedup.db"),
+        "N8N_QUEUE_PATH": str(workdir / "n8n_queue.db"),
+        "DRIVE_INDEX_PATH": str(workdir / "drive_index.db"),
+        "MODEL_STORAGE_PATH": str(workdir / "models"),
+        "DATASET_CACHE_DIR": str(workdir / "dataset_search"),
+        "DATASET_CATALOG_PATH": str(workdir / "dataset_catalog.db"),
+        "DATASET_CATALOG_DIR": str(workdir / "datasets"),
+        "DATASET_DOWNLOAD_DIR": str(workdir / "dataset_downloads"),
+        "SYNTHETIC_DATA_DIR": str(workdir / "synthetic"),
+        "TRACE_EXPORTERS": "",
+        # Scenarios repeat the same query; time the runs, not the reuse window
+        "QUERY_COALESCE_WINDOW": "0",
+    })
+
+
+def _outcome(fn: Callable[[], Any]) -> Tuple[float, Optional[str]]:
+    """Time one call; agents report failures in the result rather than raising."""
+    start = time.perf_counter()
+    try:
+        result = fn()
+        error = None
+        if isinstance(result, dict) and result.get("success") is False:
+            error = str(result.get("error") or result.get("result") or result)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return time.perf_counter() - start, error
+
+
+def run_scenario(fn: Callable[[], Any], iterations: int, warmup: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Time a scenario.
+
+    Args:
+        fn: Callable returned by the scenario setup
+        iterations: Timed calls
+        warmup: Untimed calls first (connection pools, lazy clients)
+        concurrency: Calls in flight at once
+
+    Returns:
+        Latency percentiles (ms), throughput (calls/s) and errors
+    """
+    for _ in range(warmup):
+        fn()
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(lambda _: _outcome(fn), range(iterations)))
+    else:
+        outcomes = [_outcome(fn) for _ in range(iterations)]
+    wall = time.perf_counter() - start
+
+    latencies = sorted(duration * 1000 for duration, _ in outcomes)
+    errors = [error for _, error in outcomes if error]
+    return {
+        "iterations": iterations,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(_percentile(latencies, 0.5), 3),
+        "p95_ms": round(_percentile(latencies, 0.95), 3),
+        "p99_ms": round(_percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput": round(iterations / wall, 3),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    min_delta_ms: float
+) -> List[str]:
+    """
+    Find scenarios slower than the baseline.
+
+    Args:
+        results: Current results per scenario
+        baseline: Stored baseline report
+        tolerance: Allowed relative slowdown (0.25 = 25%)
+        min_delta_ms: Ignore slowdowns smaller than this, which are noise
+
+    Returns:
+        One message per regression
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            limit = previous[key] * (1 + tolerance)
+            if result[key] > limit and result[key] - previous[key] >= min_delta_ms:
+                regressions.append(
+                    f"{name} {key[:3]}: {result[key]:.1f} ms vs baseline {previous[key]:.1f} ms "
+                    f"(+{(result[key] / previous[key] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the orchestrator, agents and ML pipeline against local stand-ins")
+    parser.add_argument("scenarios", nargs="*", help="Scenarios to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="List scenarios and exit")
+    parser.add_argument("-n", "--iterations", type=int, help="Timed calls per scenario (default: 20, fewer for slow ones)")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Calls in flight at once")
+    parser.add_argument("--llm-latency-ms", type=float, default=50, help="Latency of each fake LLM response")
+    parser.add_argument("--service-latency-ms", type=float, default=10, help="Latency of GitHub/Drive/n8n stand-ins")
+    parser.add_argument("--ml-rows", type=int, default=2000, help="Rows in the synthetic training dataset")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore smaller slowdowns")
+    parser.add_argument("--json", dest="json_path", help="Write the full report to this file")
+    args = parser.parse_args()
+
+    llm = FakeLLM(latency=args.llm_latency_ms / 1000)
+    service_latency = args.service_latency_ms / 1000
+    github = MockGitHub(latency=service_latency)
+    drive = FakeDrive(latency=service_latency)
+    n8n = N8nEcho(latency=service_latency)
+    workdir = Path(tempfile.mkdtemp(prefix="clickai-bench-"))
+    configure_environment(llm, github, n8n, workdir)
+
+    # Project modules are imported only now that settings point at the stand-ins
+    from benchmarks.scenarios import SCENARIOS, BenchmarkEnv
+
+    if args.list:
+        for name, entry in SCENARIOS.items():
+            print(f"{name:<24} {entry['description']}")
+        return 0
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (see --list)")
+        return 2
+
+    env = BenchmarkEnv(llm, github, drive, n8n, workdir, args.ml_rows)
+    results: Dict[str, Dict[str, Any]] = {}
+    print(
+        f"{'scenario':<24}  {'iter':>5}  {'err':>4}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}  "
+        f"{'ops/s':>8}  {'cached':>7}"
+    )
+    for name in args.scenarios or list(SCENARIOS):
+        entry = SCENARIOS[name]
+        iterations = args.iterations or entry["iterations"] or 20
+        try:
+            fn = entry["setup"](env)
+            prompt_tokens, cached_tokens = llm.prompt_tokens, llm.cached_tokens
+            result = run_scenario(fn, iterations, args.warmup, args.concurrency)
+            # Share of the scenario's prompt tokens served from the context cache
+            prompt_tokens = llm.prompt_tokens - prompt_tokens
+            result["llm_cache_hit_ratio"] = (
+                round((llm.cached_tokens - cached_tokens) / prompt_tokens, 3) if prompt_tokens else None
+            )
+        except Exception as e:
+            result = {"iterations": 0, "errors": 1, "first_error": f"setup failed: {type(e).__name__}: {e}"}
+            print(f"{name:<24}  {'-':>5}  {1:>4}  {result['first_error']}")
+            results[name] = result
+            continue
+        results[name] = result
+        ratio = result["llm_cache_hit_ratio"]
+        print(
+            f"{name:<24}  {result['iterations']:>5}  {result['errors']:>4}  {result['p50_ms']:>9.1f}  "
+            f"{result['p95_ms']:>9.1f}  {result['p99_ms']:>9.1f}  {result['throughput']:>8.1f}  "
+            f"{f'{ratio:.0%}' if ratio is not None else '-':>7}"
+        )
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": {
+            "llm_latency_ms": args.llm_latency_ms,
+            "service_latency_ms": args.service_latency_ms,
+            "concurrency": args.concurrency,
+            "ml_rows": args.ml_rows,
+            "warmup": args.warmup,
+        },
+        "scenarios": results,
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failed = {name: result for name, result in results.items() if result["errors"]}
+    for name, result in failed.items():
+        print(f"\nFAILED {name}: {result['errors']} error(s), first: {result['first_error']}")
+
+    if args.save_baseline:
+        if failed:
+            print("\nBaseline not saved: fix the failing scenarios first")
+            return 1
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; record one with --save-baseline")
+        return 1 if failed else 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    mismatched = [
+        key for key in COMPARABLE_SETTINGS
+        if baseline.get("settings", {}).get(key) != report["settings"][key]
+    ]
+    if mismatched:
+        print(f"\nWarning: Baseline was recorded with different {', '.join(mismatched)}; comparison may be meaningless")
+
+    regressions = compare(
+        {name: result for name, result in results.items() if name not in failed},
+        baseline,
+        args.tolerance,
+        args.min_delta_ms,
+    )
+    if regressions:
+        print(f"\nREGRESSIONS against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for regression in regressions:
+            print(f"  {regression}")
+    elif not failed:
+        print(f"\nNo regressions against {args.baseline}")
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
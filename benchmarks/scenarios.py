@@ -0,0 +1,238 @@
+"""Benchmark scenarios.
+
+Each scenario's setup runs once against the stand-ins and returns the
+callable that is timed. Import this module only after the environment
+points the settings at the stand-ins (see benchmarks.run).
+"""
+
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import itertools
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.discovery import build
+from orchestrator.graph import process_query
+from utils.memory import ConversationMemory
+from agents.chat_agent import ChatAgent
+from agents.github_agent import GitHubAgent
+from agents.drive_agent import DriveAgent
+from agents.n8n_agent import N8NAgent
+from agents.ml_agent import MLAgent
+from mcp_servers.drive_mcp import get_drive_mcp
+from ml_models.trainer import AutoTrainer
+from ml_models.model_manager import ModelManager
+from ml_models.synthetic import SALARY_SCHEMA, SyntheticDataGenerator
+from benchmarks.stubs import FakeDrive, FakeLLM, MockGitHub, N8nEcho
+
+
+SALARY_FEATURES = {
+    "experience_years": 5,
+    "education_level": "Master",
+    "company_size": "Large",
+    "location": "Urban",
+}
+
+
+class BenchmarkEnv:
+    """Stand-ins and options shared by the scenarios."""
+
+    def __init__(self, llm: FakeLLM, github: MockGitHub, drive: FakeDrive, n8n: N8nEcho, workdir: Path, ml_rows: int):
+        self.llm = llm
+        self.github = github
+        self.drive = drive
+        self.n8n = n8n
+        self.workdir = workdir
+        self.ml_rows = ml_rows
+        self._datasets: Dict[str, str] = {}
+        self._trained: Optional[Dict[str, Any]] = None
+
+    def dataset(self, file_format: str = "csv") -> str:
+        """Synthetic salary dataset, generated once per format."""
+        if file_format not in self._datasets:
+            generator = SyntheticDataGenerator(self.workdir / "synthetic")
+            self._datasets[file_format] = generator.generate(
+                SALARY_SCHEMA, self.ml_rows, file_format=file_format
+            )["path"]
+        return self._datasets[file_format]
+
+    def trained(self) -> Dict[str, Any]:
+        """Trainer and training results for the dataset, trained once."""
+        if self._trained is None:
+            trainer = AutoTrainer()
+            self._trained = {"trainer": trainer, **trainer.train_model(self.dataset(), "salary")}
+        return self._trained
+
+    def connect_drive(self) -> None:
+        """Point the shared Drive client at the stand-in, skipping OAuth."""
+        drive_mcp = get_drive_mcp()
+        drive_mcp._service = build(
+            "drive", "v3",
+            credentials=AnonymousCredentials(),
+            static_discovery=True,
+            cache_discovery=False,
+            client_options={"api_endpoint": f"{self.drive.url}/"},
+        )
+        drive_mcp._initialized = True
+        drive_mcp._auth_attempted = True
+
+
+# Registered scenarios: name -> setup, default iterations, description
+SCENARIOS: Dict[str, Dict[str, Any]] = {}
+
+
+def scenario(name: str, iterations: Optional[int] = None):
+    """
+    Register a scenario setup.
+
+    Args:
+        name: Scenario name
+        iterations: Default iterations, for scenarios much slower than the rest
+    """
+    def register(setup: Callable[[BenchmarkEnv], Callable[[], Any]]):
+        SCENARIOS[name] = {
+            "setup": setup,
+            "iterations": iterations,
+            "description": (setup.__doc__ or "").strip(),
+        }
+        return setup
+    return register
+
+
+@scenario("process_query.chat")
+def process_query_chat(env: BenchmarkEnv):
+    """Full graph: router, chat node, one LLM call."""
+    env.llm.plan({})
+    return lambda: process_query("What is machine learning?")
+
+
+@scenario("process_query.github")
+def process_query_github(env: BenchmarkEnv):
+    """Full graph: router, GitHub node, tool selection, list_repos, summary."""
+    env.llm.plan({"list_repos": {}})
+    return lambda: process_query("List my GitHub repositories")
+
+
+@scenario("process_query.memory")
+def process_query_memory(env: BenchmarkEnv):
+    """Full graph with conversation memory (history, background summarization)."""
+    env.llm.plan({})
+    memory = ConversationMemory()
+    return lambda: process_query("What is machine learning?", memory=memory)
+
+
+@scenario("process_query.fanout")
+def process_query_fanout(env: BenchmarkEnv):
+    """Full graph: GitHub and ML nodes in parallel for a compound query, then merge."""
+    env.llm.plan({"list_repos": {}, "list_models": {}})
+    return lambda: process_query("List my GitHub repositories and list all trained models")
+
+
+@scenario("process_query.burst")
+def process_query_burst(env: BenchmarkEnv):
+    """Eight identical concurrent queries, coalesced into one run."""
+    env.llm.plan({"list_repos": {}})
+    executor = ThreadPoolExecutor(max_workers=8)
+    counter = itertools.count()
+
+    def burst():
+        # A new query per iteration, shared by the eight callers
+        query = f"List my GitHub repositories ({next(counter)})"
+        return [future.result() for future in [executor.submit(process_query, query) for _ in range(8)]]
+    return burst
+
+
+@scenario("agent.chat")
+def agent_chat(env: BenchmarkEnv):
+    """ChatAgent.answer."""
+    env.llm.plan({})
+    agent = ChatAgent()
+    return lambda: agent.answer("What is machine learning?")
+
+
+@scenario("agent.github")
+def agent_github(env: BenchmarkEnv):
+    """GitHubAgent.execute with list_repos."""
+    env.llm.plan({"list_repos": {}})
+    agent = GitHubAgent()
+    return lambda: agent.execute("List my repositories")
+
+
+@scenario("agent.github.multistep")
+def agent_github_multistep(env: BenchmarkEnv):
+    """GitHubAgent.execute: list_repos, then get_repo_info and list_files in parallel."""
+    env.llm.plan(
+        {"list_repos": {}},
+        {"get_repo_info": {"repo_name": "repo-0"}, "list_files": {"repo_name": "repo-0"}},
+    )
+    agent = GitHubAgent()
+    return lambda: agent.execute("Show info and files of my first repository")
+
+
+@scenario("agent.drive")
+def agent_drive(env: BenchmarkEnv):
+    """DriveAgent.execute with list_files."""
+    env.connect_drive()
+    env.llm.plan({"list_files": {"max_results": 20}})
+    agent = DriveAgent()
+    return lambda: agent.execute("List files in my Drive")
+
+
+@scenario("agent.n8n")
+def agent_n8n(env: BenchmarkEnv):
+    """N8NAgent.execute with trigger_workflow (dedup bypassed, answers directly)."""
+    env.llm.plan({
+        "trigger_workflow": {
+            "workflow_id": "bench",
+            "data": {"to": "bench@example.com", "subject": "Benchmark", "body": "Hello"},
+            "force": True,
+        },
+    })
+    agent = N8NAgent()
+    return lambda: agent.execute("Trigger workflow bench")
+
+
+@scenario("agent.ml")
+def agent_ml(env: BenchmarkEnv):
+    """MLAgent.execute with list_models."""
+    env.llm.plan({"list_models": {}})
+    agent = MLAgent()
+    return lambda: agent.execute("List all trained models")
+
+
+@scenario("trainer.train_model", iterations=5)
+def trainer_train_model(env: BenchmarkEnv):
+    """AutoTrainer.train_model on the synthetic salary dataset."""
+    dataset = env.dataset()
+    trainer = AutoTrainer()
+    return lambda: trainer.train_model(dataset, "salary")
+
+
+@scenario("trainer.train_parquet", iterations=5)
+def trainer_train_model_parquet(env: BenchmarkEnv):
+    """AutoTrainer.train_model on the synthetic salary dataset written as Parquet."""
+    dataset = env.dataset("parquet")
+    trainer = AutoTrainer()
+    return lambda: trainer.train_model(dataset, "salary")
+
+
+@scenario("trainer.predict")
+def trainer_predict(env: BenchmarkEnv):
+    """AutoTrainer.predict for one row."""
+    trained = env.trained()
+    return lambda: trained["trainer"].predict(trained["model"], SALARY_FEATURES, trained["feature_names"])
+
+
+@scenario("model_manager.save")
+def model_manager_save(env: BenchmarkEnv):
+    """ModelManager.save_model of the trained model."""
+    trained = env.trained()
+    manager = ModelManager()
+    return lambda: manager.save_model(trained["model"], "bench_save", {"score": trained["score"]})
+
+
+@scenario("model_manager.load")
+def model_manager_load(env: BenchmarkEnv):
+    """ModelManager.load_model of the trained model."""
+    manager = ModelManager()
+    manager.save_model(env.trained()["model"], "bench_load")
+    return lambda: manager.load_model("bench_load")
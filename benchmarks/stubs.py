@@ -0,0 +1,304 @@
+"""Local stand-ins for the external services the agents talk to.
+
+Each stand-in is a threaded HTTP server on 127.0.0.1 with a configurable
+per-request latency, so benchmarks exercise the real clients (ChatOpenAI,
+PyGithub, googleapiclient, requests) without touching the network.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import json
+import threading
+import time
+import uuid
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def _dispatch(self):
+        stub: StubServer = self.server.stub
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            body = raw
+        parts = urlsplit(self.path)
+
+        with stub._lock:
+            stub.requests += 1
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        status, payload = stub.respond(self.command, parts.path, parse_qs(parts.query), body)
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Local HTTP stand-in for an external service."""
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Start the server in a background thread.
+
+        Args:
+            latency: Seconds added to every request
+        """
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, method: str, path: str, query: Dict[str, List[str]], body: Any) -> Tuple[int, Any]:
+        """
+        Build the response for a request.
+
+        Returns:
+            Status code and JSON payload
+        """
+        raise NotImplementedError
+
+
+class FakeLLM(StubServer):
+    """OpenAI-compatible chat completions endpoint with scripted tool calls.
+
+    The plan is a list of steps, each mapping tool names to arguments. The
+    reply to a request calls all tools of the next step (as parallel tool
+    calls) that the request offers; once the steps are used up, no planned
+    tool is offered, or tool_choice is "none", it answers with plain text. Usage reports DeepSeek-style
+    prompt_cache_hit_tokens from the longest prefix shared with an earlier
+    prompt, in 64-token units, at roughly four characters per token.
+    """
+
+    CACHE_UNIT = 64
+
+    def __init__(self, latency: float = 0.0, answer: str = "Done."):
+        super().__init__(latency)
+        self.answer = answer
+        self.tool_plan: List[Dict[str, Dict[str, Any]]] = []
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self._prompts: List[str] = []
+
+    def plan(self, *steps: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Set the tool calls to make when those tools are offered.
+
+        Args:
+            steps: Per step, tool name to call arguments
+        """
+        self.tool_plan = [dict(step) for step in steps if step]
+
+    def _cached_tokens(self, prompt: str) -> int:
+        with self._lock:
+            shared = 0
+            for previous in self._prompts:
+                limit = min(len(previous), len(prompt))
+                index = 0
+                while index < limit and previous[index] == prompt[index]:
+                    index += 1
+                shared = max(shared, index)
+            self._prompts.append(prompt)
+            del self._prompts[:-256]
+        return (shared // 4) // self.CACHE_UNIT * self.CACHE_UNIT
+
+    def respond(self, method, path, query, body):
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"Unknown endpoint {path}"}}
+
+        messages = body.get("messages", [])
+        tools = [tool["function"]["name"] for tool in body.get("tools") or []]
+        # Tool schemas come first, as they are rendered into the system prompt
+        prompt = json.dumps(body.get("tools") or [], sort_keys=True) + json.dumps(messages, sort_keys=True)
+
+        # Steps already taken in this conversation
+        step = sum(1 for m in messages if m.get("role") == "assistant" and m.get("tool_calls"))
+        if step < len(self.tool_plan) and body.get("tool_choice") != "none":
+            calls = [(name, args) for name, args in self.tool_plan[step].items() if name in tools]
+        else:
+            calls = []
+        if calls:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:12]}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": json.dumps(args)},
+                    }
+                    for name, args in calls
+                ],
+            }
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": self.answer}
+            finish_reason = "stop"
+
+        prompt_tokens = max(1, len(prompt) // 4)
+        cached = min(self._cached_tokens(prompt), prompt_tokens)
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached
+        completion_tokens = max(1, len(json.dumps(message)) // 4)
+        return 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "deepseek-chat"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_cache_hit_tokens": cached,
+                "prompt_cache_miss_tokens": prompt_tokens - cached,
+            },
+        }
+
+
+class MockGitHub(StubServer):
+    """Subset of the GitHub REST API used by GitHubMCPServer."""
+
+    LOGIN = "bench-user"
+
+    def __init__(self, latency: float = 0.0, n_repos: int = 30):
+        super().__init__(latency)
+        self.repos = {f"repo-{i}": self._repo(f"repo-{i}") for i in range(n_repos)}
+
+    def _user(self) -> Dict[str, Any]:
+        return {
+            "login": self.LOGIN,
+            "id": 1,
+            "type": "User",
+            "url": f"{self.url}/users/{self.LOGIN}",
+            "html_url": f"https://github.com/{self.LOGIN}",
+        }
+
+    def _repo(self, name: str, description: Optional[str] = None, private: bool = False) -> Dict[str, Any]:
+        full_name = f"{self.LOGIN}/{name}"
+        return {
+            "id": abs(hash(full_name)) % 10 ** 9,
+            "name": name,
+            "full_name": full_name,
+            "description": description or f"Benchmark repository {name}",
+            "private": private,
+            "language": "Python",
+            "stargazers_count": 3,
+            "forks_count": 1,
+            "default_branch": "main",
+            "owner": self._user(),
+            "url": f"{self.url}/repos/{full_name}",
+            "html_url": f"https://github.com/{full_name}",
+        }
+
+    def _content(self, repo: str, path: str) -> Dict[str, Any]:
+        return {
+            "type": "file",
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "size": 128,
+            "sha": uuid.uuid5(uuid.NAMESPACE_URL, f"{repo}/{path}").hex,
+            "url": f"{self.url}/repos/{self.LOGIN}/{repo}/contents/{path}",
+            "html_url": f"https://github.com/{self.LOGIN}/{repo}/blob/main/{path}",
+        }
+
+    def respond(self, method, path, query, body):
+        segments = [segment for segment in path.split("/") if segment]
+
+        if segments == ["user"]:
+            return 200, self._user()
+        if segments in (["user", "repos"], ["users", self.LOGIN, "repos"]):
+            if method == "POST":
+                repo = self._repo(body["name"], body.get("description"), body.get("private", False))
+                self.repos[body["name"]] = repo
+                return 201, repo
+            return 200, list(self.repos.values())
+        if len(segments) >= 3 and segments[0] == "repos" and segments[2] in self.repos:
+            name = segments[2]
+            if len(segments) == 3:
+                return 200, self.repos[name]
+            if segments[3] == "contents":
+                file_path = "/".join(segments[4:])
+                if method == "PUT":
+                    return 201, {"content": self._content(name, file_path), "commit": {"sha": uuid.uuid4().hex}}
+                if file_path:
+                    return 200, self._content(name, file_path)
+                return 200, [self._content(name, f) for f in ("README.md", "main.py", "requirements.txt")]
+
+        return 404, {"message": "Not Found"}
+
+
+class FakeDrive(StubServer):
+    """Subset of the Drive v3 files API used by DriveMCPServer."""
+
+    def __init__(self, latency: float = 0.0, n_files: int = 50):
+        super().__init__(latency)
+        self.files = {
+            f"file{i}": {
+                "id": f"file{i}",
+                "name": f"report-{i}.csv",
+                "mimeType": "text/csv",
+                "size": str(1024 * (i + 1)),
+                "modifiedTime": "2024-01-01T00:00:00.000Z",
+                "webViewLink": f"https://drive.google.com/file/d/file{i}/view",
+            }
+            for i in range(n_files)
+        }
+
+    def respond(self, method, path, query, body):
+        segments = [segment for segment in path.split("/") if segment]
+        if segments[:3] != ["drive", "v3", "files"]:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+        if len(segments) == 3:
+            if method == "POST":
+                file_id = uuid.uuid4().hex[:16]
+                self.files[file_id] = {"id": file_id, **(body or {})}
+                return 200, self.files[file_id]
+            page_size = int(query.get("pageSize", ["100"])[0])
+            start = int(query.get("pageToken", ["0"])[0] or 0)
+            files = list(self.files.values())
+            page = {"files": files[start:start + page_size]}
+            if start + page_size < len(files):
+                page["nextPageToken"] = str(start + page_size)
+            return 200, page
+
+        file = self.files.get(segments[3])
+        if file is None:
+            return 404, {"error": {"code": 404, "message": "File not found"}}
+        return 200, file
+
+
+class N8nEcho(StubServer):
+    """n8n webhook stand-in that echoes the payload back."""
+
+    def respond(self, method, path, query, body):
+        if method == "GET":
+            return 200, {"status": "ok"}
+        return 200, {"success": True, "message": "Workflow received", "received": body}
@@ -2,7 +2,9 @@
 
 import streamlit as st
 from orchestrator.graph import process_query
-from utils.config import config
+from utils.config import config, config_service
+from utils.memory import ConversationMemory
+from utils.metrics import start_metrics_server
 
 # Page config
 st.set_page_config(
@@ -11,9 +13,18 @@ st.set_page_config(
     layout="wide"
 )
 
+# Pick up edits to the settings file (a single stat call per rerun)
+config_service.reload_if_changed()
+
+# Metrics endpoint beside the app; started once per process
+if config.METRICS_PORT:
+    start_metrics_server(config.METRICS_PORT, config.METRICS_HOST)
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "memory" not in st.session_state:
+    st.session_state.memory = ConversationMemory()
 if "config_validated" not in st.session_state:
     try:
         config.validate()
@@ -54,10 +65,10 @@ def main():
             st.markdown("**Agent Status:**")
             col1, col2, col3 = st.columns(3)
             with col1:
-                github_status = "✅" if (st.session_state.get("user_GITHUB_TOKEN") or config.GITHUB_TOKEN) else "❌"
+                github_status = "✅" if config.GITHUB_TOKEN else "❌"
                 st.markdown(f"GitHub: {github_status}")
             with col2:
-                n8n_status = "✅" if (st.session_state.get("user_N8N_WEBHOOK_BASE_URL") or config.N8N_WEBHOOK_BASE_URL) else "❌"
+                n8n_status = "✅" if config.N8N_WEBHOOK_BASE_URL else "❌"
                 st.markdown(f"n8n: {n8n_status}")
             with col3:
                 drive_status = "⚠️"  # Complex setup
@@ -73,22 +84,20 @@ def main():
                 """)
                 github_token = st.text_input(
                     "GitHub Token",
-                    value=st.session_state.get("user_GITHUB_TOKEN", config.GITHUB_TOKEN or ""),
+                    value=config.GITHUB_TOKEN,
                     type="password",
                     help="Get token from: https://github.com/settings/tokens"
                 )
                 github_username = st.text_input(
                     "GitHub Username",
-                    value=st.session_state.get("user_GITHUB_USERNAME", config.GITHUB_USERNAME or ""),
+                    value=config.GITHUB_USERNAME,
                     help="Your GitHub username"
                 )
                 if st.button("💾 Save GitHub", use_container_width=True):
-                    st.session_state.user_GITHUB_TOKEN = github_token
-                    st.session_state.user_GITHUB_USERNAME = github_username
-                    # Force reload by clearing cache
-                    import mcp_servers.github_mcp as github_mcp_module
-                    github_mcp_module._github_mcp = None
-                    github_mcp_module._last_github_token = None
+                    config_service.set_session({
+                        "GITHUB_TOKEN": github_token,
+                        "GITHUB_USERNAME": github_username,
+                    })
                     st.success("GitHub credentials saved! Try using GitHub agent now.")
                     st.rerun()
             
@@ -114,23 +123,22 @@ def main():
                 """)
                 n8n_url = st.text_input(
                     "n8n Webhook URL (Full URL hoặc Base URL)",
-                    value=st.session_state.get("user_N8N_WEBHOOK_BASE_URL", config.N8N_WEBHOOK_BASE_URL or ""),
+                    value=config.N8N_WEBHOOK_BASE_URL,
                     help="Full URL: https://your-n8n.cloud/webhook/send-email HOẶC Base: https://your-n8n.cloud",
                     placeholder="https://gavinpham.app.n8n.cloud/webhook/send-email"
                 )
                 n8n_token = st.text_input(
                     "n8n Token (optional)",
-                    value=st.session_state.get("user_N8N_WEBHOOK_TOKEN", config.N8N_WEBHOOK_TOKEN or ""),
+                    value=config.N8N_WEBHOOK_TOKEN,
                     type="password",
                     help="Optional authentication token"
                 )
                 if st.button("💾 Save n8n", use_container_width=True):
-                    st.session_state.user_N8N_WEBHOOK_BASE_URL = n8n_url
-                    st.session_state.user_N8N_WEBHOOK_TOKEN = n8n_token
-                    # Force reload by clearing cache
-                    import mcp_servers.n8n_mcp as n8n_mcp_module
-                    n8n_mcp_module._n8n_mcp = None
-                    n8n_mcp_module._last_n8n_url = None
+                    # Subscribers rebuild the n8n client on change
+                    config_service.set_session({
+                        "N8N_WEBHOOK_BASE_URL": n8n_url,
+                        "N8N_WEBHOOK_TOKEN": n8n_token,
+                    })
                     st.success("n8n credentials saved! Try using n8n agent now.")
                     st.rerun()
             
@@ -185,13 +193,10 @@ def main():
             with st.expander("Clear All Settings", expanded=False):
                 st.warning("This will clear all user-entered credentials from this session.")
                 if st.button("🗑️ Clear All", use_container_width=True):
-                    keys_to_clear = [
-                        "user_GITHUB_TOKEN", "user_GITHUB_USERNAME",
-                        "user_N8N_WEBHOOK_BASE_URL", "user_N8N_WEBHOOK_TOKEN"
-                    ]
-                    for key in keys_to_clear:
-                        if key in st.session_state:
-                            del st.session_state[key]
+                    config_service.clear_session([
+                        "GITHUB_TOKEN", "GITHUB_USERNAME",
+                        "N8N_WEBHOOK_BASE_URL", "N8N_WEBHOOK_TOKEN"
+                    ])
                     st.success("Settings cleared!")
                     st.rerun()
             
@@ -248,7 +253,7 @@ def main():
         with st.chat_message("assistant"):
             with st.spinner("Đang xử lý..."):
                 try:
-                    result = process_query(prompt)
+                    result = process_query(prompt, memory=st.session_state.memory)
                     
                     # Display result
                     response = result.get("result", "No response")
@@ -279,6 +284,7 @@ def main():
     # Clear chat button
     if st.button("🗑️ Clear Chat"):
         st.session_state.messages = []
+        st.session_state.memory.clear()
         st.rerun()
 
 
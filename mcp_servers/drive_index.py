@@ -0,0 +1,319 @@
+"""Local SQLite mirror of Google Drive metadata, kept current via the Changes API."""
+
+from typing import Dict, List, Any, Optional, Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+import hashlib
+import sqlite3
+import threading
+import time
+from utils.config import config
+
+
+# File fields mirrored locally
+INDEX_FIELDS = ['id', 'name', 'mimeType', 'size', 'modifiedTime', 'webViewLink', 'parents', 'trashed']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    mime_type TEXT,
+    size INTEGER,
+    modified_time TEXT,
+    url TEXT
+);
+CREATE TABLE IF NOT EXISTS parents (
+    file_id TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    PRIMARY KEY (file_id, parent_id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_name ON files (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_files_mime_type ON files (mime_type);
+CREATE INDEX IF NOT EXISTS idx_files_modified_time ON files (modified_time);
+CREATE INDEX IF NOT EXISTS idx_parents_parent_id ON parents (parent_id);
+"""
+
+
+class DriveIndex:
+    """Local metadata index of Google Drive files."""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """
+        Initialize Drive index.
+
+        Args:
+            db_path: SQLite database path (default: DRIVE_INDEX_PATH)
+        """
+        self.db_path = Path(db_path or config.DRIVE_INDEX_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # Guards the connection; held per transaction, never across API calls
+        self._lock = threading.Lock()
+        # Serializes syncs, so searches can run while one fetches from Drive
+        self._sync_lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+        # Background sync started by sync_in_background, if running
+        self._background: Optional[threading.Thread] = None
+        self._background_lock = threading.Lock()
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def _upsert(self, files: Iterable[Dict[str, Any]]) -> int:
+        rows = []
+        parent_rows = []
+        removed = []
+        for file in files:
+            if file.get('trashed'):
+                removed.append(file['id'])
+                continue
+            rows.append((
+                file['id'],
+                file.get('name', ''),
+                file.get('mimeType'),
+                int(file['size']) if file.get('size') else None,
+                file.get('modifiedTime'),
+                file.get('webViewLink'),
+            ))
+            parent_rows.extend((file['id'], parent) for parent in file.get('parents', []))
+
+        self._delete(removed)
+        self._conn.executemany(
+            "DELETE FROM parents WHERE file_id = ?", [(row[0],) for row in rows]
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO files (id, name, mime_type, size, modified_time, url) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO parents (file_id, parent_id) VALUES (?, ?)", parent_rows
+        )
+        return len(rows)
+
+    def _delete(self, file_ids: List[str]) -> None:
+        params = [(file_id,) for file_id in file_ids]
+        self._conn.executemany("DELETE FROM files WHERE id = ?", params)
+        self._conn.executemany("DELETE FROM parents WHERE file_id = ?", params)
+
+    def sync(self, drive) -> Dict[str, Any]:
+        """
+        Bring the index up to date.
+
+        The first sync crawls all files; later syncs only fetch changes
+        since the saved start page token.
+
+        Args:
+            drive: Initialized DriveMCPServer
+
+        Returns:
+            Sync statistics
+        """
+        with self._sync_lock:
+            with self._lock:
+                token = self._get_state("start_page_token")
+            if token is None:
+                stats = self._full_sync(drive)
+            else:
+                stats = self._incremental_sync(drive, token)
+            with self._lock, self._conn:
+                self._set_state("last_sync_at", str(time.time()))
+            return stats
+
+    def _full_sync(self, drive) -> Dict[str, Any]:
+        # Take the token first so changes made during the crawl are replayed
+        token = drive.service.changes().getStartPageToken(supportsAllDrives=True).execute()['startPageToken']
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("DELETE FROM parents")
+
+        indexed = 0
+        page = []
+        for file in drive.iter_files(fields=INDEX_FIELDS, corpora='allDrives'):
+            page.append(file)
+            if len(page) >= 1000:
+                with self._lock, self._conn:
+                    indexed += self._upsert(page)
+                page = []
+        with self._lock, self._conn:
+            indexed += self._upsert(page)
+            self._set_state("start_page_token", token)
+
+        return {"mode": "full", "indexed": indexed}
+
+    def _incremental_sync(self, drive, token: str) -> Dict[str, Any]:
+        updated = 0
+        removed = 0
+        while token:
+            response = drive.service.changes().list(
+                pageToken=token,
+                pageSize=1000,
+                spaces='drive',
+                includeRemoved=True,
+                includeItemsFromAllDrives=True,
+                supportsAllDrives=True,
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({', '.join(INDEX_FIELDS)}))"
+            ).execute()
+
+            changed = []
+            deleted = []
+            for change in response.get('changes', []):
+                if change.get('removed') or 'file' not in change:
+                    deleted.append(change['fileId'])
+                else:
+                    changed.append(change['file'])
+
+            with self._lock, self._conn:
+                self._delete(deleted)
+                updated += self._upsert(changed)
+                removed += len(deleted) + sum(1 for file in changed if file.get('trashed'))
+                if response.get('newStartPageToken'):
+                    self._set_state("start_page_token", response['newStartPageToken'])
+            token = response.get('nextPageToken')
+
+        return {"mode": "incremental", "updated": updated, "removed": removed}
+
+    def sync_in_background(self, drive) -> bool:
+        """
+        Start a sync on a background thread unless one is already running.
+
+        Args:
+            drive: Initialized DriveMCPServer
+
+        Returns:
+            True if a sync was started
+        """
+        def run() -> None:
+            try:
+                self.sync(drive)
+            except Exception as e:
+                print(f"Warning: Background Drive index sync failed: {e}")
+
+        with self._background_lock:
+            if self._background is not None and self._background.is_alive():
+                return False
+            self._background = threading.Thread(target=run, name="drive-index-sync", daemon=True)
+            self._background.start()
+            return True
+
+    @property
+    def ready(self) -> bool:
+        """Whether the first full crawl has completed."""
+        with self._lock:
+            return self._get_state("start_page_token") is not None
+
+    def seconds_since_sync(self) -> Optional[float]:
+        """Seconds since the last sync, or None if never synced."""
+        with self._lock:
+            last_sync = self._get_state("last_sync_at")
+        return time.time() - float(last_sync) if last_sync else None
+
+    def search(
+        self,
+        name_contains: Optional[str] = None,
+        mime_type: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        modified_after: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the local index.
+
+        Args:
+            name_contains: Case-insensitive name substring
+            mime_type: Exact MIME type
+            parent_id: Parent folder ID
+            modified_after: RFC 3339 timestamp (e.g., "2024-01-01T00:00:00Z")
+            limit: Maximum number of results
+
+        Returns:
+            List of file information, most recently modified first
+        """
+        sql = "SELECT f.* FROM files f"
+        conditions = []
+        params: List[Any] = []
+        if parent_id:
+            sql += " JOIN parents p ON p.file_id = f.id"
+            conditions.append("p.parent_id = ?")
+            params.append(parent_id)
+        if name_contains:
+            escaped = name_contains.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append("f.name LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if mime_type:
+            conditions.append("f.mime_type = ?")
+            params.append(mime_type)
+        if modified_after:
+            conditions.append("f.modified_time > ?")
+            params.append(_normalize_timestamp(modified_after))
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY f.modified_time DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "mimeType": row["mime_type"],
+                "size": row["size"],
+                "modifiedTime": row["modified_time"],
+                "url": row["url"],
+            }
+            for row in rows
+        ]
+
+
+def _normalize_timestamp(value: str) -> str:
+    """Normalize a timestamp to Drive's RFC 3339 format so it compares as text."""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+# Indexes by Drive account
+_drive_indexes: Dict[str, DriveIndex] = {}
+_drive_indexes_lock = threading.Lock()
+
+
+def get_drive_index(account: str = "") -> DriveIndex:
+    """
+    Get or create the Drive index of an account.
+
+    Each account gets its own database next to DRIVE_INDEX_PATH, so
+    switching Drive credentials never serves another account's files.
+
+    Args:
+        account: Drive account ID (the user's permissionId)
+
+    Returns:
+        Drive index instance
+    """
+    with _drive_indexes_lock:
+        index = _drive_indexes.get(account)
+        if index is None:
+            db_path = Path(config.DRIVE_INDEX_PATH)
+            if account:
+                digest = hashlib.sha256(account.encode("utf-8")).hexdigest()[:16]
+                db_path = db_path.with_name(f"{db_path.stem}.{digest}{db_path.suffix}")
+            index = _drive_indexes[account] = DriveIndex(db_path)
+        return index
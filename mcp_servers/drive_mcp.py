@@ -1,15 +1,46 @@
 """Google Drive MCP Server - provides Drive operations."""
 
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterator, List, Any, Optional
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import hashlib
+import httplib2
+import itertools
 import os
-import io
+import threading
+import time
 from pathlib import Path
-from utils.config import config
+from utils.config import config, config_service
+from utils.tracing import propagate
+from mcp_servers.drive_index import get_drive_index
+
+
+# Resumable upload chunks must be a multiple of this size
+UPLOAD_CHUNK_ALIGNMENT = 256 * 1024
+
+# Maximum number of calls the Drive batch endpoint accepts per request
+BATCH_LIMIT = 100
+
+# Maximum page size accepted by files.list
+MAX_PAGE_SIZE = 1000
+
+DEFAULT_FILE_FIELDS = ['id', 'name', 'mimeType', 'size', 'modifiedTime', 'webViewLink']
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# Seconds to wait before retrying a failed background token refresh
+TOKEN_REFRESH_RETRY_DELAY = 60
+
+
+class RangeNotHonored(Exception):
+    """The server answered a range request with something other than the requested range."""
 
 
 class DriveMCPServer:
@@ -18,11 +49,35 @@ class DriveMCPServer:
     SCOPES = ['https://www.googleapis.com/auth/drive']
     
     def __init__(self):
-        """Initialize Google Drive client."""
+        """Initialize Google Drive client (authentication is deferred to first use)."""
         self.creds = None
-        self.service = None
-        self.initialized = False
-        self._authenticate()
+        self._service = None
+        self._initialized = False
+        self._auth_attempted = False
+        self._auth_lock = threading.Lock()
+        self._refresh_timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._account_id: Optional[str] = None
+    
+    @property
+    def service(self):
+        """Drive API service, authenticating on first access."""
+        self._ensure_authenticated()
+        return self._service
+    
+    @property
+    def initialized(self) -> bool:
+        """Whether Drive is configured, authenticating on first access."""
+        self._ensure_authenticated()
+        return self._initialized
+    
+    def _ensure_authenticated(self):
+        """Authenticate once, on first use."""
+        if not self._auth_attempted:
+            with self._auth_lock:
+                if not self._auth_attempted:
+                    self._authenticate()
+                    self._auth_attempted = True
     
     def _authenticate(self):
         """Authenticate with Google Drive API."""
@@ -49,16 +104,59 @@ class DriveMCPServer:
                     )
                     self.creds = flow.run_local_server(port=0)
                 
-                # Save token
-                with open(token_file, 'w') as token:
-                    token.write(self.creds.to_json())
+                self._save_token()
             
-            self.service = build('drive', 'v3', credentials=self.creds)
-            self.initialized = True
+            # Use the discovery document bundled with the client library
+            # instead of fetching it over the network
+            self._service = build(
+                'drive', 'v3',
+                credentials=self.creds,
+                static_discovery=True,
+                cache_discovery=False
+            )
+            self._initialized = True
+            self._schedule_refresh()
         except Exception as e:
             print(f"Warning: Failed to initialize Google Drive client: {e}")
             print("Google Drive features will be disabled.")
     
+    def _save_token(self):
+        """Persist credentials to the token file."""
+        with open(config.GOOGLE_DRIVE_TOKEN_FILE, 'w') as token:
+            token.write(self.creds.to_json())
+    
+    def _schedule_refresh(self, delay: Optional[float] = None):
+        """Schedule a background token refresh shortly before expiry."""
+        if self._closed or not self.creds or not self.creds.refresh_token:
+            return
+        if delay is None:
+            if not self.creds.expiry:
+                return
+            # Credentials store expiry as naive UTC
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            delay = (self.creds.expiry - now).total_seconds() - config.DRIVE_TOKEN_REFRESH_MARGIN
+        
+        self._refresh_timer = threading.Timer(max(delay, 0), self._refresh_credentials)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+    
+    def _refresh_credentials(self):
+        """Refresh credentials in the background and reschedule."""
+        try:
+            self.creds.refresh(Request())
+            self._save_token()
+        except Exception as e:
+            print(f"Warning: Failed to refresh Google Drive token: {e}")
+            self._schedule_refresh(delay=TOKEN_REFRESH_RETRY_DELAY)
+            return
+        self._schedule_refresh()
+    
+    def close(self):
+        """Stop background token refreshes."""
+        self._closed = True
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+    
     def _check_initialized(self):
         """Check if Drive client is initialized."""
         if not self.initialized:
@@ -67,10 +165,69 @@ class DriveMCPServer:
                 "See SETUP.md for instructions."
             )
     
+    def iter_files(
+        self,
+        query: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        page_size: int = MAX_PAGE_SIZE,
+        order_by: Optional[str] = None,
+        spaces: Optional[str] = None,
+        corpora: Optional[str] = None,
+        drive_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over files in Google Drive, following page tokens.
+        
+        Only one page is held in memory at a time, so large inventories
+        can be walked without truncation.
+        
+        Args:
+            query: Search query (e.g., "name contains 'test'")
+            fields: File fields to fetch (default: DEFAULT_FILE_FIELDS)
+            page_size: Files per request (capped at MAX_PAGE_SIZE)
+            order_by: Sort order (e.g., "modifiedTime desc")
+            spaces: Spaces to search ("drive", "appDataFolder")
+            corpora: Bodies of items to search ("user", "drive", "allDrives")
+            drive_id: Shared drive ID (with corpora="drive")
+            
+        Yields:
+            Drive file resources with the requested fields
+        """
+        self._check_initialized()
+        params = {
+            'q': query or "trashed=false",
+            'pageSize': max(1, min(page_size, MAX_PAGE_SIZE)),
+            'fields': f"nextPageToken, files({', '.join(fields or DEFAULT_FILE_FIELDS)})",
+        }
+        if order_by:
+            params['orderBy'] = order_by
+        if spaces:
+            params['spaces'] = spaces
+        if corpora:
+            params['corpora'] = corpora
+            if corpora != 'user':
+                params['includeItemsFromAllDrives'] = True
+                params['supportsAllDrives'] = True
+        if drive_id:
+            params['driveId'] = drive_id
+        
+        page_token = None
+        while True:
+            results = self.service.files().list(pageToken=page_token, **params).execute()
+            yield from results.get('files', [])
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+    
     def list_files(
         self,
         query: Optional[str] = None,
-        max_results: int = 10
+        max_results: int = 10,
+        fields: Optional[List[str]] = None,
+        order_by: Optional[str] = None,
+        spaces: Optional[str] = None,
+        corpora: Optional[str] = None,
+        drive_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         List files in Google Drive.
@@ -78,47 +235,64 @@ class DriveMCPServer:
         Args:
             query: Search query (e.g., "name contains 'test'")
             max_results: Maximum number of results
+            fields: File fields to fetch; when given, raw file resources are returned
+            order_by: Sort order (e.g., "modifiedTime desc")
+            spaces: Spaces to search ("drive", "appDataFolder")
+            corpora: Bodies of items to search ("user", "drive", "allDrives")
+            drive_id: Shared drive ID (with corpora="drive")
             
         Returns:
             List of file information
         """
-        self._check_initialized()
-        if query:
-            query_str = query
-        else:
-            query_str = "trashed=false"
-        
-        results = self.service.files().list(
-            q=query_str,
-            pageSize=max_results,
-            fields="files(id, name, mimeType, size, modifiedTime, webViewLink)"
-        ).execute()
-        
-        files = []
-        for file in results.get('files', []):
-            files.append({
-                "id": file.get('id'),
-                "name": file.get('name'),
-                "mimeType": file.get('mimeType'),
-                "size": file.get('size'),
-                "modifiedTime": file.get('modifiedTime'),
-                "url": file.get('webViewLink'),
-            })
-        return files
+        files = itertools.islice(
+            self.iter_files(
+                query,
+                fields=fields,
+                page_size=max_results,
+                order_by=order_by,
+                spaces=spaces,
+                corpora=corpora,
+                drive_id=drive_id
+            ),
+            max_results
+        )
+        if fields is not None:
+            return list(files)
+        return [self._format_file(file) for file in files]
+    
+    @staticmethod
+    def _format_file(file: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a Drive API file resource to file information."""
+        return {
+            "id": file.get('id'),
+            "name": file.get('name'),
+            "mimeType": file.get('mimeType'),
+            "size": file.get('size'),
+            "modifiedTime": file.get('modifiedTime'),
+            "url": file.get('webViewLink'),
+        }
     
     def upload_file(
         self,
         file_path: str,
         folder_id: Optional[str] = None,
-        name: Optional[str] = None
+        name: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        http: Optional[AuthorizedHttp] = None
     ) -> Dict[str, Any]:
         """
         Upload a file to Google Drive.
         
+        Files up to DRIVE_MULTIPART_MAX_SIZE go in a single multipart
+        request; larger files use a resumable session, sent in
+        DRIVE_UPLOAD_CHUNK_SIZE chunks with per-chunk retry and backoff.
+        
         Args:
             file_path: Local file path
             folder_id: Target folder ID (optional)
             name: File name in Drive (optional, uses original name)
+            progress_callback: Called with (bytes_uploaded, total_bytes)
+            http: HTTP client to use (optional, for concurrent uploads)
             
         Returns:
             File information
@@ -134,16 +308,39 @@ class DriveMCPServer:
         if folder_id:
             file_metadata['parents'] = [folder_id]
         
+        total_size = file_path_obj.stat().st_size
+        resumable = total_size > config.DRIVE_MULTIPART_MAX_SIZE
+        # Resumable chunks must be a multiple of 256 KB
+        chunk_size = max(
+            UPLOAD_CHUNK_ALIGNMENT,
+            config.DRIVE_UPLOAD_CHUNK_SIZE - config.DRIVE_UPLOAD_CHUNK_SIZE % UPLOAD_CHUNK_ALIGNMENT
+        )
         media = MediaFileUpload(
             str(file_path_obj),
-            resumable=True
+            chunksize=chunk_size,
+            resumable=resumable
         )
         
-        file = self.service.files().create(
+        request = self.service.files().create(
             body=file_metadata,
             media_body=media,
             fields='id, name, webViewLink'
-        ).execute()
+        )
+        
+        if resumable:
+            file = None
+            while file is None:
+                status, file = request.next_chunk(
+                    http=http,
+                    num_retries=config.DRIVE_UPLOAD_RETRIES
+                )
+                if status and progress_callback:
+                    progress_callback(status.resumable_progress, total_size)
+        else:
+            file = request.execute(http=http, num_retries=config.DRIVE_UPLOAD_RETRIES)
+        
+        if progress_callback:
+            progress_callback(total_size, total_size)
         
         return {
             "id": file.get('id'),
@@ -151,36 +348,213 @@ class DriveMCPServer:
             "url": file.get('webViewLink'),
         }
     
-    def download_file(self, file_id: str, output_path: str) -> Dict[str, Any]:
+    def upload_many(
+        self,
+        file_paths: List[str],
+        folder_id: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Upload several files with a bounded number of concurrent uploads.
+        
+        Args:
+            file_paths: Local file paths
+            folder_id: Target folder ID (optional)
+            max_concurrency: Maximum parallel uploads (default: DRIVE_UPLOAD_CONCURRENCY)
+            progress_callback: Called with (file_path, bytes_uploaded, total_bytes)
+            
+        Returns:
+            Per-file results in input order; failed uploads carry an "error" key
+        """
+        self._check_initialized()
+        
+        def upload(file_path: str) -> Dict[str, Any]:
+            callback = None
+            if progress_callback:
+                callback = lambda sent, total: progress_callback(file_path, sent, total)
+            try:
+                result = self.upload_file(
+                    file_path,
+                    folder_id,
+                    progress_callback=callback,
+                    http=self._new_http()
+                )
+                return {"file_path": file_path, **result}
+            except Exception as e:
+                return {"file_path": file_path, "error": str(e)}
+        
+        max_workers = max(1, max_concurrency or config.DRIVE_UPLOAD_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(propagate(upload), file_paths))
+    
+    def _new_http(self) -> AuthorizedHttp:
+        """Create an authorized HTTP client (httplib2 is not thread-safe)."""
+        return AuthorizedHttp(self.creds, http=httplib2.Http())
+    
+    def _fetch_range(
+        self,
+        http: AuthorizedHttp,
+        uri: str,
+        start: int,
+        end: int
+    ) -> bytes:
+        """
+        Fetch a byte range of a file, retrying with backoff.
+        
+        Args:
+            http: Authorized HTTP client
+            uri: Media download URI
+            start: First byte (inclusive)
+            end: Last byte (inclusive)
+            
+        Returns:
+            Range content
+            
+        Raises:
+            RangeNotHonored: If the reply isn't a 206 for exactly this range
+                (e.g. a 200 with the whole file)
+        """
+        retries = config.DRIVE_DOWNLOAD_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                resp, content = http.request(
+                    uri, "GET", headers={"range": f"bytes={start}-{end}"}
+                )
+                if resp.status == 206:
+                    content_range = resp.get("content-range", "")
+                    if (not content_range.startswith(f"bytes {start}-{end}/")
+                            or len(content) != end - start + 1):
+                        raise RangeNotHonored(
+                            f"Expected bytes {start}-{end}, got '{content_range}' ({len(content)} bytes)"
+                        )
+                    return content
+                if resp.status == 200:
+                    raise RangeNotHonored(f"Server ignored the range request for bytes {start}-{end}")
+                error = HttpError(resp, content, uri=uri)
+                if resp.status < 500 and resp.status != 429:
+                    raise error
+            except (httplib2.HttpLib2Error, OSError) as e:
+                error = e
+            if attempt < retries:
+                time.sleep(2 ** attempt)
+        raise error
+    
+    def _download_stream(self, uri: str, part_path: Path, size: int, chunk_size: int) -> None:
+        """Download sequentially to disk, resuming from an existing partial file."""
+        http = self._new_http()
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        if offset > size:
+            part_path.unlink()
+            offset = 0
+        
+        with open(part_path, 'ab') as f:
+            while offset < size:
+                end = min(offset + chunk_size, size) - 1
+                f.write(self._fetch_range(http, uri, offset, end))
+                offset = end + 1
+    
+    def _download_whole(self, request: Any, part_path: Path, chunk_size: int) -> None:
+        """Stream a media request to disk from the start, without resuming."""
+        with open(part_path, 'wb') as f:
+            downloader = MediaIoBaseDownload(f, request, chunksize=chunk_size)
+            done = False
+            while done is False:
+                status, done = downloader.next_chunk(
+                    num_retries=config.DRIVE_DOWNLOAD_RETRIES
+                )
+    
+    def _download_parallel(self, uri: str, part_path: Path, size: int, chunk_size: int) -> None:
+        """Download byte ranges concurrently into a preallocated file."""
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+        
+        # One client per worker thread, so its connection is reused across ranges
+        local = threading.local()
+        
+        def fetch(start: int) -> None:
+            if not hasattr(local, "http"):
+                local.http = self._new_http()
+            end = min(start + chunk_size, size) - 1
+            content = self._fetch_range(local.http, uri, start, end)
+            with open(part_path, 'r+b') as f:
+                f.seek(start)
+                f.write(content)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=config.DRIVE_DOWNLOAD_WORKERS) as executor:
+                list(executor.map(propagate(fetch), range(0, size, chunk_size)))
+        except Exception:
+            # A preallocated file can't be resumed sequentially
+            part_path.unlink(missing_ok=True)
+            raise
+    
+    def download_file(
+        self,
+        file_id: str,
+        output_path: str,
+        chunk_size: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Download a file from Google Drive.
         
+        The file is streamed to ``<output_path>.part`` and moved into place
+        once its checksum is verified. Large files are fetched as parallel
+        range requests; smaller ones resume from a leftover partial file.
+        
         Args:
             file_id: Google Drive file ID
             output_path: Local output path
+            chunk_size: Bytes per request (default: DRIVE_DOWNLOAD_CHUNK_SIZE)
             
         Returns:
             Download information
         """
         self._check_initialized()
-        request = self.service.files().get_media(fileId=file_id)
-        file_content = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_content, request)
+        chunk_size = chunk_size or config.DRIVE_DOWNLOAD_CHUNK_SIZE
         
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
+        metadata = self.service.files().get(
+            fileId=file_id,
+            fields='id, name, size, md5Checksum',
+            supportsAllDrives=True
+        ).execute()
+        request = self.service.files().get_media(fileId=file_id)
         
         output_path_obj = Path(output_path)
         output_path_obj.parent.mkdir(parents=True, exist_ok=True)
+        part_path = output_path_obj.with_name(output_path_obj.name + ".part")
+        
+        size = int(metadata['size']) if metadata.get('size') else None
+        try:
+            if size is None:
+                # Size unknown - stream chunks straight to disk without resume
+                self._download_whole(request, part_path, chunk_size)
+            elif size >= config.DRIVE_PARALLEL_DOWNLOAD_THRESHOLD and config.DRIVE_DOWNLOAD_WORKERS > 1:
+                self._download_parallel(request.uri, part_path, size, chunk_size)
+            else:
+                self._download_stream(request.uri, part_path, size, chunk_size)
+        except RangeNotHonored as e:
+            print(f"Warning: Range download of {file_id} failed ({e}), downloading without ranges")
+            part_path.unlink(missing_ok=True)
+            self._download_whole(request, part_path, chunk_size)
         
-        with open(output_path_obj, 'wb') as f:
-            f.write(file_content.getvalue())
+        expected_md5 = metadata.get('md5Checksum')
+        if expected_md5:
+            md5 = hashlib.md5()
+            with open(part_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    md5.update(block)
+            if md5.hexdigest() != expected_md5:
+                part_path.unlink()
+                raise ValueError(f"Checksum mismatch downloading {file_id}")
+        
+        os.replace(part_path, output_path_obj)
         
         return {
             "file_id": file_id,
             "output_path": str(output_path_obj),
-            "size": len(file_content.getvalue()),
+            "size": output_path_obj.stat().st_size,
+            "md5Checksum": expected_md5,
         }
     
     def create_folder(self, name: str, parent_id: Optional[str] = None) -> Dict[str, Any]:
@@ -197,7 +571,7 @@ class DriveMCPServer:
         self._check_initialized()
         file_metadata = {
             'name': name,
-            'mimeType': 'application/vnd.google-apps.folder'
+            'mimeType': FOLDER_MIME_TYPE
         }
         if parent_id:
             file_metadata['parents'] = [parent_id]
@@ -212,20 +586,328 @@ class DriveMCPServer:
             "name": folder.get('name'),
             "url": folder.get('webViewLink'),
         }
+    
+    def _execute_batch(self, requests: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Execute API requests through the Drive batch endpoint.
+        
+        Requests are sent in groups of up to BATCH_LIMIT per HTTP call.
+        
+        Args:
+            requests: Unexecuted API requests
+            
+        Returns:
+            Responses in request order; failed calls become {"error": message}
+        """
+        results: List[Dict[str, Any]] = [{} for _ in requests]
+        
+        def callback(request_id: str, response: Any, exception: Optional[Exception]) -> None:
+            if exception is not None:
+                results[int(request_id)] = {"error": str(exception)}
+            else:
+                results[int(request_id)] = response or {}
+        
+        for offset in range(0, len(requests), BATCH_LIMIT):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for index in range(offset, min(offset + BATCH_LIMIT, len(requests))):
+                batch.add(requests[index], request_id=str(index))
+            batch.execute()
+        return results
+    
+    def get_metadata(self, file_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get metadata for several files in batched requests.
+        
+        Args:
+            file_ids: Google Drive file IDs
+            
+        Returns:
+            File information in input order; failed lookups carry an "error" key
+        """
+        self._check_initialized()
+        responses = self._execute_batch([
+            self.service.files().get(
+                fileId=file_id,
+                fields='id, name, mimeType, size, modifiedTime, webViewLink, parents'
+            )
+            for file_id in file_ids
+        ])
+        
+        results = []
+        for file_id, response in zip(file_ids, responses):
+            if "error" in response:
+                results.append({"id": file_id, "error": response["error"]})
+            else:
+                results.append({**self._format_file(response), "parents": response.get('parents', [])})
+        return results
+    
+    def create_folders(
+        self,
+        paths: List[str],
+        parent_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Create nested folders (like ``mkdir -p``) in batched requests.
+        
+        Each nesting level costs one batch lookup for existing folders and
+        one batch create for the missing ones, however many paths share it.
+        
+        Args:
+            paths: Folder paths such as "reports/2024/q1"
+            parent_id: Folder the paths are relative to (default: My Drive root)
+            
+        Returns:
+            Information about the deepest folder of each path, in input order;
+            paths that could not be created carry an "error" key
+        """
+        self._check_initialized()
+        root = parent_id or 'root'
+        split_paths = [[part for part in path.split('/') if part] for path in paths]
+        # Folder info (or error) per path prefix, e.g. ("reports", "2024")
+        folders: Dict[tuple, Dict[str, Any]] = {(): {"id": root}}
+        
+        depth = 1
+        while True:
+            prefixes = []
+            for parts in split_paths:
+                prefix = tuple(parts[:depth])
+                if len(parts) >= depth and prefix not in folders and prefix not in prefixes:
+                    prefixes.append(prefix)
+            if not prefixes:
+                break
+            
+            pending = []
+            for prefix in prefixes:
+                parent = folders[prefix[:-1]]
+                if "error" in parent:
+                    folders[prefix] = {"error": parent["error"]}
+                else:
+                    pending.append(prefix)
+            
+            # Reuse folders that already exist
+            lookups = self._execute_batch([
+                self.service.files().list(
+                    q=(
+                        f"name = '{self._escape_query(prefix[-1])}' "
+                        f"and '{folders[prefix[:-1]]['id']}' in parents "
+                        f"and mimeType = '{FOLDER_MIME_TYPE}' and trashed = false"
+                    ),
+                    pageSize=1,
+                    fields='files(id, name, webViewLink)'
+                )
+                for prefix in pending
+            ])
+            missing = []
+            for prefix, lookup in zip(pending, lookups):
+                existing = lookup.get('files')
+                if "error" in lookup:
+                    # Unknown whether the folder exists; creating it could duplicate it
+                    folders[prefix] = {"error": lookup["error"]}
+                elif existing:
+                    folders[prefix] = existing[0]
+                else:
+                    missing.append(prefix)
+            
+            created = self._execute_batch([
+                self.service.files().create(
+                    body={
+                        'name': prefix[-1],
+                        'mimeType': FOLDER_MIME_TYPE,
+                        'parents': [folders[prefix[:-1]]['id']],
+                    },
+                    fields='id, name, webViewLink'
+                )
+                for prefix in missing
+            ])
+            for prefix, folder in zip(missing, created):
+                folders[prefix] = folder
+            depth += 1
+        
+        results = []
+        for path, parts in zip(paths, split_paths):
+            folder = folders[tuple(parts)]
+            if not parts:
+                results.append({"path": path, "error": "Empty folder path"})
+            elif "error" in folder:
+                results.append({"path": path, "error": folder["error"]})
+            else:
+                results.append({
+                    "path": path,
+                    "id": folder.get('id'),
+                    "name": folder.get('name'),
+                    "url": folder.get('webViewLink'),
+                })
+        return results
+    
+    def move_many(self, file_ids: List[str], folder_id: str) -> List[Dict[str, Any]]:
+        """
+        Move several files into a folder in batched requests.
+        
+        Args:
+            file_ids: Google Drive file IDs
+            folder_id: Target folder ID
+            
+        Returns:
+            Moved file information in input order; failed moves carry an "error" key
+        """
+        self._check_initialized()
+        current = self._execute_batch([
+            self.service.files().get(fileId=file_id, fields='id, parents')
+            for file_id in file_ids
+        ])
+        
+        movable = [
+            (index, file_id, ",".join(response.get('parents', [])))
+            for index, (file_id, response) in enumerate(zip(file_ids, current))
+            if "error" not in response
+        ]
+        moved = self._execute_batch([
+            self.service.files().update(
+                fileId=file_id,
+                addParents=folder_id,
+                removeParents=parents,
+                fields='id, name, parents, webViewLink'
+            )
+            for _, file_id, parents in movable
+        ])
+        
+        results: List[Dict[str, Any]] = [
+            {"id": file_id, "error": response.get("error")}
+            for file_id, response in zip(file_ids, current)
+        ]
+        for (index, file_id, _), response in zip(movable, moved):
+            if "error" in response:
+                results[index] = {"id": file_id, "error": response["error"]}
+            else:
+                results[index] = {
+                    "id": response.get('id'),
+                    "name": response.get('name'),
+                    "parents": response.get('parents', []),
+                    "url": response.get('webViewLink'),
+                }
+        return results
+    
+    def sync_index(self) -> Dict[str, Any]:
+        """
+        Sync the local metadata index with Drive.
+        
+        Returns:
+            Sync statistics
+        """
+        self._check_initialized()
+        return get_drive_index(self.account_id()).sync(self)
+    
+    def search_index(
+        self,
+        name_contains: Optional[str] = None,
+        mime_type: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        modified_after: Optional[str] = None,
+        max_results: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Search files in the local metadata index.
+        
+        The index is synced first if it is older than DRIVE_INDEX_SYNC_INTERVAL
+        seconds, which only fetches changes since the previous sync. Until
+        the first full crawl completes (it runs in the background), results
+        come from a live Drive search instead.
+        
+        Args:
+            name_contains: Case-insensitive name substring
+            mime_type: Exact MIME type
+            parent_id: Parent folder ID
+            modified_after: RFC 3339 timestamp (e.g., "2024-01-01T00:00:00Z")
+            max_results: Maximum number of results
+            
+        Returns:
+            List of file information
+        """
+        self._check_initialized()
+        index = get_drive_index(self.account_id())
+        if not index.ready:
+            index.sync_in_background(self)
+            return self._search_live(name_contains, mime_type, parent_id, modified_after, max_results)
+        age = index.seconds_since_sync()
+        if age is None or age > config.DRIVE_INDEX_SYNC_INTERVAL:
+            index.sync(self)
+        return index.search(name_contains, mime_type, parent_id, modified_after, max_results)
+    
+    def _search_live(
+        self,
+        name_contains: Optional[str],
+        mime_type: Optional[str],
+        parent_id: Optional[str],
+        modified_after: Optional[str],
+        max_results: int
+    ) -> List[Dict[str, Any]]:
+        """Run an index search against the Drive API, in the index's result format."""
+        conditions = ["trashed = false"]
+        if name_contains:
+            conditions.append(f"name contains '{self._escape_query(name_contains)}'")
+        if mime_type:
+            conditions.append(f"mimeType = '{self._escape_query(mime_type)}'")
+        if parent_id:
+            conditions.append(f"'{self._escape_query(parent_id)}' in parents")
+        if modified_after:
+            conditions.append(f"modifiedTime > '{self._escape_query(modified_after)}'")
+        files = self.list_files(
+            " and ".join(conditions),
+            max_results=max_results,
+            order_by="modifiedTime desc",
+            corpora='allDrives'
+        )
+        for file in files:
+            file["size"] = int(file["size"]) if file.get("size") else None
+        return files
+    
+    def account_id(self) -> str:
+        """
+        ID of the Drive account the credentials belong to (its permissionId).
+        
+        Returns:
+            Account ID, fetched once per client
+        """
+        if self._account_id is None:
+            about = self.service.about().get(fields='user(permissionId)').execute()
+            self._account_id = about['user']['permissionId']
+        return self._account_id
+    
+    @staticmethod
+    def _escape_query(value: str) -> str:
+        """Escape a string literal for use in a Drive query."""
+        return value.replace('\\', '\\\\').replace("'", "\\'")
 
 
 # Global instance
 _drive_mcp: Optional[DriveMCPServer] = None
+_drive_mcp_lock = threading.Lock()
 
 
 def get_drive_mcp() -> DriveMCPServer:
-    """Get or create Drive MCP server instance."""
+    """
+    Get or create Drive MCP server instance.
+    
+    Construction only sets up state; authentication failures surface on
+    first use through _check_initialized.
+    """
     global _drive_mcp
-    if _drive_mcp is None:
-        try:
+    with _drive_mcp_lock:
+        if _drive_mcp is None:
             _drive_mcp = DriveMCPServer()
-        except Exception as e:
-            print(f"Warning: Could not initialize Drive MCP: {e}")
-            _drive_mcp = DriveMCPServer()  # Will have initialized=False
-    return _drive_mcp
+        return _drive_mcp
+
+
+def _on_drive_config_change(changes: Dict[str, Any]) -> None:
+    """Re-authenticate with the new credential files on next use."""
+    global _drive_mcp
+    with _drive_mcp_lock:
+        drive_mcp, _drive_mcp = _drive_mcp, None
+    if drive_mcp is not None:
+        drive_mcp.close()
+
 
+config_service.subscribe(
+    ["GOOGLE_DRIVE_CREDENTIALS_FILE", "GOOGLE_DRIVE_TOKEN_FILE"],
+    _on_drive_config_change
+)
@@ -1,29 +1,53 @@
 """GitHub MCP Server - provides GitHub operations."""
 
 from typing import Dict, List, Any, Optional
-from github import Github
-from utils.config import config
+from collections import OrderedDict
+import threading
+from github import Auth, Github
+from utils.config import config, config_service
+from utils.metrics import Gauge
 
 
 class GitHubMCPServer:
     """MCP Server for GitHub operations."""
     
-    def __init__(self):
-        """Initialize GitHub client."""
+    def __init__(self, token: Optional[str] = None):
+        """
+        Initialize GitHub client.
+        
+        Args:
+            token: GitHub token (default: GITHUB_TOKEN from config)
+        """
+        self.token = config.GITHUB_TOKEN if token is None else token
         self.github = None
-        self.user = None
         self.initialized = False
+        self._user = None
+        self._user_lock = threading.Lock()
         
-        if config.GITHUB_TOKEN:
+        if self.token:
             try:
-                self.github = Github(config.GITHUB_TOKEN)
-                self.user = self.github.get_user()
+                # No network call here - the user is resolved on first use
+                self.github = Github(
+                    auth=Auth.Token(self.token),
+                    base_url=config.GITHUB_API_BASE,
+                    pool_size=client_http_pool_size()
+                )
                 self.initialized = True
             except Exception as e:
                 print(f"Warning: Failed to initialize GitHub client: {e}")
         else:
             print("Warning: GITHUB_TOKEN not configured. GitHub features will be disabled.")
     
+    @property
+    def user(self):
+        """Authenticated GitHub user, resolved lazily on first access."""
+        self._check_initialized()
+        if self._user is None:
+            with self._user_lock:
+                if self._user is None:
+                    self._user = self.github.get_user()
+        return self._user
+    
     def _check_initialized(self):
         """Check if GitHub client is initialized."""
         if not self.initialized:
@@ -190,25 +214,99 @@ class GitHubMCPServer:
         }
 
 
-# Global instance
-_github_mcp: Optional[GitHubMCPServer] = None
-_last_github_token: Optional[str] = None
+def client_http_pool_size() -> int:
+    """
+    Connections each pooled client keeps alive.
 
+    PyGithub gives every client its own urllib3 pool, so GITHUB_HTTP_POOL_SIZE
+    is split across the GITHUB_CLIENT_POOL_SIZE clients to bound the total.
+    """
+    return max(1, config.GITHUB_HTTP_POOL_SIZE // max(1, config.GITHUB_CLIENT_POOL_SIZE))
 
-def get_github_mcp() -> GitHubMCPServer:
-    """Get or create GitHub MCP server instance."""
-    global _github_mcp, _last_github_token
+
+class GitHubClientPool:
+    """Thread-safe LRU pool of GitHub clients keyed by token."""
     
-    # Reload if token changed (for dynamic credentials from UI)
-    current_token = config.GITHUB_TOKEN
-    if _github_mcp is None or _last_github_token != current_token:
-        try:
-            _github_mcp = GitHubMCPServer()
-            _last_github_token = current_token
-        except Exception as e:
-            print(f"Warning: Could not initialize GitHub MCP: {e}")
-            _github_mcp = GitHubMCPServer()  # Will have initialized=False
-            _last_github_token = current_token
+    def __init__(self, max_size: int = 8):
+        """
+        Initialize client pool.
+        
+        Args:
+            max_size: Maximum number of clients kept alive
+        """
+        self.max_size = max(1, max_size)
+        self._clients: "OrderedDict[str, GitHubMCPServer]" = OrderedDict()
+        self._lock = threading.Lock()
     
-    return _github_mcp
+    def get(self, token: str) -> GitHubMCPServer:
+        """
+        Get the client for a token, creating it if needed.
+        
+        Args:
+            token: GitHub token ("" for an unconfigured client)
+            
+        Returns:
+            GitHub MCP server bound to the token
+        """
+        with self._lock:
+            client = self._clients.get(token)
+            if client is not None:
+                self._clients.move_to_end(token)
+                return client
+            
+            client = GitHubMCPServer(token)
+            self._clients[token] = client
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+            return client
+    
+    def evict(self, token: str) -> None:
+        """Drop the client for a token, if pooled."""
+        with self._lock:
+            self._clients.pop(token, None)
+    
+    def clear(self) -> None:
+        """Drop all pooled clients."""
+        with self._lock:
+            self._clients.clear()
+    
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+# Global pool
+_github_pool = GitHubClientPool(config.GITHUB_CLIENT_POOL_SIZE)
+Gauge("github_client_pool_size", "Pooled GitHub clients (one per token)").set_function(lambda: len(_github_pool))
+
+
+def get_github_mcp(token: Optional[str] = None) -> GitHubMCPServer:
+    """
+    Get GitHub MCP server instance for the current credentials.
+    
+    Clients are pooled per token, so sessions using different tokens
+    (e.g. entered from the UI) don't evict each other.
+    
+    Args:
+        token: GitHub token (default: session token, then config)
+        
+    Returns:
+        GitHub MCP server instance
+    """
+    if token is None:
+        token = config.GITHUB_TOKEN
+    return _github_pool.get(token or "")
+
+
+def _on_github_config_change(changes: Dict[str, Any]) -> None:
+    """Resize the pool and drop pooled clients built with old HTTP settings."""
+    if "GITHUB_CLIENT_POOL_SIZE" in changes:
+        _github_pool.max_size = max(1, config.GITHUB_CLIENT_POOL_SIZE)
+    # Each client's connection share depends on both pool sizes
+    _github_pool.clear()
+
 
+# Tokens need no invalidation: clients are pooled per token
+config_service.subscribe(
+    ["GITHUB_CLIENT_POOL_SIZE", "GITHUB_HTTP_POOL_SIZE", "GITHUB_API_BASE"],
+    _on_github_config_change
+)
@@ -2,13 +2,12 @@
 
 from typing import Dict, List, Any, Optional
 from ml_models.dataset_finder import get_dataset_finder
+from ml_models.dataset_downloader import get_dataset_downloader
+from ml_models.synthetic import get_synthetic_generator, SALARY_SCHEMA
 from ml_models.trainer import get_trainer
 from ml_models.model_manager import get_model_manager
-import pandas as pd
-import numpy as np
-import requests
+import shutil
 from pathlib import Path
-import tempfile
 
 
 class MLMCPServer:
@@ -17,13 +16,16 @@ class MLMCPServer:
     def __init__(self):
         """Initialize ML MCP server."""
         self.dataset_finder = get_dataset_finder()
+        self.dataset_downloader = get_dataset_downloader()
+        self.synthetic_generator = get_synthetic_generator()
         self.trainer = get_trainer()
         self.model_manager = get_model_manager()
     
     def find_datasets(
         self,
         task_type: str,
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        local_only: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Find datasets for ML training.
@@ -31,49 +33,53 @@ class MLMCPServer:
         Args:
             task_type: Type of task (e.g., "salary_prediction")
             description: Additional description
+            local_only: Only search the local dataset catalog
             
         Returns:
             List of available datasets
         """
-        return self.dataset_finder.find_dataset(task_type, description)
+        return self.dataset_finder.find_dataset(task_type, description, local_only)
     
     def download_dataset(
         self,
         dataset_url: str,
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        decompress: str = "auto"
     ) -> Dict[str, Any]:
         """
         Download a dataset.
         
+        Downloads are streamed to disk, resumed after interruptions and
+        cached by content, so repeating a URL reuses the verified file.
+        
         Args:
             dataset_url: URL to dataset
-            output_path: Local output path (optional)
+            output_path: Local output path (optional, default: the cached file)
+            decompress: "auto" (by extension), "gzip", "zip" or "none"
             
         Returns:
             Download information
         """
-        if output_path is None:
-            output_path = str(Path(tempfile.gettempdir()) / "dataset.csv")
-        
-        # Simple download - in production, would handle different sources
         try:
-            response = requests.get(dataset_url, timeout=30)
-            if response.status_code == 200:
+            result = self.dataset_downloader.download(dataset_url, decompress=decompress)
+            path = result["path"]
+            if output_path:
                 Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-                with open(output_path, 'wb') as f:
-                    f.write(response.content)
-                return {
-                    "path": output_path,
-                    "downloaded": True,
-                }
+                shutil.copyfile(path, output_path)
+                path = output_path
+            return {
+                "path": path,
+                "downloaded": True,
+                "cached": result["cached"],
+                "sha256": result["sha256"],
+                "size": result["size"],
+            }
         except Exception as e:
             return {
                 "path": output_path,
                 "downloaded": False,
                 "error": str(e),
             }
-        
-        return {"downloaded": False, "error": "Failed to download"}
     
     def train_model(
         self,
@@ -175,43 +181,27 @@ class MLMCPServer:
         """
         return self.model_manager.get_model_metadata(model_name)
     
-    def create_sample_salary_dataset(self) -> str:
+    def create_sample_salary_dataset(
+        self,
+        n_samples: int = 1000,
+        seed: int = 42,
+        file_format: str = "csv"
+    ) -> str:
         """
         Create a sample salary prediction dataset.
         
+        The same size, seed and format return the previously generated file.
+        
+        Args:
+            n_samples: Number of rows
+            seed: Random seed
+            file_format: "csv" or "parquet"
+            
         Returns:
             Path to created dataset
         """
-        # Generate sample data
-        np.random.seed(42)
-        n_samples = 1000
-        
-        data = {
-            "experience_years": np.random.randint(0, 20, n_samples),
-            "education_level": np.random.choice(["Bachelor", "Master", "PhD"], n_samples),
-            "company_size": np.random.choice(["Small", "Medium", "Large"], n_samples),
-            "location": np.random.choice(["Urban", "Suburban", "Rural"], n_samples),
-        }
-        
-        # Generate salary based on features
-        base_salary = 30000
-        salary = (
-            base_salary +
-            data["experience_years"] * 2000 +
-            (data["education_level"] == "Master").astype(int) * 10000 +
-            (data["education_level"] == "PhD").astype(int) * 20000 +
-            (data["company_size"] == "Large").astype(int) * 5000 +
-            np.random.normal(0, 5000, n_samples)
-        )
-        data["salary"] = salary.astype(int)
-        
-        df = pd.DataFrame(data)
-        
-        # Save to temp file
-        output_path = Path(tempfile.gettempdir()) / "salary_dataset.csv"
-        df.to_csv(output_path, index=False)
-        
-        return str(output_path)
+        result = self.synthetic_generator.generate(SALARY_SCHEMA, n_samples, seed, file_format)
+        return result["path"]
 
 
 # Global instance
@@ -0,0 +1,140 @@
+"""Idempotency keys and a time-windowed dedup store for n8n webhook triggers."""
+
+from typing import Dict, Any, Optional
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from utils.config import config
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses (created_at);
+"""
+
+
+def idempotency_key(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    body: Any = None,
+    scope: str = ""
+) -> str:
+    """
+    Derive an idempotency key from the webhook, its canonical payload and credentials.
+
+    Args:
+        url: Webhook URL
+        params: Query parameters
+        body: JSON body
+        scope: Credentials scope (the webhook token), so callers with different
+            credentials never share a stored response
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    canonical = json.dumps(
+        {
+            "url": url,
+            "params": params or {},
+            "body": body if body is not None else {},
+            "scope": hashlib.sha256(scope.encode("utf-8")).hexdigest() if scope else "",
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class DedupStore:
+    """Stores recent results by idempotency key for a configurable window."""
+
+    def __init__(self, db_path: Optional[Path] = None, window_seconds: Optional[float] = None):
+        """
+        Initialize dedup store.
+
+        Args:
+            db_path: SQLite database path (default: N8N_DEDUP_PATH)
+            window_seconds: How long results are reused (default: N8N_DEDUP_WINDOW, 0 disables)
+        """
+        self.db_path = Path(db_path or config.N8N_DEDUP_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.window = config.N8N_DEDUP_WINDOW if window_seconds is None else window_seconds
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether deduplication is active."""
+        return self.window > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get the result stored for a key within the window.
+
+        Args:
+            key: Idempotency key
+
+        Returns:
+            Stored result, or None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.window)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a result for a key, dropping entries older than the window.
+
+        Args:
+            key: Idempotency key
+            value: JSON-serializable result
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.window,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), now)
+            )
+
+    def delete(self, key: str) -> None:
+        """
+        Release a key, so the next identical call runs again.
+
+        Args:
+            key: Idempotency key
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+
+# Global instance
+_dedup_store: Optional[DedupStore] = None
+_dedup_store_lock = threading.Lock()
+
+
+def get_dedup_store() -> DedupStore:
+    """Get or create dedup store instance."""
+    global _dedup_store
+    with _dedup_store_lock:
+        if _dedup_store is None:
+            _dedup_store = DedupStore()
+    return _dedup_store
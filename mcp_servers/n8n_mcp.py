@@ -1,22 +1,115 @@
 """n8n MCP Server - provides n8n webhook operations."""
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import threading
+import time
 import requests
-from utils.config import config
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+from utils.config import config, config_service
+from utils.metrics import Gauge, Histogram, cache_lookups
+from utils.tracing import propagate
+from mcp_servers.n8n_queue import DispatchQueue, RetryableError
+from mcp_servers.n8n_dedup import get_dedup_store, idempotency_key
+
+
+# Statuses meaning the webhook did not run, so a POST is safe to retry
+RETRYABLE_STATUS_CODES = (429, 503)
+
+webhook_latency = Histogram(
+    "n8n_webhook_latency_seconds",
+    "n8n webhook request latency per endpoint"
+)
+
+# Settings read when building a client (webhook URL and token key the pool instead)
+CLIENT_SETTINGS = frozenset({"N8N_CONNECT_TIMEOUT", "N8N_READ_TIMEOUT"})
+SESSION_SETTINGS = frozenset({"N8N_MAX_RETRIES", "N8N_RETRY_BACKOFF", "N8N_POOL_SIZE"})
+
+# Shared HTTP session (connection pool reused across server instances)
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls evenly at a maximum rate."""
+    
+    def __init__(self, rate: float):
+        """
+        Initialize rate limiter.
+        
+        Args:
+            rate: Maximum calls per second (0 for unlimited)
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until the next call is allowed."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def get_http_session() -> requests.Session:
+    """Get or create the pooled, retrying HTTP session for n8n webhooks."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retries = config.N8N_MAX_RETRIES
+            retry = Retry(
+                total=retries,
+                connect=retries,
+                # The webhook may have run if the response was lost
+                read=0,
+                status=retries,
+                status_forcelist=RETRYABLE_STATUS_CODES,
+                allowed_methods=frozenset({"GET", "POST"}),
+                backoff_factor=config.N8N_RETRY_BACKOFF,
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=config.N8N_POOL_SIZE,
+                pool_maxsize=config.N8N_POOL_SIZE,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
 
 
 class N8NMCPServer:
     """MCP Server for n8n webhook operations."""
     
-    def __init__(self):
-        """Initialize n8n client."""
+    def __init__(self, base_url: Optional[str] = None, token: Optional[str] = None):
+        """
+        Initialize n8n client.
+        
+        Args:
+            base_url: Webhook base URL (default: N8N_WEBHOOK_BASE_URL)
+            token: Webhook bearer token (default: N8N_WEBHOOK_TOKEN)
+        """
+        base_url = config.N8N_WEBHOOK_BASE_URL if base_url is None else base_url
         self.base_url = None
-        self.token = None
+        self.token = config.N8N_WEBHOOK_TOKEN if token is None else token
         self.initialized = False
+        self.session = get_http_session()
+        self.timeout = (config.N8N_CONNECT_TIMEOUT, config.N8N_READ_TIMEOUT)
         
-        if config.N8N_WEBHOOK_BASE_URL:
-            self.base_url = config.N8N_WEBHOOK_BASE_URL.rstrip('/')
-            self.token = config.N8N_WEBHOOK_TOKEN
+        if base_url:
+            self.base_url = base_url.rstrip('/')
             self.initialized = True
         else:
             print("Warning: N8N_WEBHOOK_BASE_URL not configured. n8n features will be disabled.")
@@ -29,51 +122,100 @@ class N8NMCPServer:
                 "See SETUP.md for instructions."
             )
     
-    def trigger_workflow(
+    def _resolve_url(self, workflow_id: str) -> str:
+        """Resolve a full webhook URL or a path relative to the base URL."""
+        if workflow_id.startswith(('http://', 'https://')):
+            return workflow_id  # Full URL provided - no config needed
+        self._check_initialized()  # Only check if using relative path
+        return f"{self.base_url}/{workflow_id}"
+    
+    def _post(
         self,
-        workflow_id: str,
-        data: Optional[Dict[str, Any]] = None
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Any = None,
+        deduplicate: bool = True
     ) -> Dict[str, Any]:
         """
-        Trigger an n8n workflow via webhook.
-
+        POST to a webhook through the pooled session.
+        
+        Each call carries an Idempotency-Key derived from the URL and the
+        canonical payload. A repeat of a successful call within the dedup
+        window returns the stored response instead of re-running the workflow.
+        
         Args:
-            workflow_id: Either full webhook URL or workflow ID/path
-            data: Data to send to workflow
-
+            url: Webhook URL
+            params: Query parameters
+            body: JSON body
+            deduplicate: Reuse a recent identical call's response
+            
         Returns:
             Response from workflow
         """
-        # Support full URL or relative path
-        if workflow_id.startswith(('http://', 'https://')):
-            url = workflow_id  # Full URL provided - no config needed
-        else:
-            self._check_initialized()  # Only check if using relative path
-            url = f"{self.base_url}/{workflow_id}"  # Relative path
-
-        headers = {}
+        key = idempotency_key(url, params, body, scope=self.token or "")
+        dedup_store = get_dedup_store()
+        if deduplicate:
+            cached = dedup_store.get(key)
+            cache_lookups.inc(labels={"cache": "n8n_dedup", "result": "miss" if cached is None else "hit"})
+            if cached is not None:
+                return {**cached, "deduplicated": True}
+        
+        headers = {"Idempotency-Key": key}
         if self.token:
             headers["Authorization"] = f"Bearer {self.token}"
-
-        response = requests.post(
-            url,
-            json=data or {},
-            headers=headers,
-            timeout=30
-        )
+        
+        parts = urlsplit(url)
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                url,
+                params=params,
+                json=body if body is not None else {},
+                headers=headers,
+                timeout=self.timeout
+            )
+        finally:
+            webhook_latency.observe(
+                time.perf_counter() - start,
+                {"endpoint": f"{parts.netloc}{parts.path}"}
+            )
         response.raise_for_status()
 
-        return {
+        result = {
             "status_code": response.status_code,
             "data": response.json() if response.content else None,
             "success": response.status_code == 200,
         }
+        if result["success"]:
+            dedup_store.put(key, result)
+        return result
+    
+    def trigger_workflow(
+        self,
+        workflow_id: str,
+        data: Optional[Dict[str, Any]] = None,
+        deduplicate: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Trigger an n8n workflow via webhook.
+
+        Args:
+            workflow_id: Either full webhook URL or workflow ID/path
+            data: Data to send to workflow
+            deduplicate: Return the stored response for a repeat within
+                N8N_DEDUP_WINDOW instead of triggering again
+
+        Returns:
+            Response from workflow
+        """
+        return self._post(self._resolve_url(workflow_id), body=data, deduplicate=deduplicate)
     
     def trigger_workflow_with_params(
         self,
         workflow_id: str,
         params: Optional[Dict[str, Any]] = None,
-        body: Optional[Dict[str, Any]] = None
+        body: Optional[Dict[str, Any]] = None,
+        deduplicate: bool = True
     ) -> Dict[str, Any]:
         """
         Trigger workflow with query parameters and body.
@@ -82,36 +224,145 @@ class N8NMCPServer:
             workflow_id: Either full webhook URL or workflow ID/path
             params: Query parameters
             body: Request body
+            deduplicate: Return the stored response for a repeat within
+                N8N_DEDUP_WINDOW instead of triggering again
 
         Returns:
             Response from workflow
         """
-        # Support full URL or relative path
-        if workflow_id.startswith(('http://', 'https://')):
-            url = workflow_id  # Full URL provided - no config needed
-        else:
-            self._check_initialized()  # Only check if using relative path
-            url = f"{self.base_url}/{workflow_id}"  # Relative path
-
-        headers = {}
-        if self.token:
-            headers["Authorization"] = f"Bearer {self.token}"
-
-        response = requests.post(
-            url,
-            params=params,
-            json=body or {},
-            headers=headers,
-            timeout=30
+        return self._post(
+            self._resolve_url(workflow_id), params=params, body=body, deduplicate=deduplicate
         )
-        response.raise_for_status()
-
+    
+    def trigger_many(
+        self,
+        workflow_id: str,
+        payloads: List[Dict[str, Any]],
+        max_concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        batch_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Trigger a workflow once per payload, concurrently and rate limited.
+        
+        Args:
+            workflow_id: Either full webhook URL or workflow ID/path
+            payloads: One payload per call (e.g., one per email recipient)
+            max_concurrency: Parallel requests (default: N8N_BULK_CONCURRENCY)
+            rate_limit: Maximum requests per second (default: N8N_BULK_RATE_LIMIT, 0 for unlimited)
+            batch_size: If set, POST payloads as JSON arrays of this size;
+                the workflow must accept an array body
+            
+        Returns:
+            Totals and per-payload results in input order
+        """
+        url = self._resolve_url(workflow_id)
+        size = max(1, batch_size or 1)
+        limiter = RateLimiter(config.N8N_BULK_RATE_LIMIT if rate_limit is None else rate_limit)
+        
+        def send(start: int) -> List[Dict[str, Any]]:
+            group = payloads[start:start + size]
+            limiter.acquire()
+            try:
+                result = self._post(url, body=group if batch_size else group[0])
+            except Exception as e:
+                return [
+                    {"index": start + i, "success": False, "error": str(e)}
+                    for i in range(len(group))
+                ]
+            
+            data = result["data"]
+            per_item = (
+                data if batch_size and isinstance(data, list) and len(data) == len(group)
+                else [data] * len(group)
+            )
+            return [
+                {
+                    "index": start + i,
+                    "success": result["success"],
+                    "status_code": result["status_code"],
+                    "data": per_item[i],
+                }
+                for i in range(len(group))
+            ]
+        
+        max_workers = max(1, max_concurrency or config.N8N_BULK_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            groups = list(executor.map(propagate(send), range(0, len(payloads), size)))
+        
+        results = [item for group in groups for item in group]
+        succeeded = sum(1 for item in results if item["success"])
         return {
-            "status_code": response.status_code,
-            "data": response.json() if response.content else None,
-            "success": response.status_code == 200,
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results,
+        }
+    
+    def trigger_workflow_async(
+        self,
+        workflow_id: str,
+        data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a workflow trigger for background delivery.
+        
+        Returns immediately; delivery is retried with backoff and failed
+        triggers end up in the dead-letter table.
+        
+        Args:
+            workflow_id: Either full webhook URL or workflow ID/path
+            data: Data to send to workflow
+            params: Query parameters
+            
+        Returns:
+            Ticket for get_dispatch_status
+        """
+        url = self._resolve_url(workflow_id)
+        
+        # A repeat within the dedup window reuses the existing ticket, unless it failed
+        key = _dispatch_key(url, params, data, self.token)
+        dedup_store = get_dedup_store()
+        ticket_id = dedup_store.get(key)
+        status = get_dispatch_queue().status(ticket_id)["status"] if ticket_id is not None else None
+        reused = status not in (None, "dead", "unknown")
+        cache_lookups.inc(labels={"cache": "n8n_dispatch_dedup", "result": "hit" if reused else "miss"})
+        if reused:
+            return {
+                "ticket_id": ticket_id,
+                "status": status,
+                "deduplicated": True,
+            }
+        
+        ticket_id = get_dispatch_queue().enqueue(url, body=data, params=params, token=self.token)
+        dedup_store.put(key, ticket_id)
+        return {
+            "ticket_id": ticket_id,
+            "status": "queued",
         }
     
+    def get_dispatch_status(self, ticket_id: str) -> Dict[str, Any]:
+        """
+        Get delivery status of a queued workflow trigger.
+        
+        Args:
+            ticket_id: Ticket ID from trigger_workflow_async
+            
+        Returns:
+            Delivery status
+        """
+        return get_dispatch_queue().status(ticket_id)
+    
+    def get_latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get webhook latency statistics per endpoint.
+        
+        Returns:
+            Count, mean and p50/p95/p99 latency (seconds) per endpoint
+        """
+        return webhook_latency.snapshot()
+    
     def test_connection(self) -> Dict[str, Any]:
         """
         Test connection to n8n instance.
@@ -122,9 +373,9 @@ class N8NMCPServer:
         self._check_initialized()
         try:
             # Try to access base URL
-            response = requests.get(
+            response = self.session.get(
                 self.base_url,
-                timeout=5
+                timeout=(config.N8N_CONNECT_TIMEOUT, 5)
             )
             return {
                 "connected": True,
@@ -137,25 +388,156 @@ class N8NMCPServer:
             }
 
 
-# Global instance
-_n8n_mcp: Optional[N8NMCPServer] = None
-_last_n8n_url: Optional[str] = None
+class N8NClientPool:
+    """Thread-safe LRU pool of n8n clients keyed by webhook base URL and token."""
+    
+    def __init__(self, max_size: int = 8):
+        """
+        Initialize client pool.
+        
+        Args:
+            max_size: Maximum number of clients kept alive
+        """
+        self.max_size = max(1, max_size)
+        self._clients: "OrderedDict[Tuple[str, str], N8NMCPServer]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, base_url: str, token: str) -> N8NMCPServer:
+        """
+        Get the client for a webhook base URL and token, creating it if needed.
+        
+        Args:
+            base_url: Webhook base URL ("" for an unconfigured client)
+            token: Webhook bearer token
+            
+        Returns:
+            n8n MCP server bound to the credentials
+        """
+        key = (base_url, token)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+            
+            client = N8NMCPServer(base_url, token)
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+            return client
+    
+    def clear(self) -> None:
+        """Drop all pooled clients."""
+        with self._lock:
+            self._clients.clear()
+    
+    def __len__(self) -> int:
+        return len(self._clients)
+
 
+_n8n_pool = N8NClientPool(config.N8N_CLIENT_POOL_SIZE)
 
-def get_n8n_mcp() -> N8NMCPServer:
-    """Get or create n8n MCP server instance."""
-    global _n8n_mcp, _last_n8n_url
+
+def get_n8n_mcp(base_url: Optional[str] = None, token: Optional[str] = None) -> N8NMCPServer:
+    """
+    Get n8n MCP server instance for the current credentials.
     
-    # Reload if URL changed (for dynamic credentials from UI)
-    current_url = config.N8N_WEBHOOK_BASE_URL
-    if _n8n_mcp is None or _last_n8n_url != current_url:
-        try:
-            _n8n_mcp = N8NMCPServer()
-            _last_n8n_url = current_url
-        except Exception as e:
-            print(f"Warning: Could not initialize n8n MCP: {e}")
-            _n8n_mcp = N8NMCPServer()  # Will have initialized=False
-            _last_n8n_url = current_url
+    Clients are pooled per webhook base URL and token, resolved on every
+    call, so a session never posts with another session's webhook or token.
+    
+    Args:
+        base_url: Webhook base URL (default: session value, then config)
+        token: Webhook bearer token (default: session value, then config)
+        
+    Returns:
+        n8n MCP server instance
+    """
+    if base_url is None:
+        base_url = config.N8N_WEBHOOK_BASE_URL
+    if token is None:
+        token = config.N8N_WEBHOOK_TOKEN
+    return _n8n_pool.get(base_url or "", token or "")
+
+
+def _on_n8n_config_change(changes: Dict[str, Any]) -> None:
+    """Resize the pool, or drop pooled clients (and the HTTP session) built with old settings."""
+    global _session
+    if "N8N_CLIENT_POOL_SIZE" in changes:
+        _n8n_pool.max_size = max(1, config.N8N_CLIENT_POOL_SIZE)
+    if SESSION_SETTINGS.intersection(changes):
+        with _session_lock:
+            _session = None
+    if CLIENT_SETTINGS.intersection(changes) or SESSION_SETTINGS.intersection(changes):
+        _n8n_pool.clear()
+
+
+# Webhook URLs and tokens need no invalidation: clients are pooled per credentials
+config_service.subscribe(CLIENT_SETTINGS | SESSION_SETTINGS | {"N8N_CLIENT_POOL_SIZE"}, _on_n8n_config_change)
+
+
+# Global dispatch queue
+_dispatch_queue: Optional[DispatchQueue] = None
+_dispatch_queue_lock = threading.Lock()
+
+
+def _dispatch_key(url: str, params: Optional[Dict[str, Any]], body: Any, token: Optional[str]) -> str:
+    """Dedup key of a queued trigger."""
+    return f"queued:{idempotency_key(url, params, body, scope=token or '')}"
+
+
+def _release_dispatch(
+    job_id: str, url: str, params: Optional[Dict[str, Any]], body: Any, token: Optional[str]
+) -> None:
+    """Let a dead-lettered trigger be queued again instead of returning its failed ticket."""
+    get_dedup_store().delete(_dispatch_key(url, params, body, token))
+
+
+def _deliver_queued(url: str, params: Optional[Dict[str, Any]], body: Any, token: Optional[str]) -> Dict[str, Any]:
+    """
+    Deliver a queued trigger with the token of the session that queued it.
     
-    return _n8n_mcp
+    Only failures where the webhook cannot have run (no connection, or a
+    429/503 reply) are raised as retryable; anything else is dead-lettered.
+    """
+    try:
+        result = get_n8n_mcp(token=token or "")._post(url, params=params, body=body)
+    except requests.HTTPError as e:
+        status_code = e.response.status_code if e.response is not None else None
+        if status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableError(f"Webhook returned status {status_code}") from e
+        raise
+    except requests.ConnectionError as e:
+        if _not_sent(e):
+            raise RetryableError(str(e)) from e
+        raise
+    if not result["success"]:
+        raise RuntimeError(f"Webhook returned status {result['status_code']}")
+    return result
+
+
+def _not_sent(error: requests.ConnectionError) -> bool:
+    """Whether a connection error happened before the request reached the webhook."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # requests wraps urllib3's MaxRetryError, whose reason is the last failure
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, "reason", reason)
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def get_dispatch_queue() -> DispatchQueue:
+    """Get or create the n8n dispatch queue, starting its workers."""
+    global _dispatch_queue
+    with _dispatch_queue_lock:
+        if _dispatch_queue is None:
+            _dispatch_queue = DispatchQueue(handler=_deliver_queued, on_dead_letter=_release_dispatch)
+            _dispatch_queue.start()
+    return _dispatch_queue
+
+
+Gauge("n8n_client_pool_size", "Pooled n8n clients (one per webhook and token)").set_function(lambda: len(_n8n_pool))
 
+# Reported as 0 until the first queued trigger starts the queue
+Gauge("n8n_dispatch_queue_depth", "n8n triggers waiting or being delivered").set_function(
+    lambda: _dispatch_queue.depth() if _dispatch_queue is not None else 0
+)
@@ -0,0 +1,325 @@
+"""Durable SQLite-backed dispatch queue for n8n webhook triggers."""
+
+from typing import Callable, Dict, Any, List, Optional
+from pathlib import Path
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from utils.config import config
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    params TEXT,
+    body TEXT,
+    token TEXT,
+    status TEXT NOT NULL,
+    owner TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    response TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    params TEXT,
+    body TEXT,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+# Seconds an idle worker waits before polling for retries that became due
+POLL_INTERVAL = 1.0
+
+# Seconds between removals of finished jobs older than N8N_QUEUE_RETENTION
+PRUNE_INTERVAL = 3600.0
+
+# Columns added after the first release, for queue files created before them
+MIGRATED_COLUMNS = {"token": "TEXT", "owner": "TEXT", "lease_expires_at": "REAL"}
+
+
+class RetryableError(Exception):
+    """A delivery that failed before the webhook could run, so it is safe to retry."""
+
+
+class DispatchQueue:
+    """Durable queue delivering webhook calls with a background worker pool."""
+
+    def __init__(
+        self,
+        handler: Callable[[str, Optional[Dict[str, Any]], Any, Optional[str]], Dict[str, Any]],
+        db_path: Optional[Path] = None,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        on_dead_letter: Optional[Callable[[str, str, Optional[Dict[str, Any]], Any, Optional[str]], None]] = None
+    ):
+        """
+        Initialize dispatch queue.
+
+        Args:
+            handler: Delivers one job, called as handler(url, params, body, token);
+                raising marks the attempt as failed
+            db_path: SQLite database path (default: N8N_QUEUE_PATH)
+            workers: Number of concurrent deliveries (default: N8N_QUEUE_WORKERS)
+            max_attempts: Attempts before a job is dead-lettered (default: N8N_QUEUE_MAX_ATTEMPTS);
+                only RetryableError failures are retried, others are dead-lettered at once
+            on_dead_letter: Called as on_dead_letter(job_id, url, params, body, token)
+                after this queue dead-letters a job
+        """
+        self.handler = handler
+        self.on_dead_letter = on_dead_letter
+        self.db_path = Path(db_path or config.N8N_QUEUE_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = max(1, workers or config.N8N_QUEUE_WORKERS)
+        self.max_attempts = max(1, max_attempts or config.N8N_QUEUE_MAX_ATTEMPTS)
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in MIGRATED_COLUMNS.items():
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            # Tokens are only kept while a job may still be delivered
+            self._conn.execute("UPDATE jobs SET token = NULL WHERE status = 'delivered'")
+
+        # Identifies this queue's claims among processes sharing the file
+        self.owner = uuid.uuid4().hex
+        self._next_prune = 0.0
+
+    def start(self) -> None:
+        """
+        Start the worker pool.
+
+        Jobs left running by a process that died are taken over once their
+        lease (N8N_QUEUE_LEASE) expires; jobs another live process is
+        delivering are left alone. A heartbeat renews this queue's leases
+        while deliveries run, however long they take.
+        """
+        self._stopped.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"n8n-dispatch-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="n8n-dispatch-lease", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+
+    def stop(self) -> None:
+        """Stop the worker pool after in-flight deliveries finish."""
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def enqueue(
+        self,
+        url: str,
+        body: Any = None,
+        params: Optional[Dict[str, Any]] = None,
+        token: Optional[str] = None
+    ) -> str:
+        """
+        Add a webhook call to the queue.
+
+        Args:
+            url: Webhook URL
+            body: JSON body
+            params: Query parameters
+            token: Webhook bearer token of the session queueing the call
+
+        Returns:
+            Ticket ID for status lookups
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, url, params, body, token, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, url, json.dumps(params), json.dumps(body), token, now, now, now)
+            )
+        self._wakeup.set()
+        return job_id
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        """
+        Get the delivery status of a job.
+
+        Args:
+            job_id: Ticket ID returned by enqueue
+
+        Returns:
+            Status ("queued", "running", "delivered", "dead" or "unknown") and details
+        """
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            dead = None
+            if job is None:
+                dead = self._conn.execute(
+                    "SELECT * FROM dead_letters WHERE id = ?", (job_id,)
+                ).fetchone()
+
+        if job is not None:
+            return {
+                "ticket_id": job_id,
+                "status": job["status"],
+                "attempts": job["attempts"],
+                "last_error": job["last_error"],
+                "response": json.loads(job["response"]) if job["response"] else None,
+            }
+        if dead is not None:
+            return {
+                "ticket_id": job_id,
+                "status": "dead",
+                "attempts": dead["attempts"],
+                "last_error": dead["last_error"],
+                "response": None,
+            }
+        return {"ticket_id": job_id, "status": "unknown"}
+
+    def depth(self) -> int:
+        """Number of jobs waiting or being delivered."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()
+        return row[0]
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Atomically take the next due job, or a running job whose lease expired."""
+        now = time.time()
+        with self._lock, self._conn:
+            job = self._conn.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND next_attempt_at <= ?) "
+                "OR (status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at <= ?)) "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if job is None:
+                return None
+            # Another process may have claimed it since the SELECT
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, "
+                "lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = ? AND attempts = ?",
+                (self.owner, now + config.N8N_QUEUE_LEASE, now, job["id"], job["status"], job["attempts"])
+            ).rowcount
+        return job if claimed else None
+
+    def _heartbeat(self) -> None:
+        """Renew the leases of jobs this queue is delivering until stopped."""
+        while not self._stopped.wait(config.N8N_QUEUE_LEASE / 3):
+            now = time.time()
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ? WHERE owner = ? AND status = 'running'",
+                    (now + config.N8N_QUEUE_LEASE, self.owner)
+                )
+
+    def _work(self) -> None:
+        """Worker loop: deliver due jobs until stopped."""
+        while not self._stopped.is_set():
+            job = self._claim()
+            if job is None:
+                self._prune()
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._deliver(job)
+
+    def _deliver(self, job: sqlite3.Row) -> None:
+        """Deliver one job and record the outcome."""
+        attempts = job["attempts"] + 1
+        try:
+            response = self.handler(
+                job["url"], json.loads(job["params"]), json.loads(job["body"]), job["token"]
+            )
+        except Exception as e:
+            # Only RetryableError is retried: otherwise the webhook may have run,
+            # and retrying could trigger the workflow twice
+            retry = isinstance(e, RetryableError)
+            if self._record_failure(job, attempts, str(e), retry=retry) and self.on_dead_letter:
+                try:
+                    self.on_dead_letter(
+                        job["id"], job["url"], json.loads(job["params"]), json.loads(job["body"]), job["token"]
+                    )
+                except Exception as callback_error:
+                    print(f"Warning: Dead-letter callback failed for job {job['id']}: {callback_error}")
+            return
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'delivered', response = ?, last_error = NULL, token = NULL, "
+                "owner = NULL, lease_expires_at = NULL, updated_at = ? WHERE id = ? AND owner = ?",
+                (json.dumps(response, default=str), time.time(), job["id"], self.owner)
+            )
+
+    def _record_failure(self, job: sqlite3.Row, attempts: int, error: str, retry: bool) -> bool:
+        """
+        Schedule a retry with backoff, or dead-letter the job.
+
+        Returns:
+            True if this call dead-lettered the job
+        """
+        now = time.time()
+        deleted = 0
+        with self._lock, self._conn:
+            if not retry or attempts >= self.max_attempts:
+                # Only the current owner moves the job; a lost lease means another process has it.
+                # Dead letters don't keep the token.
+                deleted = self._conn.execute(
+                    "DELETE FROM jobs WHERE id = ? AND owner = ?", (job["id"], self.owner)
+                ).rowcount
+                if deleted:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO dead_letters "
+                        "(id, url, params, body, attempts, last_error, created_at, failed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (job["id"], job["url"], job["params"], job["body"], attempts, error,
+                         job["created_at"], now)
+                    )
+            else:
+                delay = config.N8N_QUEUE_RETRY_BACKOFF * 2 ** (attempts - 1)
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', next_attempt_at = ?, last_error = ?, owner = NULL, "
+                    "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND owner = ?",
+                    (now + delay, error, now, job["id"], self.owner)
+                )
+        return bool(deleted)
+
+    def _prune(self) -> None:
+        """Remove delivered jobs and dead letters older than N8N_QUEUE_RETENTION."""
+        now = time.time()
+        with self._lock:
+            if now < self._next_prune:
+                return
+            self._next_prune = now + PRUNE_INTERVAL
+            cutoff = now - config.N8N_QUEUE_RETENTION
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE status = 'delivered' AND updated_at < ?", (cutoff,)
+                )
+                self._conn.execute("DELETE FROM dead_letters WHERE failed_at < ?", (cutoff,))
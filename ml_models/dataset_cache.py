@@ -0,0 +1,90 @@
+"""On-disk TTL cache for dataset search results."""
+
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+import time
+from utils.config import config
+
+
+class DatasetSearchCache:
+    """
+    Cache dataset search results on disk, keyed by normalized query and
+    credentials scope.
+
+    Entries younger than ``ttl`` are fresh. Entries up to ``stale_ttl``
+    seconds past that are still served, but flagged stale so the caller
+    can revalidate them in the background.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None
+    ):
+        """
+        Initialize search cache.
+
+        Args:
+            cache_dir: Cache directory (default: DATASET_CACHE_DIR)
+            ttl: Seconds an entry stays fresh (default: DATASET_CACHE_TTL)
+            stale_ttl: Extra seconds a stale entry may be served (default: DATASET_CACHE_STALE_TTL)
+        """
+        self.cache_dir = Path(cache_dir or config.DATASET_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = config.DATASET_CACHE_TTL if ttl is None else ttl
+        self.stale_ttl = config.DATASET_CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize a query so trivially different spellings share an entry."""
+        return " ".join(query.lower().replace("_", " ").split())
+
+    def _path(self, query: str, scope: str = "") -> Path:
+        digest = hashlib.sha256(f"{scope}\0{self.normalize(query)}".encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+
+    def get(self, query: str, scope: str = "") -> Tuple[Optional[List[Dict[str, Any]]], bool]:
+        """
+        Look up cached results.
+
+        Args:
+            query: Search query
+            scope: Credentials fingerprint the results were searched with
+
+        Returns:
+            (results, fresh); results is None on a miss or expired entry
+        """
+        path = self._path(query, scope)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None, False
+
+        age = time.time() - entry.get("created_at", 0)
+        if age > self.ttl + self.stale_ttl:
+            return None, False
+        return entry.get("results", []), age <= self.ttl
+
+    def put(self, query: str, results: List[Dict[str, Any]], scope: str = "") -> None:
+        """
+        Store results for a query.
+
+        Args:
+            query: Search query
+            results: Search results
+            scope: Credentials fingerprint the results were searched with
+        """
+        path = self._path(query, scope)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"query": self.normalize(query), "created_at": time.time(), "results": results},
+                f
+            )
+        os.replace(tmp_path, path)
@@ -0,0 +1,265 @@
+"""Local dataset catalog with a full-text index for offline discovery."""
+
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+import csv
+import json
+import re
+import sqlite3
+import threading
+import time
+from utils.config import config
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    description TEXT,
+    url TEXT,
+    path TEXT,
+    tags TEXT,
+    columns TEXT,
+    mtime REAL,
+    updated_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS datasets_fts USING fts5(
+    id UNINDEXED,
+    name,
+    description,
+    tags,
+    columns,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+"""
+
+# BM25 column weights: id, name, description, tags, columns
+BM25_WEIGHTS = (0.0, 10.0, 2.0, 5.0, 3.0)
+
+# Rows sampled from a CSV to infer column types
+SAMPLE_ROWS = 100
+
+
+def _infer_type(values: List[str]) -> str:
+    """Infer a column type from sample values."""
+    values = [value for value in values if value.strip()]
+    if not values:
+        return "string"
+    for cast, name in ((int, "int"), (float, "float")):
+        try:
+            for value in values:
+                cast(value)
+            return name
+        except ValueError:
+            continue
+    return "string"
+
+
+def _describe_csv(path: Path) -> List[Dict[str, str]]:
+    """Read a CSV header and sample rows into a column schema."""
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        samples = [row for _, row in zip(range(SAMPLE_ROWS), reader)]
+    return [
+        {
+            "name": column,
+            "type": _infer_type([row[index] for row in samples if index < len(row)]),
+        }
+        for index, column in enumerate(header)
+    ]
+
+
+class DatasetCatalog:
+    """SQLite FTS5 catalog of local and previously found remote datasets."""
+
+    def __init__(self, db_path: Optional[Path] = None, catalog_dir: Optional[Path] = None):
+        """
+        Initialize dataset catalog.
+
+        Args:
+            db_path: SQLite database path (default: DATASET_CATALOG_PATH)
+            catalog_dir: Directory scanned for CSV files (default: DATASET_CATALOG_DIR)
+        """
+        self.db_path = Path(db_path or config.DATASET_CATALOG_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.catalog_dir = Path(catalog_dir or config.DATASET_CATALOG_DIR)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._last_scan = 0.0
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def _upsert(self, dataset: Dict[str, Any]) -> None:
+        """Insert or replace a dataset and its full-text entry."""
+        tags = dataset.get("tags") or []
+        columns = dataset.get("columns") or []
+        self._conn.execute("DELETE FROM datasets_fts WHERE id = ?", (dataset["id"],))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO datasets "
+            "(id, name, source, description, url, path, tags, columns, mtime, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                dataset["id"], dataset["name"], dataset["source"], dataset.get("description"),
+                dataset.get("url"), dataset.get("path"), json.dumps(tags), json.dumps(columns),
+                dataset.get("mtime"), time.time(),
+            )
+        )
+        self._conn.execute(
+            "INSERT INTO datasets_fts (id, name, description, tags, columns) VALUES (?, ?, ?, ?, ?)",
+            (
+                dataset["id"],
+                # Index "sf-salaries" / "salary_data" as separate words too
+                f"{dataset['name']} {re.sub(r'[-_/.]+', ' ', dataset['name'])}",
+                dataset.get("description") or "",
+                " ".join(str(tag) for tag in tags),
+                " ".join(re.sub(r"[-_]+", " ", column["name"]) for column in columns),
+            )
+        )
+
+    def _delete(self, dataset_id: str) -> None:
+        self._conn.execute("DELETE FROM datasets WHERE id = ?", (dataset_id,))
+        self._conn.execute("DELETE FROM datasets_fts WHERE id = ?", (dataset_id,))
+
+    def refresh_local(self, force: bool = False) -> int:
+        """
+        Index new or changed CSV files in the catalog directory.
+
+        An optional ``<name>.json`` next to a CSV may provide
+        "description" and "tags". Scans are throttled to one per
+        DATASET_CATALOG_SCAN_INTERVAL seconds unless forced.
+
+        Args:
+            force: Scan even if the last scan was recent
+
+        Returns:
+            Number of datasets (re)indexed
+        """
+        now = time.time()
+        if not force and now - self._last_scan < config.DATASET_CATALOG_SCAN_INTERVAL:
+            return 0
+        self._last_scan = now
+        if not self.catalog_dir.exists():
+            return 0
+
+        with self._lock:
+            known = {
+                row["id"]: row["mtime"]
+                for row in self._conn.execute("SELECT id, mtime FROM datasets WHERE source = 'local'")
+            }
+
+        indexed = 0
+        seen = set()
+        for path in sorted(self.catalog_dir.rglob("*.csv")):
+            sidecar = path.with_suffix(".json")
+            mtime = max(
+                path.stat().st_mtime,
+                sidecar.stat().st_mtime if sidecar.exists() else 0.0
+            )
+            dataset_id = f"local:{path.resolve()}"
+            seen.add(dataset_id)
+            if known.get(dataset_id) == mtime:
+                continue
+
+            try:
+                info = json.loads(sidecar.read_text(encoding="utf-8")) if sidecar.exists() else {}
+                columns = _describe_csv(path)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not index dataset {path}: {e}")
+                continue
+
+            with self._lock, self._conn:
+                self._upsert({
+                    "id": dataset_id,
+                    "name": info.get("name", path.stem),
+                    "source": "local",
+                    "description": info.get("description", ""),
+                    "url": None,
+                    "path": str(path),
+                    "tags": info.get("tags", []),
+                    "columns": columns,
+                    "mtime": mtime,
+                })
+            indexed += 1
+
+        with self._lock, self._conn:
+            for dataset_id in set(known) - seen:
+                self._delete(dataset_id)
+        return indexed
+
+    def add_remote(self, datasets: List[Dict[str, Any]]) -> None:
+        """
+        Add remote search results so they can be found offline later.
+
+        Args:
+            datasets: Dataset information from a remote source
+        """
+        with self._lock, self._conn:
+            for dataset in datasets:
+                if not dataset.get("name") or dataset.get("source") == "local":
+                    continue
+                self._upsert({
+                    "id": f"{dataset['source']}:{dataset['name']}",
+                    "name": dataset["name"],
+                    "source": dataset["source"],
+                    "description": dataset.get("description", ""),
+                    "url": dataset.get("url"),
+                    "tags": dataset.get("tags", []),
+                })
+
+    def search(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search the catalog, ranked by BM25 relevance.
+
+        Args:
+            query: Free-text query
+            max_results: Maximum results
+
+        Returns:
+            List of dataset information, most relevant first
+        """
+        terms = re.findall(r"[^\W_]+", query.lower())
+        if not terms:
+            return []
+        # Porter stemming matches "salary" with "salaries"; the prefix
+        # operator also catches partial words like "regress"
+        match = " OR ".join(f'"{term}"*' for term in terms)
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.*, bm25(datasets_fts, ?, ?, ?, ?, ?) AS score "
+                "FROM datasets_fts JOIN datasets d ON d.id = datasets_fts.id "
+                "WHERE datasets_fts MATCH ? ORDER BY score LIMIT ?",
+                (*BM25_WEIGHTS, match, max_results)
+            ).fetchall()
+
+        return [
+            {
+                "name": row["name"],
+                "source": row["source"],
+                "description": row["description"] or "",
+                "url": row["url"],
+                "path": row["path"],
+                "tags": json.loads(row["tags"] or "[]"),
+                "columns": json.loads(row["columns"] or "[]"),
+                # bm25() is lower-is-better; flip it for readability
+                "score": -row["score"],
+            }
+            for row in rows
+        ]
+
+
+# Global instance
+_dataset_catalog: Optional[DatasetCatalog] = None
+_dataset_catalog_lock = threading.Lock()
+
+
+def get_dataset_catalog() -> DatasetCatalog:
+    """Get or create dataset catalog instance."""
+    global _dataset_catalog
+    with _dataset_catalog_lock:
+        if _dataset_catalog is None:
+            _dataset_catalog = DatasetCatalog()
+    return _dataset_catalog
@@ -0,0 +1,265 @@
+"""Streaming, resumable dataset downloads into a content-addressed cache."""
+
+from typing import Dict, Any, Optional
+from pathlib import Path
+from urllib.parse import urlsplit
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import zipfile
+import requests
+from utils.config import config
+from utils.metrics import cache_lookups
+
+
+# Block size for hashing and decompressing files on disk
+BLOCK_SIZE = 1024 * 1024
+
+
+def _sha256_file(path: Path) -> str:
+    """Hash a file without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _digest_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.sha256")
+
+
+def _stored_sha256(path: Path) -> str:
+    """
+    Digest of a file, read from its sidecar while the file is unchanged.
+
+    The sidecar records the size and mtime the digest was taken at; the
+    file is only re-hashed (and the sidecar rewritten) when they differ.
+    """
+    stat = path.stat()
+    try:
+        with open(_digest_path(path), "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored["size"] == stat.st_size and stored["mtime_ns"] == stat.st_mtime_ns:
+            return stored["sha256"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return _write_sha256(path, _sha256_file(path))
+
+
+def _write_sha256(path: Path, sha256: str) -> str:
+    """Record a file's digest beside it."""
+    stat = path.stat()
+    tmp_path = path.with_name(f"{path.name}.sha256.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, f)
+    os.replace(tmp_path, _digest_path(path))
+    return sha256
+
+
+def _validator(response: requests.Response) -> Optional[str]:
+    """Validator for If-Range: a strong ETag, else Last-Modified."""
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+class DatasetDownloader:
+    """Download datasets once per URL into checksum-verified, content-addressed files."""
+
+    def __init__(self, download_dir: Optional[Path] = None):
+        """
+        Initialize dataset downloader.
+
+        Args:
+            download_dir: Cache directory (default: DATASET_DOWNLOAD_DIR)
+        """
+        self.download_dir = Path(download_dir or config.DATASET_DOWNLOAD_DIR)
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.download_dir / "manifest.json"
+        self._lock = threading.Lock()
+        # One lock per URL key, so only one thread writes a given .part file
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_entry(self, url: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            manifest = self._load_manifest()
+            manifest[url] = entry
+            tmp_path = self.manifest_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+    def _key_lock(self, url_key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(url_key, threading.Lock())
+
+    def _fetch(self, url: str, part_path: Path) -> str:
+        """
+        Stream a URL to a partial file, resuming with Range requests.
+
+        A resume sends If-Range with the validator stored when the partial
+        file was started, so a changed remote file is downloaded afresh
+        instead of being appended to stale bytes. Partial files without a
+        validator are never resumed.
+
+        Returns:
+            SHA-256 of the downloaded bytes
+        """
+        validator_path = part_path.with_name(f"{part_path.name}.validator")
+        retries = config.DATASET_DOWNLOAD_RETRIES
+        for attempt in range(retries + 1):
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            try:
+                validator = validator_path.read_text(encoding="utf-8").strip()
+            except OSError:
+                validator = ""
+            headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset and validator else {}
+            try:
+                with requests.get(
+                    url,
+                    headers=headers,
+                    stream=True,
+                    timeout=(config.DATASET_DOWNLOAD_CONNECT_TIMEOUT, config.DATASET_DOWNLOAD_READ_TIMEOUT)
+                ) as response:
+                    if offset and response.status_code == 416:
+                        # Partial file is unusable (e.g. the remote file changed)
+                        part_path.unlink()
+                        continue
+                    response.raise_for_status()
+
+                    digest = hashlib.sha256()
+                    if headers and response.status_code == 206:
+                        mode = "ab"
+                        with open(part_path, "rb") as f:
+                            for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+                                digest.update(block)
+                    else:
+                        # Fresh start, changed remote file or ignored Range - start over
+                        mode = "wb"
+                        validator = _validator(response)
+                        if validator:
+                            validator_path.write_text(validator, encoding="utf-8")
+                        elif validator_path.exists():
+                            validator_path.unlink()
+
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=config.DATASET_DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                            digest.update(chunk)
+                    if validator_path.exists():
+                        validator_path.unlink()
+                    return digest.hexdigest()
+            except requests.exceptions.RequestException:
+                if attempt >= retries:
+                    raise
+                time.sleep(2 ** attempt)
+        raise RuntimeError(f"Failed to download {url}")
+
+    def _decompress(self, raw_path: Path, kind: str) -> Path:
+        """Decompress a downloaded archive in a streaming pass next to it."""
+        stem = raw_path.name.split(".", 1)[0]
+        if kind == "gzip":
+            inner_suffix = "".join(Path(raw_path.name[:-len(".gz")]).suffixes) if raw_path.name.endswith(".gz") else ""
+            output_path = raw_path.with_name(f"{stem}.unpacked{inner_suffix}")
+            with gzip.open(raw_path, "rb") as src, open(output_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, BLOCK_SIZE)
+            return output_path
+
+        with zipfile.ZipFile(raw_path) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            if not members:
+                raise ValueError("Zip archive is empty")
+            # Prefer the largest CSV, otherwise the largest file
+            csv_members = [info for info in members if info.filename.lower().endswith(".csv")]
+            member = max(csv_members or members, key=lambda info: info.file_size)
+            output_path = raw_path.with_name(f"{stem}.unpacked{Path(member.filename).suffix}")
+            with archive.open(member) as src, open(output_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, BLOCK_SIZE)
+        return output_path
+
+    def download(self, url: str, decompress: str = "auto") -> Dict[str, Any]:
+        """
+        Download a URL, reusing a verified earlier download of the same URL.
+
+        Args:
+            url: Dataset URL
+            decompress: "auto" (by extension), "gzip", "zip" or "none"
+
+        Returns:
+            Path, checksum, size and whether the cache was used
+        """
+        url_key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        with self._key_lock(url_key):
+            cached = self._cached(url)
+            if cached:
+                cache_lookups.inc(labels={"cache": "dataset_download", "result": "hit"})
+                return cached
+            cache_lookups.inc(labels={"cache": "dataset_download", "result": "miss"})
+            return self._download(url, url_key, decompress)
+
+    def _cached(self, url: str) -> Optional[Dict[str, Any]]:
+        """Manifest entry for a URL if its file is still intact."""
+        with self._lock:
+            entry = self._load_manifest().get(url)
+        if not entry:
+            return None
+        path = Path(entry["path"])
+        if not path.exists() or _stored_sha256(path) != entry["sha256"]:
+            return None
+        return {**entry, "cached": True}
+
+    def _download(self, url: str, url_key: str, decompress: str) -> Dict[str, Any]:
+        """Fetch, store and record a URL (its key lock held)."""
+        url_path = urlsplit(url).path.lower()
+        if decompress == "auto":
+            if url_path.endswith(".gz"):
+                decompress = "gzip"
+            elif url_path.endswith(".zip"):
+                decompress = "zip"
+            else:
+                decompress = "none"
+
+        part_path = self.download_dir / f"{url_key}.part"
+        raw_sha256 = self._fetch(url, part_path)
+
+        suffixes = "".join(Path(url_path).suffixes[-2:]) or ".csv"
+        raw_path = self.download_dir / f"{raw_sha256}{suffixes}"
+        os.replace(part_path, raw_path)
+
+        path = raw_path if decompress == "none" else self._decompress(raw_path, decompress)
+        sha256 = raw_sha256 if path == raw_path else _sha256_file(path)
+        _write_sha256(path, sha256)
+        entry = {
+            "url": url,
+            "path": str(path),
+            "sha256": sha256,
+            "raw_sha256": raw_sha256,
+            "size": path.stat().st_size,
+        }
+        self._save_entry(url, entry)
+        return {**entry, "cached": False}
+
+
+# Global instance
+_dataset_downloader: Optional[DatasetDownloader] = None
+
+
+def get_dataset_downloader() -> DatasetDownloader:
+    """Get or create dataset downloader instance."""
+    global _dataset_downloader
+    if _dataset_downloader is None:
+        _dataset_downloader = DatasetDownloader()
+    return _dataset_downloader
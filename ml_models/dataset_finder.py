@@ -1,8 +1,28 @@
 """Dataset finder for ML training."""
 
 from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import threading
+import time
 import requests
 from utils.config import config
+from utils.metrics import cache_lookups
+from utils.tracing import propagate
+from ml_models.dataset_cache import DatasetSearchCache
+from ml_models.dataset_catalog import get_dataset_catalog
+
+
+# Shared pool for concurrent source queries
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dataset-search")
+# Background revalidation gets its own pool: a refresh waits on source
+# queries, which would never start if refreshes filled the search pool
+_revalidate_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="dataset-revalidate")
+
+# Queries currently being revalidated in the background
+_refreshing: set = set()
+_refreshing_lock = threading.Lock()
 
 
 class DatasetFinder:
@@ -13,6 +33,14 @@ class DatasetFinder:
         self.kaggle_username = config.KAGGLE_USERNAME
         self.kaggle_key = config.KAGGLE_KEY
         self.hf_token = config.HUGGINGFACE_TOKEN
+        self.cache = DatasetSearchCache()
+        self.catalog = get_dataset_catalog()
+        # Private or gated results must only be served back to the same credentials
+        credentials = [self.kaggle_username, self.kaggle_key, self.hf_token]
+        self.scope = (
+            hashlib.sha256(json.dumps(credentials).encode("utf-8")).hexdigest()[:16]
+            if any(credentials) else ""
+        )
     
     def search_kaggle_datasets(
         self,
@@ -28,22 +56,22 @@ class DatasetFinder:
             
         Returns:
             List of dataset information
+            
+        Raises:
+            Exception: If the search fails, so partial results aren't cached as complete
         """
         # Note: Requires kaggle API setup
         # This is a simplified version - full implementation would use kaggle API
         datasets = []
-        try:
-            # Example: salary prediction dataset
-            if "salary" in query.lower() or "lương" in query.lower():
-                datasets.append({
-                    "name": "salary-data",
-                    "source": "kaggle",
-                    "description": "Salary prediction dataset",
-                    "url": "https://www.kaggle.com/datasets/kaggle/sf-salaries",
-                    "tags": ["salary", "prediction", "regression"],
-                })
-        except Exception as e:
-            print(f"Error searching Kaggle: {e}")
+        # Example: salary prediction dataset
+        if "salary" in query.lower() or "lương" in query.lower():
+            datasets.append({
+                "name": "salary-data",
+                "source": "kaggle",
+                "description": "Salary prediction dataset",
+                "url": "https://www.kaggle.com/datasets/kaggle/sf-salaries",
+                "tags": ["salary", "prediction", "regression"],
+            })
         
         return datasets[:max_results]
     
@@ -61,58 +89,153 @@ class DatasetFinder:
             
         Returns:
             List of dataset information
+            
+        Raises:
+            requests.RequestException: If the request fails or returns an error status
         """
         datasets = []
-        try:
-            url = "https://huggingface.co/api/datasets"
-            params = {"search": query, "limit": max_results}
-            headers = {}
-            if self.hf_token:
-                headers["Authorization"] = f"Bearer {self.hf_token}"
-            
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                for item in data.get("datasets", [])[:max_results]:
-                    datasets.append({
-                        "name": item.get("id", ""),
-                        "source": "huggingface",
-                        "description": item.get("description", ""),
-                        "url": f"https://huggingface.co/datasets/{item.get('id', '')}",
-                        "tags": item.get("tags", []),
-                    })
-        except Exception as e:
-            print(f"Error searching HuggingFace: {e}")
+        url = "https://huggingface.co/api/datasets"
+        params = {"search": query, "limit": max_results}
+        headers = {}
+        if self.hf_token:
+            headers["Authorization"] = f"Bearer {self.hf_token}"
+        
+        response = requests.get(url, params=params, headers=headers, timeout=config.DATASET_SEARCH_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        for item in data.get("datasets", [])[:max_results]:
+            datasets.append({
+                "name": item.get("id", ""),
+                "source": "huggingface",
+                "description": item.get("description", ""),
+                "url": f"https://huggingface.co/datasets/{item.get('id', '')}",
+                "tags": item.get("tags", []),
+            })
         
         return datasets[:max_results]
     
+    def search_all(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Search all sources concurrently.
+        
+        Each source gets DATASET_SEARCH_TIMEOUT seconds; slower or failing
+        sources are left out so partial results return instead of blocking.
+        Only complete results are cached, under the credentials scope;
+        only results searched without credentials go into the shared catalog.
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            List of dataset information
+        """
+        futures = {
+            "kaggle": _search_executor.submit(propagate(self.search_kaggle_datasets), query),
+            "huggingface": _search_executor.submit(propagate(self.search_huggingface_datasets), query),
+        }
+        deadline = time.monotonic() + config.DATASET_SEARCH_TIMEOUT
+        
+        authenticated = {
+            "kaggle": bool(self.kaggle_username and self.kaggle_key),
+            "huggingface": bool(self.hf_token),
+        }
+        
+        datasets = []
+        public = []
+        complete = True
+        for source, future in futures.items():
+            try:
+                results = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except Exception as e:
+                complete = False
+                print(f"Warning: Skipped {source} dataset search: {str(e) or 'timed out'}")
+                continue
+            datasets.extend(results)
+            if not authenticated[source]:
+                public.extend(results)
+        
+        if complete:
+            self.cache.put(query, datasets, self.scope)
+        # Remember public remote results for offline discovery
+        self.catalog.add_remote(public)
+        return datasets
+    
+    def _revalidate(self, query: str) -> None:
+        """Refresh a stale cache entry in the background."""
+        key = (self.scope, self.cache.normalize(query))
+        with _refreshing_lock:
+            if key in _refreshing:
+                return
+            _refreshing.add(key)
+        
+        def refresh():
+            try:
+                self.search_all(query)
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(key)
+        
+        _revalidate_executor.submit(propagate(refresh))
+    
     def find_dataset(
         self,
         task_type: str,
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        local_only: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Find datasets for a specific task.
         
+        The local catalog is searched first. Cached remote results are
+        returned immediately (stale ones are refreshed in the background);
+        when the catalog already has matches, remote sources are queried in
+        the background instead of blocking.
+        
         Args:
             task_type: Type of task (e.g., "salary_prediction", "classification")
             description: Additional description
+            local_only: Only search the local catalog (no network)
             
         Returns:
-            List of relevant datasets
+            List of relevant datasets, local matches first
         """
         query = f"{task_type} {description or ''}"
-        datasets = []
         
-        # Search Kaggle
-        kaggle_results = self.search_kaggle_datasets(query)
-        datasets.extend(kaggle_results)
+        self.catalog.refresh_local()
+        local = self.catalog.search(query)
+        if local_only:
+            return local
         
-        # Search HuggingFace
-        hf_results = self.search_huggingface_datasets(query)
-        datasets.extend(hf_results)
+        cached, fresh = self.cache.get(query, self.scope)
+        cache_lookups.inc(labels={
+            "cache": "dataset_search",
+            "result": "miss" if cached is None else ("hit" if fresh else "stale"),
+        })
+        if cached is not None:
+            if not fresh:
+                self._revalidate(query)
+            return self._merge(local, cached)
         
-        return datasets
+        if local:
+            self._revalidate(query)
+            return local
+        
+        return self._merge(local, self.search_all(query))
+    
+    @staticmethod
+    def _merge(
+        first: List[Dict[str, Any]],
+        second: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Concatenate result lists, dropping duplicates of the same dataset."""
+        seen = set()
+        merged = []
+        for dataset in first + second:
+            key = (dataset.get("source"), dataset.get("name"))
+            if key not in seen:
+                seen.add(key)
+                merged.append(dataset)
+        return merged
 
 
 def get_dataset_finder() -> DatasetFinder:
@@ -0,0 +1,219 @@
+"""Synthetic dataset generator with schema specs, chunked output and a seed cache."""
+
+from typing import Dict, List, Any, Optional
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from utils.config import config
+from utils.metrics import cache_lookups
+
+# Parquet output is optional
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+# Bump when generation changes so old cached files are not reused
+GENERATOR_VERSION = 1
+
+SUPPORTED_FORMATS = ("csv", "parquet")
+
+# Schema of the built-in salary prediction dataset.
+#
+# Column types:
+#   int      - uniform integers in [low, high)
+#   float    - normal(mean, std) or uniform(low, high) via "distribution"
+#   category - one of "values", optionally with "weights"
+#   linear   - intercept + sum of weighted terms + normal(0, noise); a term
+#              is a numeric column name or "column=value" for a category
+SALARY_SCHEMA: Dict[str, Any] = {
+    "name": "salary",
+    "columns": [
+        {"name": "experience_years", "type": "int", "low": 0, "high": 20},
+        {"name": "education_level", "type": "category", "values": ["Bachelor", "Master", "PhD"]},
+        {"name": "company_size", "type": "category", "values": ["Small", "Medium", "Large"]},
+        {"name": "location", "type": "category", "values": ["Urban", "Suburban", "Rural"]},
+        {
+            "name": "salary",
+            "type": "linear",
+            "intercept": 30000,
+            "terms": {
+                "experience_years": 2000,
+                "education_level=Master": 10000,
+                "education_level=PhD": 20000,
+                "company_size=Large": 5000,
+            },
+            "noise": 5000,
+            "dtype": "int",
+        },
+    ],
+}
+
+
+class SyntheticDataGenerator:
+    """Generate datasets from a schema spec in bounded-memory chunks."""
+
+    def __init__(self, output_dir: Optional[Path] = None, chunk_rows: Optional[int] = None):
+        """
+        Initialize synthetic data generator.
+
+        Args:
+            output_dir: Directory for generated files (default: SYNTHETIC_DATA_DIR)
+            chunk_rows: Rows generated per chunk (default: SYNTHETIC_CHUNK_ROWS)
+        """
+        self.output_dir = Path(output_dir or config.SYNTHETIC_DATA_DIR)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.chunk_rows = max(1, chunk_rows or config.SYNTHETIC_CHUNK_ROWS)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _output_path(self, schema: Dict[str, Any], n_rows: int, seed: int, file_format: str) -> Path:
+        """Derive a deterministic file path from everything that affects the output."""
+        spec = json.dumps(
+            {
+                "version": GENERATOR_VERSION,
+                "schema": schema,
+                "n_rows": n_rows,
+                "seed": seed,
+                # Chunk boundaries determine the random streams
+                "chunk_rows": self.chunk_rows,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        digest = hashlib.sha256(spec.encode("utf-8")).hexdigest()[:16]
+        return self.output_dir / f"{schema.get('name', 'dataset')}-{n_rows}-{seed}-{digest}.{file_format}"
+
+    def _generate_chunk(self, columns: List[Dict[str, Any]], size: int, rng: np.random.Generator) -> pd.DataFrame:
+        """Generate one chunk of rows with vectorized numpy operations."""
+        data: Dict[str, Any] = {}
+        codes: Dict[str, np.ndarray] = {}
+
+        for column in columns:
+            name = column["name"]
+            kind = column["type"]
+            if kind == "int":
+                data[name] = rng.integers(column.get("low", 0), column.get("high", 100), size)
+            elif kind == "float":
+                if column.get("distribution", "normal") == "uniform":
+                    data[name] = rng.uniform(column.get("low", 0.0), column.get("high", 1.0), size)
+                else:
+                    data[name] = rng.normal(column.get("mean", 0.0), column.get("std", 1.0), size)
+            elif kind == "category":
+                values = column["values"]
+                weights = column.get("weights")
+                if weights is not None:
+                    weights = np.asarray(weights, dtype=float)
+                    weights = weights / weights.sum()
+                codes[name] = rng.choice(len(values), size, p=weights)
+                data[name] = pd.Categorical.from_codes(codes[name], categories=values)
+            elif kind == "linear":
+                values = np.full(size, float(column.get("intercept", 0.0)))
+                for term, weight in column.get("terms", {}).items():
+                    source, _, level = term.partition("=")
+                    if level:
+                        level_code = self._column(columns, source)["values"].index(level)
+                        values += (codes[source] == level_code) * weight
+                    else:
+                        values += data[source] * weight
+                if column.get("noise"):
+                    values += rng.normal(0.0, column["noise"], size)
+                data[name] = values.astype(np.int64) if column.get("dtype") == "int" else values
+            else:
+                raise ValueError(f"Unsupported column type '{kind}' for column '{name}'")
+
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def _column(columns: List[Dict[str, Any]], name: str) -> Dict[str, Any]:
+        for column in columns:
+            if column["name"] == name:
+                return column
+        raise ValueError(f"Unknown column '{name}' in linear terms")
+
+    def _write(self, schema: Dict[str, Any], n_rows: int, seed: int, file_format: str, path: Path) -> None:
+        """Generate all chunks into a temporary file and move it into place."""
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        writer = None
+        try:
+            for chunk_index, start in enumerate(range(0, n_rows, self.chunk_rows)):
+                # Each chunk has its own stream, so output only depends on the seed
+                rng = np.random.default_rng([seed, chunk_index])
+                df = self._generate_chunk(schema["columns"], min(self.chunk_rows, n_rows - start), rng)
+                if file_format == "csv":
+                    df.to_csv(tmp_path, mode="w" if chunk_index == 0 else "a", header=chunk_index == 0, index=False)
+                else:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(str(tmp_path), table.schema)
+                    writer.write_table(table)
+            if writer is not None:
+                writer.close()
+                writer = None
+            os.replace(tmp_path, path)
+        finally:
+            if writer is not None:
+                writer.close()
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def generate(
+        self,
+        schema: Dict[str, Any],
+        n_rows: int,
+        seed: int = 42,
+        file_format: str = "csv"
+    ) -> Dict[str, Any]:
+        """
+        Generate a dataset, reusing the cached file for the same schema, size and seed.
+
+        Args:
+            schema: Schema spec (see SALARY_SCHEMA)
+            n_rows: Number of rows
+            seed: Random seed
+            file_format: "csv" or "parquet"
+
+        Returns:
+            Path, row count and whether the cached file was used
+        """
+        if file_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported format '{file_format}', expected one of {SUPPORTED_FORMATS}")
+        if file_format == "parquet" and not PARQUET_AVAILABLE:
+            raise ValueError("Parquet output requires pyarrow (pip install pyarrow)")
+        if not 0 < n_rows <= config.SYNTHETIC_MAX_ROWS:
+            raise ValueError(f"n_rows must be between 1 and {config.SYNTHETIC_MAX_ROWS}")
+
+        path = self._output_path(schema, n_rows, seed, file_format)
+        with self._locks_lock:
+            lock = self._locks.setdefault(str(path), threading.Lock())
+        with lock:
+            cached = path.exists()
+            cache_lookups.inc(labels={"cache": "synthetic", "result": "hit" if cached else "miss"})
+            if not cached:
+                self._write(schema, n_rows, seed, file_format, path)
+
+        return {
+            "path": str(path),
+            "rows": n_rows,
+            "format": file_format,
+            "cached": cached,
+        }
+
+
+# Global instance
+_synthetic_generator: Optional[SyntheticDataGenerator] = None
+
+
+def get_synthetic_generator() -> SyntheticDataGenerator:
+    """Get or create synthetic data generator instance."""
+    global _synthetic_generator
+    if _synthetic_generator is None:
+        _synthetic_generator = SyntheticDataGenerator()
+    return _synthetic_generator
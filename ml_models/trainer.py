@@ -62,8 +62,8 @@ class AutoTrainer:
         X = df.drop(columns=[target_column])
         y = df[target_column]
         
-        # Encode categorical features
-        for col in X.select_dtypes(include=['object']).columns:
+        # Encode categorical features (Parquet keeps category and string dtypes)
+        for col in X.select_dtypes(include=['object', 'category', 'string']).columns:
             le = LabelEncoder()
             X[col] = le.fit_transform(X[col].astype(str))
             self.label_encoders[col] = le
@@ -87,7 +87,7 @@ class AutoTrainer:
         Train a model from dataset.
         
         Args:
-            dataset_path: Path to dataset CSV file
+            dataset_path: Path to dataset CSV or Parquet file
             target_column: Target column name
             task_type: Task type ('regression' or 'classification'), auto-detect if None
             test_size: Test set size ratio
@@ -96,7 +96,10 @@ class AutoTrainer:
             Training results
         """
         # Load dataset
-        df = pd.read_csv(dataset_path)
+        if str(dataset_path).endswith(".parquet"):
+            df = pd.read_parquet(dataset_path)
+        else:
+            df = pd.read_csv(dataset_path)
         
         if target_column not in df.columns:
             raise ValueError(f"Target column '{target_column}' not found in dataset")
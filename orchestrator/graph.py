@@ -1,10 +1,13 @@
 """LangGraph orchestrator for multi-agent system."""
 
-from typing import TypedDict, Literal
-from langgraph.graph import StateGraph, END
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from utils.llm import get_default_llm
+from typing import Annotated, Any, Dict, List, Optional, TypedDict, Literal
+import operator
+import re
+from utils.config import config, config_service
+from utils.memory import ConversationMemory
+from utils.metrics import Counter, cache_lookups
+from utils.tracing import instrument_http, span
+from orchestrator.singleflight import SingleFlight, coalesce_key
 from orchestrator.nodes import (
     chat_node,
     github_node,
@@ -17,45 +20,131 @@ from orchestrator.nodes import (
 class AgentState(TypedDict):
     """State for the agent orchestrator."""
     query: str
+    history: List[Any]
     agent_type: Literal["chat", "github", "drive", "n8n", "ml", "unknown"]
+    # Agents the query fans out to (agent_type first); they run concurrently
+    agent_types: List[str]
+    # One entry per agent branch, joined by the merge node
+    branch_results: Annotated[List[Dict[str, Any]], operator.add]
     result: str
     agent_used: str
     success: bool
 
 
+agent_requests = Counter("agent_requests_total", "Queries handled per agent and outcome")
+
+# Where a compound query splits into parts that may belong to different agents
+CLAUSE_SEPARATOR = re.compile(r"[,;]|\b(?:and|also|và|cũng)\b")
+# Words that order the parts ("train a model, then upload it"); such queries
+# have dependent steps and are not fanned out
+SEQUENCE_WORDS = re.compile(
+    r"\b(?:then|after(?:wards)?|once|next|finally|when (?:it is|it's) done|rồi|sau đó|sau khi|xong)\b"
+)
+# Words by which a later part refers to an earlier part's result ("upload it")
+REFERENCE_WORDS = re.compile(
+    r"\b(?:it|its|them|they|this|that|these|those|the results?|the output|nó|đó|này|kết quả)\b"
+)
+# Nouns that alone don't make a clause a separate request ("list my repos and their files")
+FANOUT_IGNORED_KEYWORDS = ("file", "folder", "model", "dataset", "issue")
+# Queries that change something ("create a repo", "send an email"); their
+# results are never reused from the coalescing window, so a repeat runs again
+MUTATING_WORDS = re.compile(
+    r"\b(?:create|new|make|add|send|trigger|run|execute|queue|upload|delete|remove|"
+    r"update|edit|rename|move|train|commit|push|merge|close|tạo|gửi|chạy|xóa|xoá|sửa|huấn luyện)\b"
+)
+# Agents whose requests are actions rather than lookups (n8n triggers workflows)
+MUTATING_AGENTS = {"n8n"}
+
+
 def create_orchestrator():
     """Create the LangGraph orchestrator."""
+    # Imported here so the UI can render before LangGraph loads
+    from langgraph.graph import StateGraph, END
+    
+    instrument_http()
     
     # Create router node
     def router_node(state: AgentState) -> AgentState:
-        """Route query to appropriate agent based on keywords."""
+        """Route query to appropriate agents, traced as the router stage."""
+        with span("router", "router") as current:
+            result = route(state)
+            current.set("agent_type", result["agent_type"])
+            current.set("agent_types", ",".join(result["agent_types"]))
+        return result
+    
+    def route(state: AgentState) -> AgentState:
+        """
+        Route query to one agent, or to several for a compound query.
+        
+        Each clause of the query is routed on its own; when clauses belong
+        to different agents (e.g. "list my repos and list all trained
+        models"), all of them run concurrently, up to AGENT_FANOUT_MAX.
+        Only clearly independent parts fan out: a query with sequencing
+        words, or whose later parts refer back to earlier results ("train
+        a model and upload it to Drive"), goes to a single agent.
+        """
         query_lower = state["query"].lower()
+        agent_types = []
+        clauses = CLAUSE_SEPARATOR.split(query_lower)
+        independent = not SEQUENCE_WORDS.search(query_lower) and not any(
+            REFERENCE_WORDS.search(clause) for clause in clauses[1:]
+        )
+        if config.AGENT_FANOUT_MAX > 1 and independent:
+            for clause in clauses:
+                agent_type = route_text(clause, ignore=FANOUT_IGNORED_KEYWORDS)
+                if agent_type != "chat" and agent_type not in agent_types:
+                    agent_types.append(agent_type)
+        if len(agent_types) < 2:
+            agent_types = [route_text(query_lower)]
+        agent_types = agent_types[:max(1, config.AGENT_FANOUT_MAX)]
+        return {**state, "agent_type": agent_types[0], "agent_types": agent_types}
+    
+    def route_text(query_lower: str, ignore: tuple = ()) -> str:
+        """Pick the agent for a (lowercased) query based on keywords, except ignored ones."""
+        matches = lambda keywords: any(keyword in query_lower for keyword in keywords if keyword not in ignore)
         
         # GitHub keywords
         github_keywords = ["github", "repo", "repository", "commit", "issue", "pull request"]
-        if any(keyword in query_lower for keyword in github_keywords):
-            return {**state, "agent_type": "github"}
+        if matches(github_keywords):
+            return "github"
         
         # Drive keywords
         drive_keywords = ["drive", "google drive", "upload", "download", "file", "folder"]
-        if any(keyword in query_lower for keyword in drive_keywords):
-            return {**state, "agent_type": "drive"}
+        if matches(drive_keywords):
+            return "drive"
         
         # n8n keywords
         n8n_keywords = ["n8n", "workflow", "webhook", "trigger", "automation", "email", "send email", "gửi email"]
-        if any(keyword in query_lower for keyword in n8n_keywords):
-            return {**state, "agent_type": "n8n"}
+        if matches(n8n_keywords):
+            return "n8n"
         
         # ML keywords
         ml_keywords = [
             "train", "model", "predict", "machine learning", "ml", "dataset",
             "salary", "prediction", "regression", "classification"
         ]
-        if any(keyword in query_lower for keyword in ml_keywords):
-            return {**state, "agent_type": "ml"}
+        if matches(ml_keywords):
+            return "ml"
         
         # Default to chat
-        return {**state, "agent_type": "chat"}
+        return "chat"
+    
+    def merge_node(state: AgentState) -> Dict[str, Any]:
+        """Join the agent branches into one result."""
+        order = state["agent_types"]
+        branches = sorted(
+            state["branch_results"],
+            key=lambda branch: order.index(branch["agent"]) if branch["agent"] in order else len(order)
+        )
+        if len(branches) == 1:
+            result = branches[0]["result"]
+        else:
+            result = "\n\n".join(f"**{branch['agent']}**: {branch['result']}" for branch in branches)
+        return {
+            "result": result,
+            "agent_used": ",".join(branch["agent"] for branch in branches),
+            "success": all(branch["success"] for branch in branches),
+        }
     
     # Create graph
     workflow = StateGraph(AgentState)
@@ -67,14 +156,15 @@ def create_orchestrator():
     workflow.add_node("drive", drive_node)
     workflow.add_node("n8n", n8n_node)
     workflow.add_node("ml", ml_node)
+    workflow.add_node("merge", merge_node)
     
     # Set entry point
     workflow.set_entry_point("router")
     
-    # Add conditional edges from router
+    # Add conditional edges from router; several agents run as parallel branches
     workflow.add_conditional_edges(
         "router",
-        lambda state: state["agent_type"],
+        lambda state: state["agent_types"],
         {
             "chat": "chat",
             "github": "github",
@@ -84,12 +174,13 @@ def create_orchestrator():
         }
     )
     
-    # All agent nodes go to END
-    workflow.add_edge("chat", END)
-    workflow.add_edge("github", END)
-    workflow.add_edge("drive", END)
-    workflow.add_edge("n8n", END)
-    workflow.add_edge("ml", END)
+    # All agent nodes join in the merge node
+    workflow.add_edge("chat", "merge")
+    workflow.add_edge("github", "merge")
+    workflow.add_edge("drive", "merge")
+    workflow.add_edge("n8n", "merge")
+    workflow.add_edge("ml", "merge")
+    workflow.add_edge("merge", END)
     
     return workflow.compile()
 
@@ -97,6 +188,12 @@ def create_orchestrator():
 # Global orchestrator instance
 _orchestrator = None
 
+# Identical concurrent queries share one run
+_query_flight = SingleFlight()
+
+# Single-flight roles as cache lookup results
+COALESCE_LOOKUP_RESULTS = {"leader": "miss", "inflight": "inflight", "window": "hit"}
+
 
 def get_orchestrator():
     """Get or create orchestrator instance."""
@@ -106,26 +203,78 @@ def get_orchestrator():
     return _orchestrator
 
 
-def process_query(query: str) -> dict:
+def _invoke_pinned(orchestrator: Any, state: AgentState) -> Dict[str, Any]:
+    """Run the graph with the caller's session settings pinned for its threads."""
+    with config_service.pinned_session():
+        return orchestrator.invoke(state)
+
+
+def _reusable(query: str, result: Dict[str, Any]) -> bool:
+    """Whether a finished result may be served to a repeat of the query."""
+    if not result.get("success"):
+        return False
+    if MUTATING_AGENTS.intersection(result.get("agent_types") or [result.get("agent_type")]):
+        return False
+    return not MUTATING_WORDS.search(query.lower())
+
+
+def process_query(query: str, memory: Optional[ConversationMemory] = None) -> dict:
     """
     Process a query through the orchestrator.
     
+    Identical queries (same history and credentials) arriving while one is
+    running share its result. A repeat within QUERY_COALESCE_WINDOW of a
+    successful read-only query reuses it too; queries that create, send,
+    trigger or otherwise change something always run again.
+    
     Args:
         query: User query
+        memory: Conversation memory; its history is sent with the query
+            and the exchange is recorded in it
         
     Returns:
         Result dictionary
     """
     orchestrator = get_orchestrator()
+    history = memory.messages() if memory is not None else []
     
     initial_state = {
         "query": query,
+        "history": history,
         "agent_type": "unknown",
+        "agent_types": [],
+        "branch_results": [],
         "result": "",
         "agent_used": "",
         "success": False,
     }
     
-    result = orchestrator.invoke(initial_state)
+    key = coalesce_key(query, history, config_service.session_scope())
+    
+    with span("process_query", "request", **{
+        "query_bytes": len(query.encode("utf-8")),
+        "history_messages": len(history),
+    }) as current:
+        try:
+            # Agent branches and tools run on worker threads; give them this session's credentials
+            shared, role = _query_flight.do(
+                key,
+                lambda: _invoke_pinned(orchestrator, initial_state),
+                reusable=lambda result: _reusable(query, result),
+            )
+        except Exception:
+            agent_requests.inc(labels={"agent": "none", "success": False})
+            raise
+        cache_lookups.inc(labels={"cache": "query_coalesce", "result": COALESCE_LOOKUP_RESULTS[role]})
+        current.set("coalesced", role)
+        # Callers sharing a run each get their own copy
+        result = dict(shared)
+        agent_requests.inc(labels={"agent": result.get("agent_used", ""), "success": bool(result.get("success"))})
+        current.set("agent_used", result.get("agent_used", ""))
+        current.set("success", result.get("success", False))
+        current.set("result_bytes", len(str(result.get("result", "")).encode("utf-8")))
+    
+    if memory is not None:
+        memory.add_exchange(query, str(result.get("result", "")))
     return result
 
@@ -1,64 +1,134 @@
-"""Orchestrator nodes for routing to agents."""
+"""Orchestrator nodes for routing to agents.
 
-from typing import Dict, Any
-from agents.chat_agent import get_chat_agent
-from agents.github_agent import get_github_agent
-from agents.drive_agent import get_drive_agent
-from agents.n8n_agent import get_n8n_agent
-from agents.ml_agent import get_ml_agent
+Agents are imported inside their node so an agent's dependencies
+(langchain_openai, PyGithub, googleapiclient, sklearn, ...) load only
+when a query is first routed to it. Built agents are pooled and reused
+until the LLM settings change.
+"""
+
+from typing import Any, Callable, Dict
+import threading
+from utils.config import config_service
+from utils.metrics import Gauge
+from utils.tracing import span
+
+
+# Settings every agent's LLM client is built from
+LLM_SETTINGS = ("DEEPSEEK_API_KEY", "DEEPSEEK_API_BASE")
+
+# Agent pool
+_agents: Dict[str, Any] = {}
+_agents_lock = threading.Lock()
+# One build lock per agent, so branches building different agents don't wait on each other
+_build_locks: Dict[str, threading.Lock] = {}
+# Bumped when the pool is cleared, so builds started before that aren't pooled
+_agents_generation = 0
+Gauge("agent_pool_size", "Built agents kept in the pool").set_function(lambda: len(_agents))
+
+
+def _get_agent(name: str, factory: Callable[[], Any]) -> Any:
+    """Get a pooled agent, building it on first use."""
+    with _agents_lock:
+        agent = _agents.get(name)
+        if agent is not None:
+            return agent
+        build_lock = _build_locks.setdefault(name, threading.Lock())
+    
+    with build_lock:
+        with _agents_lock:
+            agent = _agents.get(name)
+            generation = _agents_generation
+        if agent is not None:
+            return agent
+        agent = factory()
+        with _agents_lock:
+            if generation == _agents_generation:
+                _agents[name] = agent
+    return agent
+
+
+def _clear_agents(changes: Dict[str, Any]) -> None:
+    """Drop pooled agents so they are rebuilt with the new LLM settings."""
+    global _agents_generation
+    with _agents_lock:
+        _agents.clear()
+        _agents_generation += 1
+
+
+config_service.subscribe(LLM_SETTINGS, _clear_agents)
+
+
+# What each agent covers, for scoping its part of a fanned-out query
+AGENT_SCOPES = {
+    "github": "GitHub",
+    "drive": "Google Drive",
+    "n8n": "n8n workflow / email",
+    "ml": "machine learning",
+}
+
+
+def _branch_query(state: Dict[str, Any], name: str) -> str:
+    """The query for an agent, scoped to its part when several agents run for it."""
+    if len(state.get("agent_types") or []) < 2:
+        return state["query"]
+    return (
+        f"{state['query']}\n\n"
+        f"(Other assistants handle the rest of this request at the same time. "
+        f"Do only the {AGENT_SCOPES.get(name, name)} part.)"
+    )
+
+
+def _branch_result(name: str, result: str, success: bool) -> Dict[str, Any]:
+    """State update of an agent node; branches are joined in the merge node."""
+    return {"branch_results": [{"agent": name, "result": result, "success": success}]}
 
 
 def chat_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Handle chat queries."""
-    agent = get_chat_agent()
-    result = agent.answer(state["query"])
-    return {
-        "result": result["answer"],
-        "agent_used": "chat",
-        "success": result["success"],
-    }
+    from agents.chat_agent import get_chat_agent
+    with span("chat", "node") as current:
+        agent = _get_agent("chat", get_chat_agent)
+        result = agent.answer(_branch_query(state, "chat"), state.get("history"))
+        current.set("success", result["success"])
+    return _branch_result("chat", result["answer"], result["success"])
 
 
 def github_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Handle GitHub operations."""
-    agent = get_github_agent()
-    result = agent.execute(state["query"])
-    return {
-        "result": result["result"],
-        "agent_used": "github",
-        "success": result["success"],
-    }
+    from agents.github_agent import get_github_agent
+    with span("github", "node") as current:
+        agent = _get_agent("github", get_github_agent)
+        result = agent.execute(_branch_query(state, "github"), state.get("history"))
+        current.set("success", result["success"])
+    return _branch_result("github", result["result"], result["success"])
 
 
 def drive_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Handle Drive operations."""
-    agent = get_drive_agent()
-    result = agent.execute(state["query"])
-    return {
-        "result": result["result"],
-        "agent_used": "drive",
-        "success": result["success"],
-    }
+    from agents.drive_agent import get_drive_agent
+    with span("drive", "node") as current:
+        agent = _get_agent("drive", get_drive_agent)
+        result = agent.execute(_branch_query(state, "drive"), state.get("history"))
+        current.set("success", result["success"])
+    return _branch_result("drive", result["result"], result["success"])
 
 
 def n8n_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Handle n8n operations."""
-    agent = get_n8n_agent()
-    result = agent.execute(state["query"])
-    return {
-        "result": result["result"],
-        "agent_used": "n8n",
-        "success": result["success"],
-    }
+    from agents.n8n_agent import get_n8n_agent
+    with span("n8n", "node") as current:
+        agent = _get_agent("n8n", get_n8n_agent)
+        result = agent.execute(_branch_query(state, "n8n"), state.get("history"))
+        current.set("success", result["success"])
+    return _branch_result("n8n", result["result"], result["success"])
 
 
 def ml_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Handle ML operations."""
-    agent = get_ml_agent()
-    result = agent.execute(state["query"])
-    return {
-        "result": result["result"],
-        "agent_used": "ml",
-        "success": result["success"],
-    }
+    from agents.ml_agent import get_ml_agent
+    with span("ml", "node") as current:
+        agent = _get_agent("ml", get_ml_agent)
+        result = agent.execute(_branch_query(state, "ml"), state.get("history"))
+        current.set("success", result["success"])
+    return _branch_result("ml", result["result"], result["success"])
 
@@ -0,0 +1,151 @@
+"""Single-flight coalescing of identical concurrent queries.
+
+When several sessions send the same query at nearly the same moment,
+one of them (the leader) runs it and the others wait for its result
+instead of repeating the LLM and API calls. A successful result is also
+served for a short window after it completes, to absorb bursts.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from utils.config import config
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially different spellings share a key.
+
+    Only Unicode form and whitespace are normalized; case is kept, since
+    repository, file and model names are case-sensitive.
+    """
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+def coalesce_key(query: str, history: Optional[List[Any]] = None, scope: str = "") -> str:
+    """
+    Derive the key identical requests share.
+
+    Args:
+        query: User query
+        history: Conversation messages sent with the query
+        scope: Credentials scope, so users with different credentials never share results
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    canonical = json.dumps(
+        {
+            "query": normalize_query(query),
+            "history": [[message.type, message.content] for message in history or []],
+            "scope": scope,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """One execution, shared by everyone who asked for its key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+        self.finished_at = 0.0
+        # Set when the leader was interrupted (e.g. KeyboardInterrupt) before
+        # finishing; its followers start over and one of them leads
+        self.abandoned = False
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its outcome."""
+
+    def __init__(self, window_seconds: Optional[float] = None):
+        """
+        Initialize single-flight group.
+
+        Args:
+            window_seconds: How long a finished result is reused
+                (default: QUERY_COALESCE_WINDOW, 0 shares only in-flight calls)
+        """
+        self._window_seconds = window_seconds
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> float:
+        return config.QUERY_COALESCE_WINDOW if self._window_seconds is None else self._window_seconds
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        reusable: Callable[[Any], bool] = lambda result: True
+    ) -> Tuple[Any, str]:
+        """
+        Run fn for a key, or share the outcome of the call already running.
+
+        Args:
+            key: Coalescing key
+            fn: Call to run when no call for the key is running or fresh
+            reusable: Whether a result may be served after the call finished
+                (followers of a running call get it either way)
+
+        Returns:
+            (result, role); role is "leader" (ran fn), "inflight" (waited for
+            a running call) or "window" (reused a recent result). Exceptions
+            of the shared call are raised to every caller; other interruptions
+            (KeyboardInterrupt, SystemExit) only to the leader.
+        """
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                self._expire(now)
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    role = "leader"
+                else:
+                    role = "window" if call.done.is_set() else "inflight"
+
+            if role == "leader":
+                try:
+                    call.result = fn()
+                except Exception as e:
+                    call.error = e
+                except BaseException:
+                    with self._lock:
+                        call.abandoned = True
+                        self._calls.pop(key, None)
+                    call.done.set()
+                    raise
+                with self._lock:
+                    call.finished_at = time.monotonic()
+                    if call.error is not None or self.window <= 0 or not reusable(call.result):
+                        self._calls.pop(key, None)
+                call.done.set()
+            else:
+                call.done.wait()
+                if call.abandoned:
+                    continue
+
+            if call.error is not None:
+                raise call.error
+            return call.result, role
+
+    def _expire(self, now: float) -> None:
+        """Drop finished calls older than the window (lock held)."""
+        window = self.window
+        expired = [
+            key for key, call in self._calls.items()
+            if call.done.is_set() and now - call.finished_at >= window
+        ]
+        for key in expired:
+            del self._calls[key]
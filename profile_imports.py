@@ -0,0 +1,126 @@
+"""Import-time profiling report for the app entry point and each agent.
+
+Each target is imported in a fresh interpreter with ``-X importtime`` so
+results are cold-start numbers. Use ``--json`` to keep a report for CI and
+``--budget-ms`` to fail when the entry point gets slower.
+
+    python profile_imports.py
+    python profile_imports.py --json import_times.json --budget-ms 300
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Any
+
+# Modules loaded before the first page renders
+ENTRY_POINT = "orchestrator.graph"
+
+# Modules loaded the first time a query is routed to each agent
+AGENT_MODULES = [
+    "agents.chat_agent",
+    "agents.github_agent",
+    "agents.drive_agent",
+    "agents.n8n_agent",
+    "agents.ml_agent",
+]
+
+
+def profile_module(module: str) -> Dict[str, Any]:
+    """
+    Import a module in a fresh interpreter and collect ``-X importtime`` output.
+
+    Args:
+        module: Dotted module name
+
+    Returns:
+        Total time, per-module timings and any import error
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent,
+    )
+
+    imports: List[Dict[str, Any]] = []
+    error_lines: List[str] = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            error_lines.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Column header
+        # Drop the single space after the separator; the rest is indentation
+        name = fields[2].rstrip()[1:]
+        imports.append({
+            "module": name.strip(),
+            "self_ms": int(fields[0]) / 1000,
+            "cumulative_ms": int(fields[1]) / 1000,
+            # Nested imports are indented two spaces per level
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+
+    return {
+        "module": module,
+        # Top-level entries' cumulative times add up to the whole import
+        "total_ms": round(sum(i["cumulative_ms"] for i in imports if i["depth"] == 0), 3),
+        "modules_loaded": len(imports),
+        "ok": process.returncode == 0,
+        "error": error_lines[-1] if process.returncode != 0 and error_lines else None,
+        "imports": imports,
+    }
+
+
+def top_level_packages(imports: List[Dict[str, Any]], top: int) -> List[Dict[str, Any]]:
+    """Aggregate self time by top-level package, slowest first."""
+    totals: Dict[str, float] = {}
+    for entry in imports:
+        package = entry["module"].split(".")[0]
+        totals[package] = totals.get(package, 0.0) + entry["self_ms"]
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": package, "self_ms": round(ms, 3)} for package, ms in ranked]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", help=f"Modules to profile (default: {ENTRY_POINT} and all agents)")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed per module")
+    parser.add_argument("--json", dest="json_path", help="Write the full report to this file")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the first module takes longer than this")
+    args = parser.parse_args()
+
+    modules = args.modules or [ENTRY_POINT] + AGENT_MODULES
+    reports = []
+    for module in modules:
+        report = profile_module(module)
+        report["slowest_packages"] = top_level_packages(report["imports"], args.top)
+        reports.append(report)
+
+        status = "ok" if report["ok"] else f"FAILED ({report['error']})"
+        print(f"{module}: {report['total_ms']:.1f} ms, {report['modules_loaded']} modules, {status}")
+        for package in report["slowest_packages"]:
+            print(f"    {package['self_ms']:>9.1f} ms  {package['package']}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "reports": reports}, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+    if args.budget_ms is not None:
+        entry = reports[0]
+        # A failed import stops early and would look fast
+        if not entry["ok"]:
+            print(f"\n{entry['module']} failed to import, so the {args.budget_ms:.1f} ms budget can't be checked")
+            return 1
+        if entry["total_ms"] > args.budget_ms:
+            print(f"\n{entry['module']} took {entry['total_ms']:.1f} ms, over the {args.budget_ms:.1f} ms budget")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
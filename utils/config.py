@@ -1,8 +1,13 @@
 """Configuration loader from environment variables and Streamlit secrets."""
 
+import contextvars
+import hashlib
+import json
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 
 # Try to import streamlit for secrets (only works in Streamlit environment)
 try:
@@ -14,64 +19,413 @@ except ImportError:
     # Load .env file (for local development)
     load_dotenv()
 
+# Optional JSON file of settings, lowest priority and hot-reloaded
+CONFIG_FILE = Path(os.getenv("CONFIG_FILE", "settings.json"))
+
+# Maps setting name -> (old value, new value)
+Changes = Dict[str, Tuple[Any, Any]]
+
+# Session values pinned for a request, so worker threads (which have no
+# Streamlit script run context) see the same credentials as the caller
+_pinned_session: contextvars.ContextVar[Optional[Dict[str, str]]] = contextvars.ContextVar(
+    "pinned_session", default=None
+)
+
+
+def _read_session(key: str) -> Optional[str]:
+    """Get a value entered in the UI for the current Streamlit session."""
+    if not USE_STREAMLIT_SECRETS:
+        return None
+    try:
+        return st.session_state.get(f"user_{key}") or None
+    except Exception:
+        # No session outside a script run (e.g. background threads)
+        return None
+
+
+def _read_streamlit_secret(key: str) -> Optional[str]:
+    """Get a value from Streamlit secrets."""
+    if not USE_STREAMLIT_SECRETS:
+        return None
+    try:
+        secrets = st.secrets
+        # Handle nested secrets (e.g., st.secrets["DEEPSEEK_API_KEY"])
+        if hasattr(secrets, key):
+            return getattr(secrets, key)
+        # Or try as dict
+        if isinstance(secrets, dict) and key in secrets:
+            return secrets[key]
+    except Exception:
+        # No secrets.toml
+        pass
+    return None
+
 
 def get_secret(key: str, default: str = "") -> str:
     """Get secret from session state, Streamlit secrets, or environment variable."""
     # Priority 1: Check session state (user input from UI)
-    if USE_STREAMLIT_SECRETS:
-        try:
-            session_key = f"user_{key}"
-            if hasattr(st.session_state, session_key) and st.session_state.get(session_key):
-                return st.session_state[session_key]
-        except:
-            pass
+    value = _read_session(key)
+    if value:
+        return value
     
     # Priority 2: Check Streamlit secrets
-    if USE_STREAMLIT_SECRETS:
-        try:
-            # Try to get from Streamlit secrets
-            secrets = st.secrets
-            # Handle nested secrets (e.g., st.secrets["DEEPSEEK_API_KEY"])
-            if hasattr(secrets, key):
-                return getattr(secrets, key)
-            # Or try as dict
-            if isinstance(secrets, dict) and key in secrets:
-                return secrets[key]
-        except (AttributeError, KeyError, TypeError):
-            pass
+    value = _read_streamlit_secret(key)
+    if value is not None:
+        return value
     
     # Priority 3: Fallback to environment variable
     return os.getenv(key, default)
 
 
+class Setting:
+    """A typed configuration value, resolved and cached by the config service."""
+    
+    def __init__(self, cast: Callable[[Any], Any] = str, default: Any = "", session: bool = False):
+        """
+        Initialize setting.
+        
+        Args:
+            cast: Converts raw values (e.g. int, float, Path)
+            default: Value used when no source provides one
+            session: Whether users may override it per session from the UI
+        """
+        self.cast = cast
+        self.default = cast(default)
+        self.session = session
+        self.name = ""
+    
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+        config_service.register(self)
+    
+    def __get__(self, obj: Any, owner: Optional[type] = None) -> Any:
+        return config_service.get(self.name)
+
+
+class ConfigService:
+    """
+    Layered, cached settings with change notifications.
+    
+    Priority: session (UI input, for settings marked ``session``) >
+    Streamlit secrets > environment > CONFIG_FILE. Secrets, environment
+    and file values are resolved once and cached until reload(), so
+    reading a setting costs a dict lookup.
+    """
+    
+    def __init__(self, config_file: Path = CONFIG_FILE):
+        """
+        Initialize config service.
+        
+        Args:
+            config_file: JSON file of settings (optional)
+        """
+        self.config_file = config_file
+        self._settings: Dict[str, Setting] = {}
+        self._values: Dict[str, Any] = {}
+        self._file_values: Optional[Dict[str, Any]] = None
+        self._file_mtime: Optional[float] = None
+        # Session layer for non-Streamlit callers (scripts, benchmarks)
+        self._local_session: Dict[str, str] = {}
+        self._subscribers: List[Tuple[FrozenSet[str], Callable[[Changes], None]]] = []
+        self._lock = threading.RLock()
+    
+    def register(self, setting: Setting) -> None:
+        """Register a setting so it can be resolved by name."""
+        self._settings[setting.name] = setting
+    
+    def _file_mtime_now(self) -> Optional[float]:
+        try:
+            return self.config_file.stat().st_mtime
+        except OSError:
+            return None
+    
+    def _load_file(self) -> Dict[str, Any]:
+        """Read the settings file, remembering its mtime."""
+        self._file_mtime = self._file_mtime_now()
+        if self._file_mtime is None:
+            return {}
+        try:
+            with open(self.config_file, "r", encoding="utf-8") as f:
+                values = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read {self.config_file}: {e}")
+            return {}
+        return values if isinstance(values, dict) else {}
+    
+    def _cast(self, setting: Setting, raw: Any) -> Any:
+        if raw is None:
+            return setting.default
+        try:
+            return setting.cast(raw)
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid value for {setting.name}: {raw!r}, using default")
+            return setting.default
+    
+    def _resolve(self, setting: Setting) -> Any:
+        """Resolve a setting from secrets, environment and file."""
+        if self._file_values is None:
+            self._file_values = self._load_file()
+        raw = _read_streamlit_secret(setting.name)
+        if raw is None:
+            raw = os.environ.get(setting.name)
+        if raw is None:
+            raw = self._file_values.get(setting.name)
+        return self._cast(setting, raw)
+    
+    def _session_value(self, name: str) -> Optional[str]:
+        pinned = _pinned_session.get()
+        if pinned is not None:
+            return pinned.get(name) or None
+        if USE_STREAMLIT_SECRETS:
+            return _read_session(name)
+        return self._local_session.get(name) or None
+    
+    def get(self, name: str) -> Any:
+        """
+        Get the current value of a setting.
+        
+        Args:
+            name: Setting name
+            
+        Returns:
+            Typed value
+        """
+        setting = self._settings[name]
+        if setting.session:
+            raw = self._session_value(name)
+            if raw:
+                return self._cast(setting, raw)
+        try:
+            return self._values[name]
+        except KeyError:
+            with self._lock:
+                if name not in self._values:
+                    self._values[name] = self._resolve(setting)
+                return self._values[name]
+    
+    @contextmanager
+    def pinned_session(self) -> Iterator[None]:
+        """
+        Pin the caller's session values for the enclosed work.
+        
+        Threads started inside (through utils.tracing.propagate or
+        LangGraph, which copy contextvars) then resolve session settings
+        to the caller's values rather than the env/file defaults. Nested
+        pins keep the outer values.
+        """
+        if _pinned_session.get() is not None:
+            yield
+            return
+        values = {
+            name: self._session_value(name) or ""
+            for name, setting in self._settings.items() if setting.session
+        }
+        token = _pinned_session.set(values)
+        try:
+            yield
+        finally:
+            _pinned_session.reset(token)
+    
+    def session_scope(self) -> str:
+        """
+        Fingerprint of the per-session settings (tokens, webhook URLs).
+        
+        Requests with the same scope act with the same credentials.
+        
+        Returns:
+            Hex SHA-256 digest
+        """
+        values = {name: str(self.get(name)) for name, setting in self._settings.items() if setting.session}
+        return hashlib.sha256(json.dumps(values, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    def subscribe(self, names: Iterable[str], callback: Callable[[Changes], None]) -> None:
+        """
+        Call ``callback(changes)`` whenever any of the named settings changes.
+        
+        Args:
+            names: Setting names to watch
+            callback: Receives {name: (old, new)} for the watched settings that changed
+        """
+        with self._lock:
+            self._subscribers.append((frozenset(names), callback))
+    
+    def _notify(self, changes: Changes) -> None:
+        if not changes:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for names, callback in subscribers:
+            relevant = {name: change for name, change in changes.items() if name in names}
+            if relevant:
+                try:
+                    callback(relevant)
+                except Exception as e:
+                    print(f"Warning: Config subscriber failed: {e}")
+    
+    def set_session(self, values: Dict[str, str]) -> Changes:
+        """
+        Set UI-entered values for the current session and notify subscribers.
+        
+        Args:
+            values: Setting name -> value; empty values clear the override
+            
+        Returns:
+            Settings that changed
+        """
+        changes: Changes = {}
+        for name, value in values.items():
+            if not self._settings[name].session:
+                raise ValueError(f"{name} cannot be set per session")
+            old = self.get(name)
+            if USE_STREAMLIT_SECRETS:
+                if value:
+                    st.session_state[f"user_{name}"] = value
+                else:
+                    st.session_state.pop(f"user_{name}", None)
+            elif value:
+                self._local_session[name] = value
+            else:
+                self._local_session.pop(name, None)
+            new = self.get(name)
+            if new != old:
+                changes[name] = (old, new)
+        self._notify(changes)
+        return changes
+    
+    def clear_session(self, names: Iterable[str]) -> Changes:
+        """Clear UI-entered values for the current session."""
+        return self.set_session({name: "" for name in names})
+    
+    def reload(self) -> Changes:
+        """
+        Re-read secrets, environment and the settings file.
+        
+        Returns:
+            Settings that changed
+        """
+        with self._lock:
+            old_values = self._values
+            self._file_values = self._load_file()
+            self._values = {}
+            changes: Changes = {}
+            for name, old in old_values.items():
+                new = self._values[name] = self._resolve(self._settings[name])
+                if new != old:
+                    changes[name] = (old, new)
+        self._notify(changes)
+        return changes
+    
+    def reload_if_changed(self) -> Changes:
+        """Reload if the settings file changed since it was read (one stat call)."""
+        if self._file_values is None or self._file_mtime_now() == self._file_mtime:
+            return {}
+        return self.reload()
+
+
+# Global config service
+config_service = ConfigService()
+
+
 class Config:
     """Application configuration."""
     
     # DeepSeek API
-    DEEPSEEK_API_KEY: str = get_secret("DEEPSEEK_API_KEY", "")
-    DEEPSEEK_API_BASE: str = get_secret("DEEPSEEK_API_BASE", "https://api.deepseek.com")
+    DEEPSEEK_API_KEY = Setting(str, "")
+    DEEPSEEK_API_BASE = Setting(str, "https://api.deepseek.com")
     
     # GitHub
-    GITHUB_TOKEN: str = get_secret("GITHUB_TOKEN", "")
-    GITHUB_USERNAME: str = get_secret("GITHUB_USERNAME", "")
+    GITHUB_TOKEN = Setting(str, "", session=True)
+    GITHUB_USERNAME = Setting(str, "", session=True)
+    GITHUB_API_BASE = Setting(str, "https://api.github.com")
+    GITHUB_CLIENT_POOL_SIZE = Setting(int, 8)
+    # Keep-alive connections shared out across all pooled clients
+    GITHUB_HTTP_POOL_SIZE = Setting(int, 32)
     
     # Google Drive
-    GOOGLE_DRIVE_CREDENTIALS_FILE: str = get_secret("GOOGLE_DRIVE_CREDENTIALS_FILE", "credentials.json")
-    GOOGLE_DRIVE_TOKEN_FILE: str = get_secret("GOOGLE_DRIVE_TOKEN_FILE", "token.json")
+    GOOGLE_DRIVE_CREDENTIALS_FILE = Setting(str, "credentials.json")
+    GOOGLE_DRIVE_TOKEN_FILE = Setting(str, "token.json")
+    DRIVE_TOKEN_REFRESH_MARGIN = Setting(int, 300)
+    DRIVE_DOWNLOAD_CHUNK_SIZE = Setting(int, 8 * 1024 * 1024)
+    DRIVE_PARALLEL_DOWNLOAD_THRESHOLD = Setting(int, 64 * 1024 * 1024)
+    DRIVE_DOWNLOAD_WORKERS = Setting(int, 4)
+    DRIVE_DOWNLOAD_RETRIES = Setting(int, 3)
+    DRIVE_MULTIPART_MAX_SIZE = Setting(int, 5 * 1024 * 1024)
+    DRIVE_UPLOAD_CHUNK_SIZE = Setting(int, 16 * 1024 * 1024)
+    DRIVE_UPLOAD_RETRIES = Setting(int, 5)
+    DRIVE_UPLOAD_CONCURRENCY = Setting(int, 4)
+    DRIVE_INDEX_PATH = Setting(Path, ".cache/drive_index.db")
+    DRIVE_INDEX_SYNC_INTERVAL = Setting(int, 60)
     
     # n8n
-    N8N_WEBHOOK_BASE_URL: str = get_secret("N8N_WEBHOOK_BASE_URL", "")
-    N8N_WEBHOOK_TOKEN: str = get_secret("N8N_WEBHOOK_TOKEN", "")
+    N8N_WEBHOOK_BASE_URL = Setting(str, "", session=True)
+    N8N_WEBHOOK_TOKEN = Setting(str, "", session=True)
+    N8N_CONNECT_TIMEOUT = Setting(float, 3.05)
+    N8N_READ_TIMEOUT = Setting(float, 30)
+    N8N_MAX_RETRIES = Setting(int, 3)
+    N8N_RETRY_BACKOFF = Setting(float, 0.5)
+    N8N_POOL_SIZE = Setting(int, 20)
+    N8N_CLIENT_POOL_SIZE = Setting(int, 8)
+    N8N_BULK_CONCURRENCY = Setting(int, 10)
+    N8N_BULK_RATE_LIMIT = Setting(float, 20)
+    N8N_DEDUP_PATH = Setting(Path, ".cache/n8n_dedup.db")
+    N8N_DEDUP_WINDOW = Setting(float, 300)
+    N8N_QUEUE_PATH = Setting(Path, ".cache/n8n_queue.db")
+    N8N_QUEUE_WORKERS = Setting(int, 4)
+    N8N_QUEUE_MAX_ATTEMPTS = Setting(int, 5)
+    N8N_QUEUE_RETRY_BACKOFF = Setting(float, 2)
+    N8N_QUEUE_LEASE = Setting(float, 300)
+    N8N_QUEUE_RETENTION = Setting(float, 7 * 86400)
     
     # Kaggle
-    KAGGLE_USERNAME: str = get_secret("KAGGLE_USERNAME", "")
-    KAGGLE_KEY: str = get_secret("KAGGLE_KEY", "")
+    KAGGLE_USERNAME = Setting(str, "", session=True)
+    KAGGLE_KEY = Setting(str, "", session=True)
     
     # HuggingFace
-    HUGGINGFACE_TOKEN: str = get_secret("HUGGINGFACE_TOKEN", "")
+    HUGGINGFACE_TOKEN = Setting(str, "", session=True)
+    
+    # Dataset search
+    DATASET_CACHE_DIR = Setting(Path, ".cache/dataset_search")
+    DATASET_CACHE_TTL = Setting(float, 3600)
+    DATASET_CACHE_STALE_TTL = Setting(float, 86400)
+    DATASET_SEARCH_TIMEOUT = Setting(float, 5)
+    DATASET_CATALOG_PATH = Setting(Path, ".cache/dataset_catalog.db")
+    DATASET_CATALOG_DIR = Setting(Path, "ml_models/datasets")
+    DATASET_CATALOG_SCAN_INTERVAL = Setting(float, 30)
+    DATASET_DOWNLOAD_DIR = Setting(Path, ".cache/dataset_downloads")
+    DATASET_DOWNLOAD_CHUNK_SIZE = Setting(int, 1024 * 1024)
+    DATASET_DOWNLOAD_RETRIES = Setting(int, 3)
+    DATASET_DOWNLOAD_CONNECT_TIMEOUT = Setting(float, 5)
+    DATASET_DOWNLOAD_READ_TIMEOUT = Setting(float, 60)
+    SYNTHETIC_DATA_DIR = Setting(Path, ".cache/synthetic")
+    SYNTHETIC_CHUNK_ROWS = Setting(int, 250000)
+    SYNTHETIC_MAX_ROWS = Setting(int, 50000000)
+    
+    # Conversation memory (history tokens per request, verbatim messages kept)
+    MEMORY_TOKEN_BUDGET = Setting(int, 2000)
+    MEMORY_RECENT_MESSAGES = Setting(int, 6)
+    MEMORY_SUMMARY_MAX_TOKENS = Setting(int, 400)
+    MEMORY_TOKENIZER = Setting(str, "cl100k_base")
+    
+    # Agent tool loop (tool rounds, seconds and LLM tokens per query)
+    AGENT_MAX_STEPS = Setting(int, 5)
+    AGENT_TIME_BUDGET = Setting(float, 60)
+    AGENT_TOKEN_BUDGET = Setting(int, 16000)
+    AGENT_TOOL_CONCURRENCY = Setting(int, 4)
+    # Agents run concurrently for a compound query (1 routes to one agent only)
+    AGENT_FANOUT_MAX = Setting(int, 3)
+    # Seconds a finished query's result is shared with identical queries (0: only while running)
+    QUERY_COALESCE_WINDOW = Setting(float, 2)
+    
+    # Tracing ("jsonl" and/or "otel", comma-separated; empty disables export)
+    TRACE_EXPORTERS = Setting(str, "")
+    TRACE_FILE = Setting(Path, ".cache/traces.jsonl")
+    
+    # Metrics endpoint (Prometheus text format at /metrics; port 0 disables)
+    METRICS_HOST = Setting(str, "127.0.0.1")
+    METRICS_PORT = Setting(int, 9108)
     
     # Model Storage
-    MODEL_STORAGE_PATH: Path = Path(get_secret("MODEL_STORAGE_PATH", "ml_models/models"))
+    MODEL_STORAGE_PATH = Setting(Path, "ml_models/models")
     
     @classmethod
     def validate(cls) -> bool:
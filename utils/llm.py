@@ -1,9 +1,69 @@
 """DeepSeek LLM wrapper for LangChain."""
 
-from typing import Optional
+from typing import Any, Dict, Optional
+from uuid import UUID
 from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import LLMResult
 from utils.config import config
+from utils.metrics import Counter
+from utils.tracing import Span, end_span, start_span
+
+
+llm_calls = Counter("llm_calls_total", "LLM calls per purpose and outcome")
+# Types are the token_usage fields without "_tokens": prompt, completion,
+# and DeepSeek's prompt_cache_hit / prompt_cache_miss
+llm_tokens = Counter("llm_tokens_total", "LLM tokens per purpose and type")
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Records each LLM call as a span with its token usage."""
+    
+    def __init__(self):
+        self._spans: Dict[UUID, Span] = {}
+    
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        # Agents label their calls, e.g. "tool_selection" or "summary",
+        # and the prompt prefix they start with (see agents.base.PromptPrefix)
+        metadata = metadata or {}
+        self._spans[run_id] = start_span(
+            metadata.get("llm_call", "invoke"),
+            "llm",
+            **{
+                "llm.model": (kwargs.get("invocation_params") or {}).get("model", ""),
+                "llm.prompt_prefix": metadata.get("prompt_prefix", ""),
+            }
+        )
+    
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, **kwargs)
+    
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        for key, value in usage.items():
+            if isinstance(value, int):
+                span.set(f"llm.{key}", value)
+                if key.endswith("_tokens") and key != "total_tokens":
+                    llm_tokens.inc(value, {"call": span.name, "type": key[:-len("_tokens")]})
+        llm_calls.inc(labels={"call": span.name, "status": "ok"})
+        text = "".join(
+            generation.text for generations in response.generations for generation in generations
+        )
+        span.set("llm.output_bytes", len(text.encode("utf-8")))
+        end_span(span)
+    
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            llm_calls.inc(labels={"call": span.name, "status": "error"})
+            end_span(span, error)
+
+
+_tracing_handler = TracingCallbackHandler()
 
 
 def get_deepseek_llm(
@@ -30,6 +90,7 @@ def get_deepseek_llm(
         base_url=config.DEEPSEEK_API_BASE,
         temperature=temperature,
         max_tokens=max_tokens,
+        callbacks=[_tracing_handler],
     )
 
 
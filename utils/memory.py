@@ -0,0 +1,314 @@
+"""Token-budgeted conversation memory with an incrementally updated summary.
+
+Recent messages are kept verbatim; once there are more than twice
+MEMORY_RECENT_MESSAGES (or they outgrow the token budget), the oldest ones
+are folded into a running summary by the LLM, in the background. Folding
+in batches keeps the history prefix (summary plus the older verbatim
+messages) byte-identical between folds, so DeepSeek's context cache keeps
+hitting on it from turn to turn.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import re
+import threading
+import time
+from utils.config import config
+
+# Local tokenizer (in requirements.txt); without it, or offline, tokens are
+# estimated conservatively from length
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+# Characters per token of ASCII words when no tokenizer is available. English
+# averages about 4, so 3 over-counts; words with other characters (e.g.
+# Vietnamese with diacritics) count a whole token per character, since BPE
+# splits them finely
+CHARS_PER_TOKEN = 3
+
+# Words and the whitespace between them
+_SEGMENT = re.compile(r"\s+|\S+")
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+# Seconds before retrying a failed fold; doubles per consecutive failure up to the maximum
+FOLD_RETRY_BACKOFF = 30.0
+FOLD_RETRY_MAX_BACKOFF = 600.0
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Tokenizer encoding, loaded once; None if unavailable (e.g. offline)."""
+    global _encoding
+    if _encoding is None and TIKTOKEN_AVAILABLE:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    _encoding = tiktoken.get_encoding(config.MEMORY_TOKENIZER)
+                except Exception as e:
+                    print(f"Warning: Could not load tokenizer {config.MEMORY_TOKENIZER}, estimating tokens: {e}")
+                    _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with the local tokenizer.
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Token count (a conservative estimate without a tokenizer, so
+        budgets are rather under- than overspent)
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    units = sum(len(segment) * weight for segment, weight in _estimate_segments(text))
+    return (units + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _estimate_segments(text: str) -> Iterator[Tuple[str, int]]:
+    """Split text into segments with their cost per character, in 1/CHARS_PER_TOKEN tokens."""
+    for match in _SEGMENT.finditer(text):
+        segment = match.group()
+        yield segment, 1 if segment.isascii() else CHARS_PER_TOKEN
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Keep the first max_tokens tokens of a text."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    remaining = max_tokens * CHARS_PER_TOKEN
+    kept = []
+    for segment, weight in _estimate_segments(text):
+        if len(segment) * weight > remaining:
+            kept.append(segment[:remaining // weight])
+            break
+        kept.append(segment)
+        remaining -= len(segment) * weight
+    return "".join(kept)
+
+
+class ConversationMemory:
+    """Conversation history for one chat session."""
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        recent_messages: Optional[int] = None,
+        summary_max_tokens: Optional[int] = None
+    ):
+        """
+        Initialize conversation memory.
+
+        Args:
+            token_budget: Maximum history tokens per request (default: MEMORY_TOKEN_BUDGET)
+            recent_messages: Messages always kept verbatim (default: MEMORY_RECENT_MESSAGES)
+            summary_max_tokens: Maximum summary length (default: MEMORY_SUMMARY_MAX_TOKENS)
+        """
+        self.token_budget = token_budget or config.MEMORY_TOKEN_BUDGET
+        self.recent_messages = max(1, recent_messages or config.MEMORY_RECENT_MESSAGES)
+        self.summary_max_tokens = summary_max_tokens or config.MEMORY_SUMMARY_MAX_TOKENS
+        self.summary = ""
+        self.summary_tokens = 0
+        # (role, content, tokens); role is "user" or "assistant"
+        self._messages: List[Tuple[str, str, int]] = []
+        self._lock = threading.Lock()
+        self._folding: Optional[threading.Thread] = None
+        # Serializes folds, which replace the oldest messages with the summary
+        self._fold_lock = threading.Lock()
+        self._fold_failures = 0
+        self._fold_retry_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add_exchange(self, query: str, answer: str) -> None:
+        """
+        Record a user query and the answer, folding old messages if needed.
+
+        Args:
+            query: User query
+            answer: Assistant answer
+        """
+        with self._lock:
+            for role, content in (("user", query), ("assistant", answer)):
+                self._messages.append((role, content, count_tokens(content)))
+            needs_fold = self._needs_fold() and not self._fold_backing_off()
+        if needs_fold:
+            self._start_fold()
+
+    def clear(self) -> None:
+        """Forget the conversation."""
+        self._wait_for_fold()
+        with self._lock:
+            self._messages = []
+            self.summary = ""
+            self.summary_tokens = 0
+            self._fold_failures = 0
+            self._fold_retry_at = 0.0
+
+    def _fold_backing_off(self) -> bool:
+        """Whether a recent fold failed and the retry isn't due yet."""
+        return time.monotonic() < self._fold_retry_at
+
+    def _needs_fold(self) -> bool:
+        if len(self._messages) <= self.recent_messages:
+            return False
+        total = self.summary_tokens + sum(tokens for _, _, tokens in self._messages)
+        return len(self._messages) > 2 * self.recent_messages or total > self.token_budget
+
+    def _start_fold(self) -> None:
+        with self._lock:
+            if self._folding is not None and self._folding.is_alive():
+                return  # The running fold re-checks when it finishes
+            self._folding = threading.Thread(target=self._fold, name="memory-fold", daemon=True)
+            self._folding.start()
+
+    def _wait_for_fold(self) -> None:
+        folding = self._folding
+        if folding is not None:
+            folding.join()
+
+    def _fold(self) -> None:
+        """Fold all but the recent messages into the summary."""
+        while True:
+            with self._fold_lock:
+                with self._lock:
+                    if not self._needs_fold() or self._fold_backing_off():
+                        return
+                    count = len(self._messages) - self.recent_messages
+                if not self._fold_oldest(count):
+                    return
+
+    def _fold_oldest(self, count: int) -> bool:
+        """
+        Fold the oldest messages into the summary (fold lock held).
+
+        After a failure, folding backs off for FOLD_RETRY_BACKOFF seconds,
+        doubling per consecutive failure, instead of retrying every turn.
+
+        Returns:
+            False if summarizing failed; the messages are kept
+        """
+        with self._lock:
+            folded = self._messages[:count]
+            summary = self.summary
+        try:
+            new_summary = self._summarize(summary, folded)
+        except Exception as e:
+            with self._lock:
+                self._fold_failures += 1
+                delay = min(FOLD_RETRY_MAX_BACKOFF, FOLD_RETRY_BACKOFF * 2 ** (self._fold_failures - 1))
+                self._fold_retry_at = time.monotonic() + delay
+            # Keep the messages; the budget is still enforced in messages()
+            print(f"Warning: Could not summarize conversation, retrying in {delay:.0f}s: {e}")
+            return False
+        with self._lock:
+            # Messages are only appended meanwhile, so the folded ones are still first
+            self._messages = self._messages[len(folded):]
+            self.summary = new_summary
+            self.summary_tokens = count_tokens(SUMMARY_PREFIX + new_summary)
+            self._fold_failures = 0
+            self._fold_retry_at = 0.0
+        return True
+
+    def _summarize(self, summary: str, messages: List[Tuple[str, str, int]]) -> str:
+        """Update the running summary with older messages."""
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate
+        from utils.llm import get_deepseek_llm
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system",
+             "You maintain a running summary of a conversation between a user and an assistant "
+             "that operates GitHub, Google Drive, n8n and ML tools. Update the summary with the new "
+             "messages. Keep names, IDs, paths, URLs, model names and decisions the user may refer "
+             "back to. Write at most {max_tokens} tokens. Reply with the summary only."),
+            ("human", "Current summary:\n{summary}\n\nNew messages:\n{messages}"),
+        ])
+        chain = prompt | get_deepseek_llm(temperature=0) | StrOutputParser()
+        new_summary = chain.invoke(
+            {
+                "max_tokens": self.summary_max_tokens,
+                "summary": summary or "(empty)",
+                "messages": "\n".join(f"{role}: {content}" for role, content, _ in messages),
+            },
+            config={"metadata": {"llm_call": "memory_summary"}},
+        )
+        return truncate_tokens(new_summary.strip(), self.summary_max_tokens)
+
+    def messages(self, token_budget: Optional[int] = None) -> List[Any]:
+        """
+        History for the next request, within the token budget.
+
+        Waits for a running fold so the summary is current. If the history
+        is still over budget, the oldest verbatim messages that don't fit
+        are folded into the summary first; only if that fails (or is backing
+        off) are they left out.
+
+        Args:
+            token_budget: Override the memory's budget
+
+        Returns:
+            LangChain messages: the summary as a system message, then the kept messages
+        """
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+        self._wait_for_fold()
+        budget = token_budget or self.token_budget
+        with self._fold_lock:
+            summary, kept, dropped = self._fit(budget)
+            if dropped and not self._fold_backing_off() and self._fold_oldest(dropped):
+                summary, kept, _ = self._fit(budget)
+
+        history: List[Any] = []
+        if summary:
+            history.append(SystemMessage(content=SUMMARY_PREFIX + summary))
+        for role, content in kept:
+            history.append(HumanMessage(content=content) if role == "user" else AIMessage(content=content))
+        return history
+
+    def _fit(self, budget: int) -> Tuple[str, List[Tuple[str, str]], int]:
+        """
+        Select the newest messages that fit the budget next to the summary.
+
+        Returns:
+            (summary, kept (role, content) pairs oldest first, number of oldest messages left out)
+        """
+        with self._lock:
+            summary = self.summary
+            summary_tokens = self.summary_tokens if summary else 0
+            messages = list(self._messages)
+
+        kept: List[Tuple[str, str]] = []
+        remaining = budget - summary_tokens
+        for role, content, tokens in reversed(messages):
+            if tokens > remaining:
+                if not kept and remaining > 0:
+                    # Always keep the start of the latest message
+                    kept.append((role, truncate_tokens(content, remaining)))
+                break
+            kept.append((role, content))
+            remaining -= tokens
+        kept.reverse()
+        return summary, kept, len(messages) - len(kept)
+
+    def stats(self) -> Dict[str, Any]:
+        """Message count and token usage, for display."""
+        with self._lock:
+            return {
+                "messages": len(self._messages),
+                "message_tokens": sum(tokens for _, _, tokens in self._messages),
+                "summary_tokens": self.summary_tokens,
+                "token_budget": self.token_budget,
+            }
@@ -0,0 +1,367 @@
+"""Lightweight in-process metrics with a Prometheus text endpoint."""
+
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import threading
+
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# One exposition line: (name suffix, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Any) -> None:
+        """
+        Add a metric, replacing one of the same name and type.
+
+        Re-registering happens when a module defining metrics is reloaded
+        (e.g. by Streamlit); the reloaded module's metric takes over.
+
+        Args:
+            metric: Counter, Gauge or Histogram
+
+        Raises:
+            ValueError: If a metric of another type is registered under the name
+        """
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and type(existing) is not type(metric):
+                raise ValueError(
+                    f"Metric '{metric.name}' is already registered as a {type(existing).__name__}"
+                )
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[Any]:
+        """Get a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                samples = metric.collect()
+            except Exception as e:
+                print(f"Warning: Could not collect metric {metric.name}: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Default registry; metrics register here unless given another one
+REGISTRY = MetricsRegistry()
+
+
+class Counter:
+    """Monotonically increasing count, tracked per label set."""
+
+    type = "counter"
+
+    def __init__(self, name: str, description: str = "", registry: Optional[MetricsRegistry] = REGISTRY):
+        """
+        Initialize counter.
+
+        Args:
+            name: Metric name (conventionally ending in _total)
+            description: Human-readable description
+            registry: Registry to add the metric to (None to skip)
+        """
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def inc(self, amount: float = 1.0, labels: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Increase the count.
+
+        Args:
+            amount: Non-negative increment
+            labels: Label values identifying the series
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, labels: Optional[Dict[str, Any]] = None) -> float:
+        """Current count for a label set."""
+        return self._values.get(_label_key(labels), 0.0)
+
+    def collect(self) -> List[Sample]:
+        with self._lock:
+            return [("", dict(key), value) for key, value in self._values.items()]
+
+
+class Gauge:
+    """Value that can go up and down, set directly or computed at scrape time."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, description: str = "", registry: Optional[MetricsRegistry] = REGISTRY):
+        """
+        Initialize gauge.
+
+        Args:
+            name: Metric name
+            description: Human-readable description
+            registry: Registry to add the metric to (None to skip)
+        """
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def set(self, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Set the value for a label set."""
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Increase the value for a label set."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: Optional[Dict[str, Any]] = None) -> None:
+        """Decrease the value for a label set."""
+        self.inc(-amount, labels)
+
+    def set_function(self, function: Callable[[], float], labels: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Compute the value when metrics are collected (e.g. pool sizes, queue depth).
+
+        Args:
+            function: Returns the current value
+            labels: Label values identifying the series
+        """
+        with self._lock:
+            self._functions[_label_key(labels)] = function
+
+    def collect(self) -> List[Sample]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            values[key] = float(function())
+        return [("", dict(key), value) for key, value in values.items()]
+
+
+class Histogram:
+    """Bucketed histogram of observations, tracked per label set."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        registry: Optional[MetricsRegistry] = REGISTRY
+    ):
+        """
+        Initialize histogram.
+
+        Args:
+            name: Metric name
+            description: Human-readable description
+            buckets: Upper bounds of the buckets, ascending
+            registry: Registry to add the metric to (None to skip)
+        """
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def observe(self, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value: Observed value
+            labels: Label values identifying the series
+        """
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def quantile(self, q: float, labels: Optional[Dict[str, str]] = None) -> Optional[float]:
+        """
+        Estimate a quantile from the buckets (upper bound of the matching bucket).
+
+        Args:
+            q: Quantile between 0 and 1
+            labels: Label values identifying the series
+
+        Returns:
+            Estimated value, or None without observations
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if not series or not series["count"]:
+                return None
+            counts = list(series["counts"])
+            total = series["count"]
+
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize all series.
+
+        Returns:
+            Count, sum, mean and p50/p95/p99 estimates per label set
+        """
+        with self._lock:
+            keys = list(self._series)
+
+        summary = {}
+        for key in keys:
+            labels = dict(key)
+            series = self._series[key]
+            summary[",".join(f"{k}={v}" for k, v in key)] = {
+                "count": series["count"],
+                "sum": series["sum"],
+                "mean": series["sum"] / series["count"] if series["count"] else 0.0,
+                "p50": self.quantile(0.5, labels),
+                "p95": self.quantile(0.95, labels),
+                "p99": self.quantile(0.99, labels),
+            }
+        return summary
+
+    def collect(self) -> List[Sample]:
+        with self._lock:
+            series = {key: (list(s["counts"]), s["sum"], s["count"]) for key, s in self._series.items()}
+
+        samples: List[Sample] = []
+        for key, (counts, total, count) in series.items():
+            labels = dict(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, count))
+        return samples
+
+
+# Shared by the caches in agents and MCP servers
+cache_lookups = Counter("cache_lookups_total", "Cache lookups by cache and result (hit, stale, miss)")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes would otherwise flood the app's stderr
+        pass
+
+
+# Global metrics server
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics in a background thread. Safe to call on every rerun.
+
+    Args:
+        port: Port to listen on
+        host: Interface to bind
+
+    Returns:
+        The running server, or None if the port could not be bound
+    """
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"Warning: Could not start metrics endpoint on {host}:{port}: {e}")
+                return None
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+            thread.start()
+            _metrics_server = server
+    return _metrics_server
@@ -0,0 +1,480 @@
+"""Per-stage latency tracing for queries through the orchestrator.
+
+Spans nest through contextvars: a query's root span covers the router,
+the agent node, each LLM call, each tool invocation and each HTTP call
+made while handling it. Finished spans feed the in-process per-stage
+histogram and, depending on TRACE_EXPORTERS, a JSON-lines file and/or
+OpenTelemetry.
+
+    python -m utils.tracing .cache/traces.jsonl    # p50/p95/p99 per stage
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+import contextvars
+import json
+import math
+import sys
+import threading
+import time
+import uuid
+from utils.config import config, config_service
+from utils.metrics import Histogram
+
+# OpenTelemetry export is optional
+try:
+    from opentelemetry import trace as otel_trace
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+
+stage_latency = Histogram(
+    "stage_latency_seconds",
+    "Latency of traced stages (request, router, node, llm, tool, http)"
+)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed stage of a traced request."""
+
+    def __init__(self, name: str, stage: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        """
+        Initialize span.
+
+        Args:
+            name: Span name (e.g. "list_files")
+            stage: Stage the span is aggregated under (e.g. "tool")
+            parent: Enclosing span, if any
+            attributes: Initial attributes
+        """
+        self.name = name
+        self.stage = stage
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+        self._otel_span = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Set an attribute (token counts, byte sizes, status codes, ...)."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for export."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "stage": self.stage,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class JsonLinesExporter:
+    """Appends finished spans to a JSON-lines file."""
+
+    def __init__(self, path: Path):
+        """
+        Initialize exporter.
+
+        Args:
+            path: Output file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+# Exporters built from TRACE_EXPORTERS, rebuilt when tracing settings change
+_exporters: Optional[List[JsonLinesExporter]] = None
+_otel_tracer = None
+_exporters_lock = threading.Lock()
+
+
+def _get_exporters() -> List[JsonLinesExporter]:
+    global _exporters, _otel_tracer
+    if _exporters is not None:
+        return _exporters
+    with _exporters_lock:
+        if _exporters is None:
+            names = {name.strip().lower() for name in config.TRACE_EXPORTERS.split(",") if name.strip()}
+            exporters = []
+            if "jsonl" in names:
+                exporters.append(JsonLinesExporter(config.TRACE_FILE))
+            if "otel" in names:
+                if OTEL_AVAILABLE:
+                    _otel_tracer = otel_trace.get_tracer("clickai")
+                else:
+                    print("Warning: TRACE_EXPORTERS includes 'otel' but opentelemetry-api is not installed")
+            _exporters = exporters
+    return _exporters
+
+
+def _on_tracing_config_change(changes: Dict[str, Any]) -> None:
+    global _exporters, _otel_tracer
+    with _exporters_lock:
+        for exporter in _exporters or []:
+            exporter.close()
+        _exporters = None
+        _otel_tracer = None
+
+
+config_service.subscribe(["TRACE_EXPORTERS", "TRACE_FILE"], _on_tracing_config_change)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span in this context."""
+    return _current_span.get()
+
+
+def start_span(name: str, stage: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+    """
+    Start a span without making it current (for callback-style APIs).
+
+    Args:
+        name: Span name
+        stage: Stage name
+        parent: Enclosing span (default: the current span)
+        **attributes: Initial attributes
+
+    Returns:
+        Started span; finish it with end_span()
+    """
+    span = Span(name, stage, parent or current_span(), attributes)
+    _get_exporters()
+    if _otel_tracer is not None:
+        # Parented to the current OpenTelemetry span, which mirrors ours
+        span._otel_span = _otel_tracer.start_span(name, attributes={"stage": stage})
+    return span
+
+
+def end_span(span: Span, error: Optional[BaseException] = None) -> None:
+    """
+    Finish a span, recording its latency and exporting it.
+
+    Args:
+        span: Span to finish
+        error: Exception that ended the stage, if any
+    """
+    span.duration = time.perf_counter() - span._start
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    stage_latency.observe(span.duration, {"stage": span.stage})
+
+    if span._otel_span is not None:
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                span._otel_span.set_attribute(key, value)
+        if error is not None:
+            span._otel_span.record_exception(error)
+            span._otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, str(error)))
+        span._otel_span.end()
+
+    for exporter in _get_exporters():
+        try:
+            exporter.export(span)
+        except Exception as e:
+            print(f"Warning: Could not export span: {e}")
+
+
+@contextmanager
+def span(name: str, stage: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Trace a block as a child of the current span.
+
+    Args:
+        name: Span name
+        stage: Stage name
+        **attributes: Initial attributes
+
+    Yields:
+        The span, for setting attributes
+    """
+    current = start_span(name, stage, **attributes)
+    token = _current_span.set(current)
+    otel_scope = otel_trace.use_span(current._otel_span, end_on_exit=False) if current._otel_span else None
+    if otel_scope is not None:
+        otel_scope.__enter__()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if otel_scope is not None:
+            otel_scope.__exit__(None, None, None)
+        _current_span.reset(token)
+        end_span(current, error)
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Bind a function to the current trace context, for use in thread pools.
+
+    Args:
+        fn: Function to run in worker threads
+
+    Returns:
+        Wrapper running fn as part of the current trace
+    """
+    context = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        # A context can only be entered by one thread at a time
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+def _body_size(body: Any) -> Optional[int]:
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return None
+
+
+def _url_without_query(url: str) -> str:
+    """Drop query strings, which may carry tokens."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+
+_http_instrumented = False
+_http_instrumented_lock = threading.Lock()
+
+
+def instrument_http() -> None:
+    """
+    Trace HTTP calls made by requests (n8n, GitHub, dataset sources) and
+    httplib2 (Google Drive) while a traced request is active. Idempotent.
+    """
+    global _http_instrumented
+    with _http_instrumented_lock:
+        if _http_instrumented:
+            return
+        _http_instrumented = True
+
+    try:
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        HTTPAdapter = None
+    if HTTPAdapter is not None:
+        original_send = HTTPAdapter.send
+
+        def send(self, request, *args, **kwargs):
+            if current_span() is None:
+                return original_send(self, request, *args, **kwargs)
+            url = _url_without_query(request.url)
+            with span(f"{request.method} {urlsplit(url).netloc}", "http", **{
+                "http.method": request.method,
+                "http.url": url,
+                "http.request_bytes": _body_size(request.body),
+            }) as current:
+                response = original_send(self, request, *args, **kwargs)
+                current.set("http.status_code", response.status_code)
+                length = response.headers.get("Content-Length")
+                if length and length.isdigit():
+                    current.set("http.response_bytes", int(length))
+                return response
+
+        HTTPAdapter.send = send
+
+    try:
+        import httplib2
+    except ImportError:
+        httplib2 = None
+    if httplib2 is not None:
+        original_request = httplib2.Http.request
+
+        def request(self, uri, method="GET", body=None, *args, **kwargs):
+            if current_span() is None:
+                return original_request(self, uri, method, body, *args, **kwargs)
+            url = _url_without_query(uri)
+            with span(f"{method} {urlsplit(url).netloc}", "http", **{
+                "http.method": method,
+                "http.url": url,
+                "http.request_bytes": _body_size(body),
+            }) as current:
+                response, content = original_request(self, uri, method, body, *args, **kwargs)
+                current.set("http.status_code", response.status)
+                current.set("http.response_bytes", len(content or b""))
+                return response, content
+
+        httplib2.Http.request = request
+
+
+def stage_report() -> Dict[str, Dict[str, Any]]:
+    """
+    Per-stage latency since startup, from the in-process histogram.
+
+    Returns:
+        Count, mean and bucketed p50/p95/p99 per stage
+    """
+    return stage_latency.snapshot()
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def report_file(path: Path, by_name: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate exact per-stage latency percentiles from a JSON-lines trace file.
+
+    Args:
+        path: Trace file written by the jsonl exporter
+        by_name: Group by stage and span name instead of stage only
+
+    Returns:
+        Count and p50/p95/p99/max in milliseconds per group
+    """
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("duration") is None:
+                continue
+            key = f"{record['stage']}:{record['name']}" if by_name else record["stage"]
+            durations.setdefault(key, []).append(record["duration"] * 1000)
+            if record.get("status") == "error":
+                errors[key] = errors.get(key, 0) + 1
+
+    report = {}
+    for key, values in sorted(durations.items()):
+        values.sort()
+        report[key] = {
+            "count": len(values),
+            "errors": errors.get(key, 0),
+            "p50_ms": round(_percentile(values, 0.5), 3),
+            "p95_ms": round(_percentile(values, 0.95), 3),
+            "p99_ms": round(_percentile(values, 0.99), 3),
+            "max_ms": round(values[-1], 3),
+        }
+    return report
+
+
+def prefix_report(path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate context-cache usage per prompt prefix from a JSON-lines trace file.
+
+    Args:
+        path: Trace file written by the jsonl exporter
+
+    Returns:
+        Per prefix id: call count, prompt and cache-hit tokens, hit ratio,
+        and p50 latency of calls with and without a cache hit
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("stage") != "llm" or record.get("duration") is None:
+                continue
+            attributes = record.get("attributes") or {}
+            group = groups.setdefault(attributes.get("llm.prompt_prefix") or "(none)", {
+                "count": 0, "prompt_tokens": 0, "cache_hit_tokens": 0, "hit_ms": [], "miss_ms": [],
+            })
+            hit_tokens = attributes.get("llm.prompt_cache_hit_tokens") or 0
+            group["count"] += 1
+            group["prompt_tokens"] += attributes.get("llm.prompt_tokens") or 0
+            group["cache_hit_tokens"] += hit_tokens
+            group["hit_ms" if hit_tokens else "miss_ms"].append(record["duration"] * 1000)
+
+    report = {}
+    for key, group in sorted(groups.items()):
+        row = {
+            "count": group["count"],
+            "prompt_tokens": group["prompt_tokens"],
+            "cache_hit_tokens": group["cache_hit_tokens"],
+            "hit_ratio": round(group["cache_hit_tokens"] / group["prompt_tokens"], 3) if group["prompt_tokens"] else 0.0,
+        }
+        for outcome in ("hit", "miss"):
+            values = sorted(group[f"{outcome}_ms"])
+            row[f"p50_{outcome}_ms"] = round(_percentile(values, 0.5), 3) if values else None
+        report[key] = row
+    return report
+
+
+def _print_prefix_report(report: Dict[str, Dict[str, Any]]) -> None:
+    def ms(value: Optional[float]) -> str:
+        return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+
+    width = max([len(key) for key in report] + [6])
+    print(
+        f"{'prefix':<{width}}  {'calls':>7}  {'prompt tok':>10}  {'cached tok':>10}  {'hit %':>6}  "
+        f"{'p50 hit':>9}  {'p50 miss':>9}"
+    )
+    for key, row in report.items():
+        print(
+            f"{key:<{width}}  {row['count']:>7}  {row['prompt_tokens']:>10}  {row['cache_hit_tokens']:>10}  "
+            f"{row['hit_ratio'] * 100:>6.1f}  {ms(row['p50_hit_ms'])}  {ms(row['p50_miss_ms'])}"
+        )
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-stage latency report from a trace file")
+    parser.add_argument("path", nargs="?", default=str(config.TRACE_FILE), help="JSON-lines trace file")
+    parser.add_argument("--by-name", action="store_true", help="Group by span name within each stage")
+    parser.add_argument("--prefixes", action="store_true", help="Report LLM context-cache usage per prompt prefix")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    if args.prefixes:
+        report = prefix_report(Path(args.path))
+    else:
+        report = report_file(Path(args.path), by_name=args.by_name)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    if args.prefixes:
+        _print_prefix_report(report)
+        return 0
+
+    width = max([len(key) for key in report] + [5])
+    print(f"{'stage':<{width}}  {'count':>7}  {'errors':>6}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}  {'max ms':>9}")
+    for key, row in report.items():
+        print(
+            f"{key:<{width}}  {row['count']:>7}  {row['errors']:>6}  {row['p50_ms']:>9.1f}  "
+            f"{row['p95_ms']:>9.1f}  {row['p99_ms']:>9.1f}  {row['max_ms']:>9.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())